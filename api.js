@@ -133,6 +133,43 @@ class ApiClient {
     });
   }
 
+  async bulkCheckOutItems(jobId, itemIds, checkoutData = {}) {
+    return this.request('/inventory/bulk-check-out', {
+      method: 'POST',
+      body: JSON.stringify({ ...checkoutData, job_id: jobId, item_ids: itemIds }),
+    });
+  }
+
+  async bulkCheckInItems(itemIds, checkinData = {}) {
+    return this.request('/inventory/bulk-check-in', {
+      method: 'POST',
+      body: JSON.stringify({ ...checkinData, item_ids: itemIds }),
+    });
+  }
+
+  async importInventory(file, format) {
+    // Send the file as the raw body so the server can parse it as it streams in
+    const query = format ? `?format=${format}` : '';
+    return this.request(`/inventory/import${query}`, {
+      method: 'POST',
+      headers: { ...this.getHeaders(), 'Content-Type': file.type || 'text/csv' },
+      body: file,
+    });
+  }
+
+  // Offline sync
+  async getChanges(since, params = {}) {
+    const queryString = new URLSearchParams({ ...params, ...(since ? { since } : {}) }).toString();
+    return this.request(`/sync${queryString ? `?${queryString}` : ""}`);
+  }
+
+  async uploadMutations(mutations) {
+    return this.request('/sync/mutations', {
+      method: 'POST',
+      body: JSON.stringify({ mutations }),
+    });
+  }
+
   async getCategories() {
     return this.request('/inventory/categories');
   }
@@ -143,8 +180,10 @@ class ApiClient {
     return this.request(`/jobs${queryString ? `?${queryString}` : ""}`);
   }
 
-  async getJob(id) {
-    return this.request(`/jobs/${id}`);
+  async getJob(id, params = {}) {
+    // params.include / params.fields narrow the response, e.g. { include: 'assignments', fields: 'id,name' }
+    const queryString = new URLSearchParams(params).toString();
+    return this.request(`/jobs/${id}${queryString ? `?${queryString}` : ""}`);
   }
 
   async createJob(jobData) {
@@ -176,6 +215,97 @@ class ApiClient {
     return this.request("/jobs/dashboard-temp");
   }
 
+  subscribeToEvents(handlers = {}) {
+    // Pushes 'dashboard' counters, 'job_status' changes and 'resync' (refetch everything);
+    // replaces polling getDashboardStats. Returns a function that closes the stream.
+    let source;
+    let closed = false;
+    const open = () => {
+      source = new EventSource(`${API_BASE_URL}/events/stream?jwt=${encodeURIComponent(this.token)}`);
+      for (const [type, handler] of Object.entries(handlers)) {
+        source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+      }
+      source.onerror = () => {
+        // EventSource retries dropped streams itself; reopen only once it gives up, with the current token
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          setTimeout(open, 5000);
+        }
+      };
+    };
+    open();
+    return () => {
+      closed = true;
+      source.close();
+    };
+  }
+
+  // Job media
+  async startMediaUpload(jobId, file, chunkSize) {
+    return this.request(`/jobs/${jobId}/media/uploads`, {
+      method: 'POST',
+      body: JSON.stringify({
+        filename: file.name,
+        mime_type: file.type,
+        size: file.size,
+        ...(chunkSize ? { chunk_size: chunkSize } : {}),
+      }),
+    });
+  }
+
+  async getMediaUpload(uploadId) {
+    return this.request(`/media/uploads/${uploadId}`);
+  }
+
+  async uploadMediaChunk(uploadId, offset, chunk) {
+    // A 409 carries the server's offset, so the caller can resume from there
+    const response = await fetch(`${API_BASE_URL}/media/uploads/${uploadId}?offset=${offset}`, {
+      method: 'PUT',
+      headers: { ...this.getHeaders(), 'Content-Type': 'application/octet-stream' },
+      body: chunk,
+    });
+    const data = await response.json();
+    if (!response.ok && response.status !== 409) {
+      throw new Error(data.error || "Upload failed");
+    }
+    return data;
+  }
+
+  async completeMediaUpload(uploadId) {
+    return this.request(`/media/uploads/${uploadId}/complete`, { method: 'POST' });
+  }
+
+  async abortMediaUpload(uploadId) {
+    return this.request(`/media/uploads/${uploadId}`, { method: 'DELETE' });
+  }
+
+  async uploadMedia(jobId, file, { uploadId, chunkSize, onProgress } = {}) {
+    // Pass a saved uploadId to resume after a dropped connection or page reload
+    let upload = uploadId ? await this.getMediaUpload(uploadId) : await this.startMediaUpload(jobId, file, chunkSize);
+    while (upload.offset < upload.size) {
+      const chunk = file.slice(upload.offset, upload.offset + upload.chunk_size);
+      upload = await this.uploadMediaChunk(upload.id, upload.offset, chunk);
+      if (onProgress) onProgress(upload);
+    }
+    return this.completeMediaUpload(upload.id);
+  }
+
+  async getMedia(id) {
+    return this.request(`/media/${id}`);
+  }
+
+  async getMediaContent(id, variant) {
+    // Video players can use the content URL directly; it answers Range requests
+    const query = variant ? `?variant=${variant}` : '';
+    const response = await fetch(`${API_BASE_URL}/media/${id}/content${query}`, {
+      headers: this.getHeaders(),
+    });
+    if (!response.ok) {
+      const data = await response.json();
+      throw new Error(data.error || "Download failed");
+    }
+    return response.blob();
+  }
+
   // Reports
   async getInventoryUsageReport(params = {}) {
     const queryString = new URLSearchParams(params).toString();
@@ -189,15 +319,66 @@ class ApiClient {
     return this.request(endpoint);
   }
 
+  async getUsageSummaryReport(params = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    const endpoint = queryString ? `/reports/usage-summary?${queryString}` : '/reports/usage-summary';
+    return this.request(endpoint);
+  }
+
   async getInventoryStatusReport(params = {}) {
     const queryString = new URLSearchParams(params).toString();
     const endpoint = queryString ? `/reports/inventory-status?${queryString}` : '/reports/inventory-status';
     return this.request(endpoint);
   }
 
+  async submitReportJob(reportType, filters = {}, format = 'csv') {
+    return this.request('/reports/jobs', {
+      method: 'POST',
+      body: JSON.stringify({ report_type: reportType, format, filters }),
+    });
+  }
+
+  async getReportJobs() {
+    return this.request('/reports/jobs');
+  }
+
+  async getReportJob(id) {
+    return this.request(`/reports/jobs/${id}`);
+  }
+
+  async downloadReportJob(id) {
+    // Artifacts are files, not JSON, so fetch them as a Blob
+    const response = await fetch(`${API_BASE_URL}/reports/jobs/${id}/download`, {
+      headers: this.getHeaders(),
+    });
+    if (!response.ok) {
+      const data = await response.json();
+      throw new Error(data.error || "Download failed");
+    }
+    return response.blob();
+  }
+
+  async exportReport(report, format, params = {}) {
+    // report is 'inventory-usage' or 'job-summary'; format is csv, parquet or xlsx
+    const queryString = new URLSearchParams({ ...params, format }).toString();
+    const response = await fetch(`${API_BASE_URL}/reports/${report}?${queryString}`, {
+      headers: this.getHeaders(),
+    });
+    if (!response.ok) {
+      const data = await response.json();
+      throw new Error(data.error || "Export failed");
+    }
+    return response.blob();
+  }
+
   async getOverdueItemsReport() {
-    // Temporarily use non-JWT endpoint for testing
-    return this.request('/reports/overdue-items-temp');
+    return this.request('/reports/overdue-items');
+  }
+
+  async getOverdueAlerts(params = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    const endpoint = queryString ? `/reports/overdue-alerts?${queryString}` : '/reports/overdue-alerts';
+    return this.request(endpoint);
   }
 
   // Users
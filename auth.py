@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token, get_jwt
 from src.models.user import User, db
+from src.authz import load_current_user, role_claims
 from datetime import timedelta
 
 auth_bp = Blueprint('auth', __name__)
@@ -40,6 +41,7 @@ def register():
         # Create access token
         access_token = create_access_token(
             identity=user.id,
+            additional_claims=role_claims(user),
             expires_delta=timedelta(hours=1)
         )
         refresh_token = create_refresh_token(identity=user.id)
@@ -74,6 +76,7 @@ def login():
         # Create access token
         access_token = create_access_token(
             identity=user.id,
+            additional_claims=role_claims(user),
             expires_delta=timedelta(hours=1)
         )
         refresh_token = create_refresh_token(identity=user.id)
@@ -100,6 +103,7 @@ def refresh():
         
         new_token = create_access_token(
             identity=current_user_id,
+            additional_claims=role_claims(user),
             expires_delta=timedelta(hours=1)
         )
         
@@ -116,8 +120,7 @@ def get_current_user():
     try:
         print(f"JWT Claims: {get_jwt()}")
         print(f"JWT Identity: {get_jwt_identity()}")
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = load_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -153,8 +156,7 @@ def get_current_user_temp():
 @jwt_required()
 def change_password():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = load_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -0,0 +1,107 @@
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from threading import Lock
+import time
+from flask import current_app, g, jsonify
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from src.models.user import User, db
+
+# Just enough of a user to make authorization decisions
+Principal = namedtuple('Principal', ['id', 'role', 'is_active'])
+
+class PrincipalCache:
+    """Thread-safe LRU of user id -> Principal where every entry expires after a TTL"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return principal
+
+    def set(self, principal):
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+principal_cache = PrincipalCache()
+
+def init_authz(app):
+    """Size the principal cache from the app configuration"""
+    principal_cache.maxsize = app.config.get('AUTHZ_CACHE_SIZE', 1024)
+    principal_cache.ttl = app.config.get('AUTHZ_CACHE_TTL', 60)
+
+def role_claims(user):
+    """Extra JWT claims for a user's access token, for clients to render by role"""
+    if not current_app.config.get('JWT_ROLE_CLAIMS', True):
+        return {}
+    return {'role': user.role}
+
+def load_current_user():
+    """Load the authenticated User row at most once per request"""
+    if 'current_user' not in g:
+        g.current_user = User.query.get(get_jwt_identity())
+    return g.current_user
+
+def get_current_principal():
+    """Resolve the authenticated user's id, role and status once per request"""
+    if 'current_principal' in g:
+        return g.current_principal
+    
+    # Role and status always come from the account, at most AUTHZ_CACHE_TTL old, never from
+    # a role claim: a claim outlives deactivation or a role change made in another process
+    user_id = get_jwt_identity()
+    principal = principal_cache.get(user_id)
+    
+    if principal is None:
+        user = load_current_user()
+        if user:
+            principal = Principal(user.id, user.role, user.is_active)
+            principal_cache.set(principal)
+    
+    g.current_principal = principal
+    return principal
+
+def check_permission(required_roles):
+    """Decorator to check user permissions"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            principal = get_current_principal()
+            if principal and not principal.is_active:
+                return jsonify({'error': 'Account is deactivated'}), 401
+            if not principal or principal.role not in required_roles:
+                return jsonify({'error': 'Insufficient permissions'}), 403
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@event.listens_for(db.session, 'after_flush')
+def invalidate_changed_users(session, flush_context):
+    """Evict cached principals for users whose account was updated or deleted"""
+    changed = [obj for obj in session.dirty if session.is_modified(obj)] + list(session.deleted)
+    for obj in changed:
+        if isinstance(obj, User) and obj.id is not None:
+            principal_cache.invalidate(obj.id)
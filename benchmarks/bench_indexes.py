@@ -0,0 +1,138 @@
+"""Time the app's report, dashboard and overdue statements before and after the migration 1 indexes.
+
+Seeds a scratch database through the app's models (SQLite unless
+SQLALCHEMY_DATABASE_URI says otherwise), drops HOT_PATH_INDEXES, then runs
+the real report queries, the dashboard recounts for one foreman and one
+technician, and the overdue schedule backfill. Each statement they execute
+is printed with its time and SQLite query plan, without and with the indexes.
+
+    python -m benchmarks.bench_indexes [--assignments N] [--jobs N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# main.py creates its tables on import, so point it at a scratch database first
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tempfile.mkdtemp()}/bench_indexes.db")
+
+from sqlalchemy import event
+
+from src.main import app
+from src.models.user import User, db
+from src.models.job import Job
+from src.models.inventory import InventoryItem
+from src.models.assignment import InventoryAssignment
+from src.models.dashboard_stats import compute_dashboard_stats
+from src.migrations import HOT_PATH_INDEXES, create_indexes
+from src.overdue import schedule_open_assignments
+from src.routes.reports import inventory_usage_query, job_summary_query
+
+USERS = 500
+FOREMAN = 7
+TECHNICIAN = 42
+
+# Name -> callable running the app's own statements on a session
+CASES = {
+    'job_summary': lambda session: job_summary_query().all(),
+    'job_summary_active': lambda session: job_summary_query(status='active').all(),
+    'usage_week': lambda session: inventory_usage_query(start_date='2025-01-01', end_date='2025-01-08').all(),
+    'foreman_dashboard': lambda session: compute_dashboard_stats(
+        session, foreman_ids=[FOREMAN], technician_ids=(), include_global=False
+    ),
+    'technician_dashboard': lambda session: compute_dashboard_stats(
+        session, foreman_ids=(), technician_ids=[TECHNICIAN], include_global=False
+    ),
+    'overdue_schedule': lambda session: schedule_open_assignments(session.connection())
+}
+
+def seed(assignments, jobs):
+    start = datetime(2025, 1, 1)
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'role': 'foreman' if i <= 50 else 'technician'}
+        for i in range(2, USERS + 1)
+    ])
+    db.session.execute(Job.__table__.insert(), [
+        {'id': i, 'name': f'Job {i}', 'status': random.choice(['active', 'pending', 'completed']),
+         'priority': random.choice(['low', 'medium', 'high']), 'assigned_foreman': random.randint(2, 50),
+         'created_by': random.randint(2, 50), 'created_at': start - timedelta(minutes=i)}
+        for i in range(1, jobs + 1)
+    ])
+    db.session.execute(InventoryItem.__table__.insert(), [
+        {'id': i, 'sku': f'SKU-{i:06d}', 'name': f'Item {i}', 'status': 'available',
+         'category': random.choice(['Drying', 'Pumps', None])}
+        for i in range(1, 50_001)
+    ])
+    for offset in range(0, assignments, 50_000):
+        db.session.execute(InventoryAssignment.__table__.insert(), [
+            {'item_id': random.randint(1, 50_000), 'job_id': random.randint(1, jobs),
+             'user_id': random.randint(51, USERS),
+             'status': 'checked_out' if random.random() < 0.05 else 'checked_in',
+             'check_out_time': start + timedelta(minutes=i), 'expected_return_date': start + timedelta(minutes=i + 60)}
+            for i in range(offset, min(offset + 50_000, assignments))
+        ])
+    db.session.commit()
+
+@contextmanager
+def captured_statements():
+    """Collect (statement, parameters) executed inside the block"""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def query_plan(statement, parameters):
+    if db.engine.dialect.name != 'sqlite':
+        return ''
+    cursor = db.session.connection().connection.cursor()
+    rows = cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return ' / '.join(row[3] for row in rows)
+
+def run(label, repeat=3):
+    for name, case in CASES.items():
+        with captured_statements() as statements:
+            case(db.session)
+        db.session.rollback()
+        plans = [query_plan(statement, parameters) for statement, parameters in statements]
+        db.session.rollback()
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            case(db.session)
+            # The overdue backfill writes; leave the table as it was for the next run
+            db.session.rollback()
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        print(f'{label:6} {name:22} {elapsed:9.2f} ms')
+        for plan in plans:
+            if plan:
+                print(f'{"":30}{plan}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assignments', type=int, default=500_000)
+    parser.add_argument('--jobs', type=int, default=20_000)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with app.app_context():
+        seed(args.assignments, args.jobs)
+        with db.engine.begin() as connection:
+            for name, _, _ in HOT_PATH_INDEXES:
+                connection.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+            connection.execute(db.text('ANALYZE'))
+        run('before')
+
+        with db.engine.begin() as connection:
+            create_indexes(connection, HOT_PATH_INDEXES)
+            connection.execute(db.text('ANALYZE'))
+        run('after')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Measure JSON serialization and response compression for a large inventory usage report.
+
+Builds the JSON body of the inventory usage report over a scratch database
+and prints serialization time with the stdlib encoder and with the app's
+JSON provider (orjson when installed), then the body size and compression
+time for identity, gzip and brotli (when installed).
+
+    python -m benchmarks.bench_report_encoding [--assignments N]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# main.py creates its tables on import, so point it at a scratch database first
+os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tempfile.mkdtemp()}/bench_report_encoding.db"
+
+from src.main import app
+from src.models.user import User, db
+from src.models.job import Job
+from src.models.inventory import InventoryItem
+from src.models.assignment import InventoryAssignment
+from src.compression import brotli, make_compressor
+from src.json_provider import FastJSONProvider
+from src.routes.reports import format_usage_row, inventory_usage_query
+
+def seed(assignments):
+    user_id = User.query.filter_by(username='admin').one().id
+    start = datetime(2025, 1, 1)
+    db.session.execute(Job.__table__.insert(), [
+        {'id': i, 'name': f'Job {i}', 'claim_id': f'CLM-{i:05d}', 'status': 'active', 'created_by': user_id}
+        for i in range(1, 101)
+    ])
+    db.session.execute(InventoryItem.__table__.insert(), [
+        {'id': i, 'sku': f'SKU-{i:06d}', 'name': f'Dehumidifier {i}', 'category': random.choice(['Drying', 'Pumps', None])}
+        for i in range(1, assignments + 1)
+    ])
+    db.session.execute(InventoryAssignment.__table__.insert(), [
+        {'item_id': i, 'job_id': random.randint(1, 100), 'user_id': user_id, 'status': 'checked_in',
+         'check_out_time': start + timedelta(hours=i), 'check_in_time': start + timedelta(hours=i + 30),
+         'condition_at_checkout': 'good', 'notes': 'Returned with all accessories'}
+        for i in range(1, assignments + 1)
+    ])
+    db.session.commit()
+
+def timed(f, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+def compress(body, encoding):
+    compress_chunk, _, finish = make_compressor(encoding)
+    return compress_chunk(body) + finish()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assignments', type=int, default=10_000)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with app.app_context():
+        seed(args.assignments)
+        report = {
+            'report_type': 'inventory_usage',
+            'generated_at': datetime.utcnow(),
+            'data': [format_usage_row(*row) for row in inventory_usage_query().all()]
+        }
+        print(f"{len(report['data'])} report rows, JSON provider {type(app.json).__name__}")
+
+        _, stdlib_ms = timed(lambda: json.dumps(report, default=FastJSONProvider.default))
+        body, provider_ms = timed(lambda: app.json.dumps(report).encode())
+        print(f'serialize: stdlib json {stdlib_ms:.1f} ms, app provider {provider_ms:.1f} ms')
+
+        print(f'identity {len(body):,} bytes')
+        for encoding in ['gzip'] + (['br'] if brotli else []):
+            compressed, elapsed = timed(lambda: compress(body, encoding))
+            print(f'{encoding:8} {len(compressed):,} bytes in {elapsed:.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compare indexed radius and k-nearest searches with a full scan and sort.
+
+Loads located items into a scratch database (R*Tree on SQLite builds that
+have it, a (latitude, longitude) B-tree otherwise) and times within_radius
+and nearest against reading every row and sorting by distance.
+
+    python -m benchmarks.bench_spatial [--items N] [--radius-km R] [--k K]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# main.py creates its tables on import, so point it at a scratch database first
+os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tempfile.mkdtemp()}/bench_spatial.db"
+
+from src.main import app
+from src.models.user import db
+from src.models.inventory import InventoryItem
+from src.spatial import haversine_km, nearest, spatial_backend, within_radius
+
+CENTER = (45.0, -90.0)
+
+def timed(f, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = f()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+def full_scan():
+    rows = InventoryItem.query.filter(InventoryItem.latitude.isnot(None)).all()
+    return sorted(((row, haversine_km(*CENTER, row.latitude, row.longitude)) for row in rows), key=lambda pair: pair[1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--radius-km', type=float, default=20.0)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+    random.seed(1)
+
+    with app.app_context():
+        db.session.execute(InventoryItem.__table__.insert(), [
+            {'sku': f'GEO-{i}', 'name': f'Item {i}', 'status': 'available',
+             'latitude': random.uniform(40, 50), 'longitude': random.uniform(-100, -80)}
+            for i in range(args.items)
+        ])
+        db.session.commit()
+        print(f'{args.items} items, backend {spatial_backend()}')
+
+        scanned, scan_ms = timed(full_scan, 3)
+        in_radius = [row.id for row, distance in scanned if distance <= args.radius_km]
+
+        results, radius_ms = timed(lambda: within_radius(InventoryItem.query, InventoryItem, *CENTER, args.radius_km), 20)
+        print(f'within {args.radius_km:g} km: {len(results)} rows, same as scan {[row.id for row, _ in results] == in_radius}, '
+              f'{radius_ms:.2f} ms vs full scan {scan_ms:.1f} ms')
+
+        results, nearest_ms = timed(lambda: nearest(InventoryItem.query, InventoryItem, *CENTER, args.k), 20)
+        print(f'{args.k} nearest: same as scan {[row.id for row, _ in results] == [row.id for row, _ in scanned[:args.k]]}, '
+              f'{nearest_ms:.2f} ms')
+
+if __name__ == '__main__':
+    main()
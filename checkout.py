@@ -0,0 +1,216 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from src.models.user import User, db
+from src.models.inventory import InventoryItem
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+from src.authz import get_current_principal
+from datetime import datetime
+from sqlalchemy import or_
+
+checkout_bp = Blueprint('checkout', __name__)
+
+# Largest truck load accepted in one request
+MAX_BULK_ITEMS = 500
+
+# Statuses an item can be returned in
+CHECK_IN_ITEM_STATUSES = ['available', 'damaged', 'maintenance', 'lost']
+
+def get_item_ids(data):
+    """Validate the item_ids list of a bulk request, returning (ids, error)"""
+    item_ids = data.get('item_ids')
+    if not isinstance(item_ids, list) or not item_ids:
+        return None, 'item_ids must be a non-empty list'
+    if len(item_ids) > MAX_BULK_ITEMS:
+        return None, f'At most {MAX_BULK_ITEMS} items can be processed per request'
+    try:
+        # Keep the caller's order but drop duplicates
+        return list(dict.fromkeys(int(item_id) for item_id in item_ids)), None
+    except (TypeError, ValueError):
+        return None, 'item_ids must be integers'
+
+def job_access_error(user, job):
+    """Error message if the user may not check items out to the job, else None.
+
+    Same scoping as the jobs API: foremen their own jobs, technicians jobs
+    they already hold an assignment on. A technician's first check-out to a
+    job is therefore made by a foreman, on their behalf through user_id.
+    """
+    if user.role == 'foreman' and user.id not in (job.assigned_foreman, job.created_by):
+        return 'Access denied'
+    if user.role == 'technician' and not db.session.query(
+        Job.query.filter(Job.id == job.id, Job.assignments.any(InventoryAssignment.user_id == user.id)).exists()
+    ).scalar():
+        return 'Access denied; a foreman makes your first check-out to a job'
+    return None
+
+def summarize(results, ok_status):
+    succeeded = sum(1 for result in results if result['status'] == ok_status)
+    return {
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    }
+
+@checkout_bp.route('/inventory/bulk-check-out', methods=['POST'])
+@jwt_required()
+def bulk_check_out():
+    try:
+        user = get_current_principal()
+        data = request.json or {}
+        
+        item_ids, error = get_item_ids(data)
+        if error:
+            return jsonify({'error': error}), 400
+        if not data.get('job_id'):
+            return jsonify({'error': 'job_id is required'}), 400
+        
+        job = Job.query.get(data['job_id'])
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        error = job_access_error(user, job)
+        if error:
+            return jsonify({'error': error}), 403
+        
+        # Supervisors may check items out on behalf of a crew member
+        assignee_id = user.id
+        if data.get('user_id') is not None:
+            try:
+                assignee_id = int(data['user_id'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'user_id must be an integer'}), 400
+            if assignee_id != user.id:
+                if user.role not in ['admin', 'foreman']:
+                    return jsonify({'error': 'Insufficient permissions'}), 403
+                if db.session.get(User, assignee_id) is None:
+                    return jsonify({'error': 'User not found'}), 400
+        
+        expected_return_date = None
+        if data.get('expected_return_date'):
+            expected_return_date = datetime.fromisoformat(data['expected_return_date'])
+        
+        # Validate availability of the whole load with a single query
+        items = {
+            item_id: status
+            for item_id, status in db.session.query(InventoryItem.id, InventoryItem.status).filter(
+                InventoryItem.id.in_(item_ids)
+            )
+        }
+        available_ids = [item_id for item_id in item_ids if items.get(item_id) == 'available']
+        
+        # Claim the items in one guarded UPDATE; rows another request took first are skipped
+        claimed_ids = set()
+        if available_ids:
+            claimed_ids = set(db.session.execute(
+                db.update(InventoryItem).where(
+                    InventoryItem.id.in_(available_ids),
+                    InventoryItem.status == 'available'
+                ).values(
+                    status='in-use', updated_at=datetime.utcnow()
+                ).returning(InventoryItem.id).execution_options(synchronize_session=False)
+            ).scalars())
+        
+        now = datetime.utcnow()
+        assignments = {
+            item_id: InventoryAssignment(
+                item_id=item_id,
+                job_id=job.id,
+                user_id=assignee_id,
+                check_out_time=now,
+                expected_return_date=expected_return_date,
+                status='checked_out',
+                condition_at_checkout=data.get('condition_at_checkout'),
+                notes=data.get('notes')
+            )
+            for item_id in item_ids if item_id in claimed_ids
+        }
+        db.session.add_all(assignments.values())
+        db.session.flush()
+        
+        results = []
+        for item_id in item_ids:
+            if item_id in assignments:
+                results.append({
+                    'item_id': item_id,
+                    'status': 'checked_out',
+                    'assignment_id': assignments[item_id].id
+                })
+            elif item_id not in items:
+                results.append({'item_id': item_id, 'status': 'not_found'})
+            elif item_id in available_ids:
+                results.append({'item_id': item_id, 'status': 'conflict', 'error': 'Item was checked out concurrently'})
+            else:
+                results.append({'item_id': item_id, 'status': 'unavailable', 'error': f'Item is {items[item_id]}'})
+        
+        db.session.commit()
+        
+        return jsonify(summarize(results, 'checked_out')), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@checkout_bp.route('/inventory/bulk-check-in', methods=['POST'])
+@jwt_required()
+def bulk_check_in():
+    try:
+        user = get_current_principal()
+        data = request.json or {}
+        
+        item_ids, error = get_item_ids(data)
+        if error:
+            return jsonify({'error': error}), 400
+        item_status = data.get('item_status', 'available')
+        if item_status not in CHECK_IN_ITEM_STATUSES:
+            return jsonify({'error': f"item_status must be one of {', '.join(CHECK_IN_ITEM_STATUSES)}"}), 400
+        
+        # Load every open assignment for the load with a single query
+        query = InventoryAssignment.query.filter(
+            InventoryAssignment.item_id.in_(item_ids),
+            InventoryAssignment.status == 'checked_out'
+        )
+        if user.role == 'foreman':
+            # As with check-out, foremen only handle jobs they manage or created
+            query = query.filter(InventoryAssignment.job_id.in_(
+                db.select(Job.id).where(or_(Job.assigned_foreman == user.id, Job.created_by == user.id))
+            ))
+        elif user.role != 'admin':
+            query = query.filter(InventoryAssignment.user_id == user.id)
+        open_assignments = {assignment.item_id: assignment for assignment in query}
+        
+        now = datetime.utcnow()
+        for assignment in open_assignments.values():
+            assignment.status = 'checked_in'
+            assignment.check_in_time = now
+            if data.get('condition_at_checkin'):
+                assignment.condition_at_checkin = data['condition_at_checkin']
+            if data.get('notes'):
+                assignment.notes = data['notes']
+        
+        if open_assignments:
+            db.session.execute(
+                db.update(InventoryItem).where(
+                    InventoryItem.id.in_(list(open_assignments))
+                ).values(
+                    status=item_status, updated_at=now
+                ).execution_options(synchronize_session=False)
+            )
+        
+        results = []
+        for item_id in item_ids:
+            if item_id in open_assignments:
+                results.append({
+                    'item_id': item_id,
+                    'status': 'checked_in',
+                    'assignment_id': open_assignments[item_id].id
+                })
+            else:
+                results.append({'item_id': item_id, 'status': 'not_checked_out', 'error': 'No open check-out for this item'})
+        
+        db.session.commit()
+        
+        return jsonify(summarize(results, 'checked_in')), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
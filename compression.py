@@ -0,0 +1,81 @@
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/csv', 'text/html', 'text/plain', 'text/css', 'image/svg+xml'
+}
+
+def choose_encoding():
+    """Best content coding the client accepts, preferring brotli, or None"""
+    encodings = ['br', 'gzip'] if brotli else ['gzip']
+    best = max(encodings, key=request.accept_encodings.quality)
+    return best if request.accept_encodings.quality(best) > 0 else None
+
+def make_compressor(encoding):
+    """(compress, flush, finish) callables for one response body"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=current_app.config['COMPRESS_BROTLI_QUALITY'])
+        return compressor.process, compressor.flush, compressor.finish
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(current_app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body chunk by chunk, flushing so clients still see rows as they come"""
+    compress, flush, finish = make_compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compress_response(response):
+    """Compress text responses for clients that accept gzip or brotli"""
+    if (
+        not 200 <= response.status_code < 300
+        or response.status_code == 204
+        or response.direct_passthrough
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+    
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            return response
+        compress, _, finish = make_compressor(encoding)
+        response.set_data(compress(data) + finish())
+    
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity representation, so the ETag can only be weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+    app.after_request(compress_response)
@@ -0,0 +1,69 @@
+from functools import wraps
+import hashlib
+from flask import make_response, request
+from werkzeug.http import is_resource_modified
+from src.models.user import db
+from src.models.tombstones import SyncTombstone
+from src.authz import get_current_principal
+
+def table_version(model, *criteria, column=None):
+    """(row count, newest updated_at) of the rows matching criteria.
+    
+    The count catches deletes, which never move the updated_at maximum.
+    """
+    column = column if column is not None else model.updated_at
+    query = db.session.query(db.func.count(), db.func.max(column)).select_from(model).filter(*criteria)
+    return tuple(query.one())
+
+def last_deleted_at():
+    """When a job, item or assignment was last deleted, or None"""
+    return db.session.query(db.func.max(SyncTombstone.deleted_at)).scalar()
+
+def make_etag(versions, per_user=True):
+    """Strong ETag over row versions, the caller's identity and the full query string"""
+    # Responses that depend only on the role leave the user out, so a shared cached copy
+    # carries an ETag that is right for every caller with that role
+    principal = get_current_principal()
+    key = repr((principal.id if per_user else None, principal.role, request.full_path, versions))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def make_last_modified(versions):
+    timestamps = [version[1] for version in versions if version[1] is not None]
+    deleted_at = last_deleted_at()
+    if deleted_at is not None:
+        # A delete changes the payload without touching any remaining row
+        timestamps.append(deleted_at)
+    return max(timestamps) if timestamps else None
+
+def conditional(versions, per_user=True):
+    """Decorator answering If-None-Match / If-Modified-Since before the view runs.
+    
+    versions is called with the view arguments and returns a list of
+    (count, updated_at) pairs covering every row the response depends on.
+    When the client already holds the current representation the view is
+    skipped and a bodyless 304 goes back instead. Pass per_user=False when
+    the response depends on the caller's role but not on who they are.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            current_versions = versions(*args, **kwargs)
+            etag = make_etag(current_versions, per_user)
+            last_modified = make_last_modified(current_versions)
+            
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Clients may keep the body but must revalidate before reusing it
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
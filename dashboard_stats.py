@@ -0,0 +1,352 @@
+import click
+from datetime import datetime
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, tuple_
+from src.models.user import db
+from src.db_config import UPSERT_INSERTS
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+
+COUNTER_FIELDS = [
+    'total_jobs', 'active_jobs', 'pending_jobs', 'completed_jobs',
+    'total_assignments', 'active_assignments'
+]
+
+# Job statuses that have their own dashboard counter
+JOB_STATUS_COUNTERS = {
+    'active': 'active_jobs',
+    'pending': 'pending_jobs',
+    'completed': 'completed_jobs'
+}
+
+# The subset of counters a technician's dashboard shows
+TECHNICIAN_COUNTER_FIELDS = ['total_assignments', 'active_assignments', 'total_jobs']
+
+GLOBAL_SCOPE = ('global', 0)
+
+class DashboardStats(db.Model):
+    """Materialized dashboard counters, one row per scope (global, foreman or technician)"""
+    scope = db.Column(db.String(20), primary_key=True)  # global, foreman, technician
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # user id, 0 for global
+    total_jobs = db.Column(db.Integer, nullable=False, default=0)
+    active_jobs = db.Column(db.Integer, nullable=False, default=0)
+    pending_jobs = db.Column(db.Integer, nullable=False, default=0)
+    completed_jobs = db.Column(db.Integer, nullable=False, default=0)
+    total_assignments = db.Column(db.Integer, nullable=False, default=0)
+    active_assignments = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in COUNTER_FIELDS}
+
+def _job_counts_columns(status_column):
+    return [
+        db.func.count().label('total_jobs'),
+        *[
+            db.func.count(db.case((status_column == status, 1))).label(counter)
+            for status, counter in JOB_STATUS_COUNTERS.items()
+        ]
+    ]
+
+def _assignment_counts_columns():
+    return [
+        db.func.count(InventoryAssignment.id).label('total_assignments'),
+        db.func.count(
+            db.case((InventoryAssignment.status == 'checked_out', 1))
+        ).label('active_assignments')
+    ]
+
+def _foreman_job_scope(user_ids=None):
+    """Map each job to the users whose foreman dashboard includes it"""
+    assigned = db.select(
+        Job.id.label('job_id'), Job.status.label('status'), Job.assigned_foreman.label('user_id')
+    ).where(Job.assigned_foreman.isnot(None))
+    created = db.select(
+        Job.id, Job.status, Job.created_by
+    ).where(Job.created_by.isnot(None))
+    
+    if user_ids is not None:
+        assigned = assigned.where(Job.assigned_foreman.in_(user_ids))
+        created = created.where(Job.created_by.in_(user_ids))
+    
+    # UNION drops the duplicate row when a user both created and manages a job
+    return db.union(assigned, created).subquery()
+
+def dashboard_scope(user):
+    """The (scope, scope_id) whose counters the user's dashboard shows"""
+    if user.role in ['admin', 'finance']:
+        return GLOBAL_SCOPE
+    if user.role == 'foreman':
+        return ('foreman', user.id)
+    return ('technician', user.id)
+
+def dashboard_payload(scope, counters):
+    """The counters a dashboard in this scope is shown"""
+    if scope == 'technician':
+        return {field: counters[field] for field in TECHNICIAN_COUNTER_FIELDS}
+    return {field: counters[field] for field in COUNTER_FIELDS}
+
+def compute_dashboard_stats(session, foreman_ids=None, technician_ids=None, include_global=True):
+    """Count dashboard stats from the source tables as {(scope, scope_id): counters}"""
+    # None computes every user in that scope; an explicit collection limits it to those users
+    stats = {}
+
+    def row_for(key):
+        return stats.setdefault(key, dict.fromkeys(COUNTER_FIELDS, 0))
+    
+    if include_global:
+        row = row_for(GLOBAL_SCOPE)
+        row.update(session.execute(db.select(*_job_counts_columns(Job.status))).mappings().one())
+        row.update(session.execute(db.select(*_assignment_counts_columns())).mappings().one())
+    
+    if foreman_ids is None or foreman_ids:
+        if foreman_ids is not None:
+            for user_id in foreman_ids:
+                row_for(('foreman', user_id))
+        
+        scope = _foreman_job_scope(foreman_ids)
+        job_counts = session.execute(
+            db.select(scope.c.user_id, *_job_counts_columns(scope.c.status)).group_by(scope.c.user_id)
+        ).mappings()
+        for counts in job_counts:
+            row_for(('foreman', counts['user_id'])).update(
+                {field: counts[field] for field in COUNTER_FIELDS if field in counts}
+            )
+        
+        scope = _foreman_job_scope(foreman_ids)
+        assignment_counts = session.execute(
+            db.select(scope.c.user_id, *_assignment_counts_columns()).join(
+                InventoryAssignment, InventoryAssignment.job_id == scope.c.job_id
+            ).group_by(scope.c.user_id)
+        ).mappings()
+        for counts in assignment_counts:
+            row_for(('foreman', counts['user_id'])).update(
+                total_assignments=counts['total_assignments'],
+                active_assignments=counts['active_assignments']
+            )
+    
+    if technician_ids is None or technician_ids:
+        if technician_ids is not None:
+            for user_id in technician_ids:
+                row_for(('technician', user_id))
+        
+        query = db.select(
+            InventoryAssignment.user_id,
+            *_assignment_counts_columns(),
+            db.func.count(db.distinct(InventoryAssignment.job_id)).label('total_jobs')
+        ).group_by(InventoryAssignment.user_id)
+        if technician_ids is not None:
+            query = query.where(InventoryAssignment.user_id.in_(technician_ids))
+        
+        for counts in session.execute(query).mappings():
+            row_for(('technician', counts['user_id'])).update(
+                total_assignments=counts['total_assignments'],
+                active_assignments=counts['active_assignments'],
+                total_jobs=counts['total_jobs']
+            )
+    
+    return stats
+
+def _write_stats(session, key, counters):
+    """Upsert one scope's counters using Core statements, safe inside a flush"""
+    table = DashboardStats.__table__
+    scope, scope_id = key
+    values = dict(counters, updated_at=datetime.utcnow())
+    result = session.execute(
+        table.update().where(
+            table.c.scope == scope, table.c.scope_id == scope_id
+        ).values(**values)
+    )
+    if result.rowcount == 0:
+        session.execute(table.insert().values(scope=scope, scope_id=scope_id, **values))
+
+def refresh_dashboard_stats(session, foreman_ids=(), technician_ids=(), include_global=False):
+    """Recount and store the counters for the given scopes"""
+    stats = compute_dashboard_stats(session, foreman_ids, technician_ids, include_global)
+    for key, counters in stats.items():
+        _write_stats(session, key, counters)
+    return stats
+
+def rebuild_dashboard_stats(session):
+    """Recount every scope and replace the stored counters"""
+    stats = compute_dashboard_stats(session)
+    session.execute(DashboardStats.__table__.delete())
+    for key, counters in stats.items():
+        _write_stats(session, key, counters)
+    return stats
+
+def get_dashboard_stats_row(scope, scope_id=0):
+    """Read one scope's counters without writing, so it is safe on replica-routed reads"""
+    # Every scope with jobs or assignments has a row, created by the dashboard stats
+    # migration or by the flush that first counted it, so a missing row means all zeros
+    stats = db.session.get(DashboardStats, (scope, scope_id))
+    if stats is None:
+        stats = DashboardStats(scope=scope, scope_id=scope_id, **dict.fromkeys(COUNTER_FIELDS, 0))
+    return stats
+
+def _lock_stats_rows(session, scopes):
+    """Create any missing counter rows and lock them all before they are recounted"""
+    # Under READ COMMITTED two transactions recounting the same scope could each miss the
+    # other's uncommitted change and write a stale total. Holding the row lock from
+    # before the recount until commit makes the later one wait and recount after the
+    # earlier one commits. Rows are locked in key order to keep lock waits deadlock-free.
+    table = DashboardStats.__table__
+    now = datetime.utcnow()
+    rows = [
+        dict(dict.fromkeys(COUNTER_FIELDS, 0), scope=scope, scope_id=scope_id, updated_at=now)
+        for scope, scope_id in scopes
+    ]
+    dialect = session.connection().dialect.name
+    if dialect in UPSERT_INSERTS:
+        session.execute(UPSERT_INSERTS[dialect](table).on_conflict_do_nothing(), rows)
+    else:
+        existing = set(session.execute(
+            db.select(table.c.scope, table.c.scope_id).where(tuple_(table.c.scope, table.c.scope_id).in_(scopes))
+        ).all())
+        missing = [row for row in rows if (row['scope'], row['scope_id']) not in existing]
+        if missing:
+            session.execute(table.insert(), missing)
+
+    # SQLite has no row locks and renders no FOR UPDATE; its write lock already serializes flushes
+    session.execute(
+        db.select(table.c.scope, table.c.scope_id).where(
+            tuple_(table.c.scope, table.c.scope_id).in_(scopes)
+        ).order_by(table.c.scope, table.c.scope_id).with_for_update()
+    ).all()
+
+def _previous_value(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
+
+def _job_state(job, previous=False):
+    value = _previous_value if previous else getattr
+    return value(job, 'status'), value(job, 'assigned_foreman'), value(job, 'created_by')
+
+def _assignment_state(assignment, previous=False):
+    value = _previous_value if previous else getattr
+    return value(assignment, 'status'), value(assignment, 'job_id'), value(assignment, 'user_id')
+
+def _job_foremen(session, job_ids):
+    """Users whose foreman scope includes any of the given jobs"""
+    job_ids = {job_id for job_id in job_ids if job_id is not None}
+    if not job_ids:
+        return set()
+    rows = session.execute(
+        db.select(Job.assigned_foreman, Job.created_by).where(Job.id.in_(job_ids))
+    )
+    return {user_id for row in rows for user_id in row}
+
+@event.listens_for(db.session, 'after_flush')
+def maintain_dashboard_stats(session, flush_context):
+    """Keep the dashboard counters in step with job and assignment changes"""
+    # Runs inside the flushing transaction, so counters commit or roll back with the
+    # change itself. Global counters move by delta; touched per-user scopes are locked
+    # and then recounted.
+    deltas = dict.fromkeys(COUNTER_FIELDS, 0)
+    foreman_ids = set()
+    technician_ids = set()
+    assignment_job_ids = set()
+
+    def apply_job(state, sign):
+        status, assigned_foreman, created_by = state
+        deltas['total_jobs'] += sign
+        if status in JOB_STATUS_COUNTERS:
+            deltas[JOB_STATUS_COUNTERS[status]] += sign
+        foreman_ids.update([assigned_foreman, created_by])
+
+    def apply_assignment(state, sign):
+        status, job_id, user_id = state
+        deltas['total_assignments'] += sign
+        if status == 'checked_out':
+            deltas['active_assignments'] += sign
+        assignment_job_ids.add(job_id)
+        technician_ids.add(user_id)
+    
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Job):
+                apply_job(_job_state(obj), 1)
+            elif isinstance(obj, InventoryAssignment):
+                apply_assignment(_assignment_state(obj), 1)
+        
+        for obj in session.deleted:
+            if isinstance(obj, Job):
+                apply_job(_job_state(obj, previous=True), -1)
+            elif isinstance(obj, InventoryAssignment):
+                apply_assignment(_assignment_state(obj, previous=True), -1)
+        
+        for obj in session.dirty:
+            if isinstance(obj, Job):
+                old_state, new_state = _job_state(obj, previous=True), _job_state(obj)
+                if old_state != new_state:
+                    apply_job(old_state, -1)
+                    apply_job(new_state, 1)
+            elif isinstance(obj, InventoryAssignment):
+                old_state, new_state = _assignment_state(obj, previous=True), _assignment_state(obj)
+                if old_state != new_state:
+                    apply_assignment(old_state, -1)
+                    apply_assignment(new_state, 1)
+        
+        # Look up the foremen of every touched job in one query rather than per assignment
+        foreman_ids.update(_job_foremen(session, assignment_job_ids))
+        foreman_ids.discard(None)
+        technician_ids.discard(None)
+        if not any(deltas.values()) and not foreman_ids and not technician_ids:
+            return
+        
+        # Scopes whose counters this transaction moves, pushed to live dashboards after commit
+        touched = session.info.setdefault('dashboard_scopes', set())
+        touched.update(('foreman', user_id) for user_id in foreman_ids)
+        touched.update(('technician', user_id) for user_id in technician_ids)
+
+        table = DashboardStats.__table__
+        changed = {field: delta for field, delta in deltas.items() if delta}
+        if changed:
+            touched.add(GLOBAL_SCOPE)
+            result = session.execute(
+                table.update().where(
+                    table.c.scope == GLOBAL_SCOPE[0], table.c.scope_id == GLOBAL_SCOPE[1]
+                ).values(
+                    updated_at=datetime.utcnow(),
+                    **{field: table.c[field] + delta for field, delta in changed.items()}
+                )
+            )
+            if result.rowcount == 0:
+                refresh_dashboard_stats(session, include_global=True)
+        
+        scopes = sorted(
+            [('foreman', user_id) for user_id in foreman_ids] +
+            [('technician', user_id) for user_id in technician_ids]
+        )
+        if scopes:
+            _lock_stats_rows(session, scopes)
+            refresh_dashboard_stats(session, foreman_ids, technician_ids)
+
+@click.command('reconcile-dashboard-stats')
+@click.option('--dry-run', is_flag=True, help='Report drift without rewriting the counters.')
+@with_appcontext
+def reconcile_dashboard_stats_command(dry_run):
+    """Rebuild every dashboard counter from the source tables and report drift."""
+    expected = compute_dashboard_stats(db.session)
+    stored = {(row.scope, row.scope_id): row.to_dict() for row in DashboardStats.query.all()}
+    
+    # Scopes with no remaining jobs or assignments are expected to be all zero
+    zeros = dict.fromkeys(COUNTER_FIELDS, 0)
+    
+    drifted = 0
+    for key in sorted(set(expected) | set(stored)):
+        if expected.get(key, zeros) != stored.get(key, zeros):
+            drifted += 1
+            click.echo(f"{key[0]}:{key[1]} stored={stored.get(key)} expected={expected.get(key)}")
+    
+    click.echo(f"{drifted} of {len(expected)} scopes drifted")
+    if dry_run:
+        return
+    
+    rebuild_dashboard_stats(db.session)
+    db.session.commit()
+    click.echo('Dashboard stats rebuilt')
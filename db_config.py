@@ -0,0 +1,129 @@
+import os
+from functools import wraps
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from src.models.user import db
+
+# Bind key of the optional read replica engine
+REPLICA_BIND = 'replica'
+
+# Dialects with INSERT ... ON CONFLICT, used by the counter tables maintained on flush
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+def normalize_database_uri(uri):
+    """Accept the postgres:// scheme many hosts hand out"""
+    if uri and uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def sqlite_pragmas():
+    """PRAGMA settings applied to every new SQLite connection"""
+    return {
+        # WAL lets dashboard reads proceed while check-outs are being written
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'cache_size': -env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024),  # negative means KiB
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    }
+
+def engine_options(database_uri):
+    """SQLAlchemy engine options, with pool sizing taken from the environment"""
+    options = {
+        'pool_pre_ping': True
+    }
+    
+    # In-memory SQLite uses a single shared connection, so there is no pool to size
+    if database_uri.startswith('sqlite') and ':memory:' in database_uri:
+        return options
+    
+    options.update({
+        'pool_size': env_int('DB_POOL_SIZE', 10),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800)
+    })
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def install_sqlite_pragmas(app):
+    """Register the pragma hook on every SQLite engine of the app"""
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', apply_sqlite_pragmas)
+
+class ReplicaRoutingMixin:
+    """Session mixin that sends reads to the replica bind when the request asked for it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if isinstance(clause, UpdateBase) or self._flushing:
+            # Once this session writes, later reads stay on the primary to see the write
+            self.info['wrote_to_primary'] = True
+            return False
+        return (
+            has_app_context()
+            and g.get('db_read_replica', False)
+            and not self.info.get('wrote_to_primary')
+            and REPLICA_BIND in self._db.engines
+        )
+
+def configure_database(app, default_uri):
+    """Point the app at its primary database and optional read replica"""
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_uri(
+        os.environ.get('SQLALCHEMY_DATABASE_URI', default_uri)
+    )
+    replica_uri = normalize_database_uri(os.environ.get('SQLALCHEMY_REPLICA_URI'))
+    if replica_uri:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    
+    # db is created without session options, so derive the routing class from the factory's
+    # own class; session event listeners already registered on it keep firing
+    factory = db.session.session_factory
+    if not issubclass(factory.class_, ReplicaRoutingMixin):
+        factory.class_ = type('RoutingSession', (ReplicaRoutingMixin, factory.class_), {})
+    db.init_app(app)
+    install_sqlite_pragmas(app)
+
+def route_to_replica():
+    """Let the rest of this request read from the replica, if one is configured"""
+    g.db_read_replica = True
+
+def replica_session():
+    """A separate session reading from the replica, or from the primary if none is configured.
+
+    route_to_replica() stops applying to a session once it has flushed, so
+    work that updates rows and then runs a long read uses this for the read.
+    The caller closes it.
+    """
+    return Session(db.engines.get(REPLICA_BIND, db.engine))
+
+def read_replica(f):
+    """Decorator routing a read-only view's queries to the replica"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        route_to_replica()
+        return f(*args, **kwargs)
+    return wrapper
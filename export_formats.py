@@ -0,0 +1,154 @@
+import io
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional; only the Parquet export needs it
+    pyarrow = None
+
+try:
+    import xlsxwriter
+except ImportError:  # XlsxWriter is optional; only the Excel export needs it
+    xlsxwriter = None
+
+# Binary report formats beyond JSON and CSV -> mimetype
+EXPORT_MIMETYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+# Rows converted per record batch, and rows per Parquet row group
+BATCH_SIZE = 1000
+ROW_GROUP_SIZE = 50000
+
+# Bytes read per chunk when streaming a finished file
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Data rows per worksheet; Excel allows 1,048,576 including the header
+XLSX_SHEET_ROWS = 1048575
+
+def missing_dependency(export_format):
+    """Name of the package an export format needs but is not installed, or None"""
+    if export_format == 'parquet' and pyarrow is None:
+        return 'pyarrow'
+    if export_format == 'xlsx' and xlsxwriter is None:
+        return 'XlsxWriter'
+    return None
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def _arrow_schema(columns):
+    types = {
+        'int': pyarrow.int64(),
+        'float': pyarrow.float64(),
+        'str': pyarrow.string(),
+        'datetime': pyarrow.timestamp('us')
+    }
+    return pyarrow.schema([(name, types[kind]) for name, kind in columns.items()])
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands bytes back as they are written.
+
+    Parquet records byte offsets in its footer, so tell() keeps counting
+    even though drained bytes are gone.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def parquet_chunks(rows, columns, compression='zstd'):
+    """Encode row dicts as a Parquet file, yielding bytes as each row group is written"""
+    schema = _arrow_schema(columns)
+    sink = _StreamSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=compression)
+    pending = []
+    pending_rows = 0
+    for batch in _batches(rows, BATCH_SIZE):
+        pending.append(pyarrow.RecordBatch.from_pylist(batch, schema=schema))
+        pending_rows += len(batch)
+        if pending_rows >= ROW_GROUP_SIZE:
+            writer.write_table(pyarrow.Table.from_batches(pending, schema), row_group_size=pending_rows)
+            pending, pending_rows = [], 0
+            yield sink.drain()
+    if pending:
+        writer.write_table(pyarrow.Table.from_batches(pending, schema), row_group_size=pending_rows)
+    writer.close()
+    yield sink.drain()
+
+def xlsx_chunks(rows, columns):
+    """Encode row dicts as an Excel workbook and yield the finished file in chunks.
+
+    Rows are flushed to disk as they are written (constant_memory), so memory
+    stays flat, but an XLSX file is a zip whose directory comes last and
+    nothing can be sent until the workbook is closed.
+    """
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False
+        })
+        header_format = workbook.add_format({'bold': True})
+        datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        names = list(columns)
+
+        worksheet = None
+        row_number = XLSX_SHEET_ROWS
+        for row in rows:
+            if row_number == XLSX_SHEET_ROWS:
+                worksheet = workbook.add_worksheet(f"Report {len(workbook.worksheets()) + 1}")
+                worksheet.write_row(0, 0, names, header_format)
+                worksheet.freeze_panes(1, 0)
+                row_number = 0
+            row_number += 1
+            for column_number, name in enumerate(names):
+                value = row[name]
+                if value is None:
+                    continue
+                if isinstance(value, datetime):
+                    worksheet.write_datetime(row_number, column_number, value, datetime_format)
+                else:
+                    worksheet.write(row_number, column_number, value)
+
+        if worksheet is None:
+            workbook.add_worksheet('Report 1').write_row(0, 0, names, header_format)
+        workbook.close()
+
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def export_chunks(export_format, rows, columns):
+    """Bytes of a binary report export, produced from an iterable of row dicts"""
+    if export_format == 'parquet':
+        return parquet_chunks(rows, columns)
+    return xlsx_chunks(rows, columns)
@@ -0,0 +1,202 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from src.models.inventory import InventoryItem
+from src.models.job import Job
+from src.authz import check_permission, get_current_principal
+from src.spatial import within_radius, nearest
+
+geo_bp = Blueprint('geo', __name__)
+
+DEFAULT_RADIUS_KM = 20.0
+MAX_RADIUS_KM = 500.0
+MAX_RESULTS = 500
+MAX_NEAREST = 100
+
+def get_point():
+    """Read latitude/longitude query parameters, or None if either is missing"""
+    latitude = request.args.get('latitude', type=float)
+    longitude = request.args.get('longitude', type=float)
+    if latitude is None or longitude is None:
+        return None
+    return latitude, longitude
+
+def item_result(item, distance):
+    return {
+        'id': item.id,
+        'sku': item.sku,
+        'name': item.name,
+        'category': item.category,
+        'status': item.status,
+        'latitude': item.latitude,
+        'longitude': item.longitude,
+        'location_description': item.location_description,
+        'distance_km': round(distance, 3)
+    }
+
+def job_result(job, distance):
+    job_data = job.to_dict()
+    job_data['distance_km'] = round(distance, 3)
+    return job_data
+
+def item_query():
+    query = InventoryItem.query
+    if request.args.get('status'):
+        query = query.filter(InventoryItem.status == request.args['status'])
+    if request.args.get('category'):
+        query = query.filter(InventoryItem.category == request.args['category'])
+    return query
+
+def job_query():
+    """Jobs visible to the current dispatcher"""
+    user = get_current_principal()
+    query = Job.query
+    if user.role == 'foreman':
+        query = query.filter(
+            (Job.assigned_foreman == user.id) |
+            (Job.created_by == user.id)
+        )
+    if request.args.get('status'):
+        query = query.filter(Job.status == request.args['status'])
+    return query
+
+def bounded_arg(name, default, convert, maximum):
+    """A positive numeric query parameter no larger than maximum, as (value, error)"""
+    # Wide radii and large k scan and sort most of the table, so they are refused
+    value = request.args.get(name)
+    if value in (None, ''):
+        return default, None
+    try:
+        value = convert(value)
+    except ValueError:
+        return None, f'{name} must be a number'
+    if not 0 < value <= maximum:
+        return None, f'{name} must be greater than 0 and at most {maximum:g}'
+    return value, None
+
+def search_args(*args):
+    """Values of several bounded_arg specs, or the first error"""
+    values = []
+    for spec in args:
+        value, error = bounded_arg(*spec)
+        if error:
+            return None, error
+        values.append(value)
+    return values, None
+
+RADIUS_ARG = ('radius_km', DEFAULT_RADIUS_KM, float, MAX_RADIUS_KM)
+LIMIT_ARG = ('limit', 100, int, MAX_RESULTS)
+K_ARG = ('k', 10, int, MAX_NEAREST)
+
+@geo_bp.route('/inventory/nearby', methods=['GET'])
+@jwt_required()
+def get_nearby_inventory():
+    try:
+        point = get_point()
+        if point is None:
+            return jsonify({'error': 'latitude and longitude are required'}), 400
+        
+        values, error = search_args(RADIUS_ARG, LIMIT_ARG)
+        if error:
+            return jsonify({'error': error}), 400
+        radius_km, limit = values
+        results = within_radius(item_query(), InventoryItem, *point, radius_km, limit=limit)
+        
+        return jsonify({
+            'radius_km': radius_km,
+            'items': [item_result(item, distance) for item, distance in results]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geo_bp.route('/inventory/nearest', methods=['GET'])
+@jwt_required()
+def get_nearest_inventory():
+    try:
+        point = get_point()
+        if point is None:
+            return jsonify({'error': 'latitude and longitude are required'}), 400
+        
+        values, error = search_args(K_ARG)
+        if error:
+            return jsonify({'error': error}), 400
+        results = nearest(item_query(), InventoryItem, *point, *values)
+        
+        return jsonify({
+            'items': [item_result(item, distance) for item, distance in results]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geo_bp.route('/jobs/<int:job_id>/nearby-inventory', methods=['GET'])
+@jwt_required()
+@check_permission(['admin', 'foreman'])
+def get_inventory_near_job(job_id):
+    try:
+        job = job_query().filter(Job.id == job_id).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if job.latitude is None or job.longitude is None:
+            return jsonify({'error': 'Job has no location'}), 400
+        
+        values, error = search_args(RADIUS_ARG, LIMIT_ARG)
+        if error:
+            return jsonify({'error': error}), 400
+        radius_km, limit = values
+        results = within_radius(
+            item_query(), InventoryItem, job.latitude, job.longitude, radius_km, limit=limit
+        )
+        
+        return jsonify({
+            'job_id': job.id,
+            'radius_km': radius_km,
+            'items': [item_result(item, distance) for item, distance in results]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geo_bp.route('/jobs/nearby', methods=['GET'])
+@jwt_required()
+@check_permission(['admin', 'foreman'])
+def get_nearby_jobs():
+    try:
+        point = get_point()
+        if point is None:
+            return jsonify({'error': 'latitude and longitude are required'}), 400
+        
+        values, error = search_args(RADIUS_ARG, LIMIT_ARG)
+        if error:
+            return jsonify({'error': error}), 400
+        radius_km, limit = values
+        results = within_radius(job_query(), Job, *point, radius_km, limit=limit)
+        
+        return jsonify({
+            'radius_km': radius_km,
+            'jobs': [job_result(job, distance) for job, distance in results]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@geo_bp.route('/jobs/nearest', methods=['GET'])
+@jwt_required()
+@check_permission(['admin', 'foreman'])
+def get_nearest_jobs():
+    try:
+        point = get_point()
+        if point is None:
+            return jsonify({'error': 'latitude and longitude are required'}), 400
+        
+        values, error = search_args(K_ARG)
+        if error:
+            return jsonify({'error': error}), 400
+        results = nearest(job_query(), Job, *point, *values)
+        
+        return jsonify({
+            'jobs': [job_result(job, distance) for job, distance in results]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,45 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from src.models.user import db
+from src.authz import check_permission, get_current_principal
+from src.inventory_import import IMPORT_FORMATS, detect_format, iter_rows, import_inventory
+
+imports_bp = Blueprint('imports', __name__)
+
+@imports_bp.route('/inventory/import', methods=['POST'])
+@jwt_required()
+@check_permission(['admin', 'foreman'])
+def import_inventory_items():
+    """Import items from a CSV or NDJSON upload, sent raw or as the 'file' form field.
+
+    Bad rows are reported with their line numbers in the summary. The summary
+    comes back with 422 when no row could be imported.
+    """
+    try:
+        user = get_current_principal()
+        
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if not upload:
+                return jsonify({'error': 'file is required'}), 400
+            stream = upload.stream
+            import_format = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            import_format = request.args.get('format') or detect_format(content_type=request.mimetype)
+        
+        if import_format not in IMPORT_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(IMPORT_FORMATS)}"}), 400
+        
+        result = import_inventory(
+            iter_rows(stream, import_format),
+            created_by=user.id,
+            chunk_size=request.args.get('chunk_size', type=int)
+        )
+        
+        status = 422 if result.failed and not result.imported else 200
+        return jsonify(result.to_dict()), status
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -7,8 +7,8 @@ class InventoryItem(db.Model):
     sku = db.Column(db.String(100), unique=True, nullable=False)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    category = db.Column(db.String(100))
-    status = db.Column(db.String(50), nullable=False, default='available')  # available, in-use, damaged, lost, maintenance
+    category = db.Column(db.String(100), index=True)
+    status = db.Column(db.String(50), nullable=False, default='available', index=True)  # available, in-use, damaged, lost, maintenance
     condition = db.Column(db.String(200))
     purchase_price = db.Column(db.Float)
     current_value = db.Column(db.Float)
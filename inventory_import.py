@@ -0,0 +1,227 @@
+import csv
+import io
+import json
+import re
+import click
+from datetime import datetime
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.inventory import InventoryItem
+
+IMPORT_FORMATS = ['csv', 'ndjson']
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 10000
+
+# Only the first errors are returned so a bad 100k-row file cannot blow up the report
+MAX_REPORTED_ERRORS = 1000
+
+ITEM_STATUSES = ['available', 'in-use', 'damaged', 'lost', 'maintenance']
+
+TEXT_FIELDS = ['sku', 'name', 'description', 'category', 'status', 'condition', 'location_description']
+FLOAT_FIELDS = ['purchase_price', 'current_value', 'latitude', 'longitude']
+
+# Bytes that are not UTF-8 are decoded to lone surrogates, so a bad line fails on its own
+UNDECODABLE = re.compile('[\udc80-\udcff]')
+
+class RowError(ValueError):
+    """A single import row that cannot be turned into an item"""
+
+def import_chunk_size(requested=None):
+    size = requested or current_app.config.get('IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    return min(max(int(size), 1), MAX_CHUNK_SIZE)
+
+def detect_format(filename=None, content_type=None):
+    """Guess the import format from a file name or content type, defaulting to CSV"""
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if content_type and ('ndjson' in content_type or 'jsonl' in content_type):
+        return 'ndjson'
+    return 'csv'
+
+def iter_csv_rows(stream):
+    """Yield (line number, row dict or RowError) from a text stream of CSV, one row at a time"""
+    reader = csv.DictReader(stream)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # The reader has consumed the bad line, so the rest of the file still parses
+            yield reader.line_num, RowError(f'Invalid CSV: {e}')
+            continue
+        if any(UNDECODABLE.search(value) for value in row.values() if isinstance(value, str)):
+            yield reader.line_num, RowError('Row is not valid UTF-8')
+            continue
+        yield reader.line_num, row
+
+def iter_ndjson_rows(stream):
+    """Yield (line number, row dict or RowError) from a text stream of NDJSON"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        if UNDECODABLE.search(line):
+            yield line_number, RowError('Line is not valid UTF-8')
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, RowError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield line_number, RowError('Each line must be a JSON object')
+            continue
+        yield line_number, row
+
+def iter_rows(stream, import_format):
+    """Parse a binary stream incrementally in the given format"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='surrogateescape', newline='')
+    if import_format == 'ndjson':
+        return iter_ndjson_rows(text)
+    return iter_csv_rows(text)
+
+def clean_row(row, created_by=None, now=None):
+    """Validate a raw row and return the column values for a new InventoryItem"""
+    values = {}
+    for field in TEXT_FIELDS:
+        value = row.get(field)
+        if value is not None:
+            value = str(value).strip() or None
+        values[field] = value
+    for field in FLOAT_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        try:
+            values[field] = float(value) if value is not None else None
+        except (TypeError, ValueError):
+            raise RowError(f'{field} must be a number')
+    
+    if not values['sku']:
+        raise RowError('sku is required')
+    if not values['name']:
+        raise RowError('name is required')
+    values['status'] = values['status'] or 'available'
+    if values['status'] not in ITEM_STATUSES:
+        raise RowError(f"status must be one of {', '.join(ITEM_STATUSES)}")
+    if values['latitude'] is not None and not -90 <= values['latitude'] <= 90:
+        raise RowError('latitude must be between -90 and 90')
+    if values['longitude'] is not None and not -180 <= values['longitude'] <= 180:
+        raise RowError('longitude must be between -180 and 180')
+    
+    now = now or datetime.utcnow()
+    values.update(created_by=created_by, created_at=now, updated_at=now)
+    return values
+
+class ImportResult:
+    """Running totals and row-level errors of one import"""
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, error, sku=None):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'sku': sku, 'error': error})
+
+    def to_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+def _insert_rows(rows, result):
+    """Insert (line, values) rows with one executemany, isolating failures row by row"""
+    try:
+        db.session.execute(InventoryItem.__table__.insert(), [values for _, values in rows])
+        db.session.commit()
+        result.imported += len(rows)
+        return
+    except IntegrityError:
+        db.session.rollback()
+    
+    # Another writer raced us to some SKU in the chunk; retry each row on its own
+    for line, values in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(InventoryItem.__table__.insert(), values)
+            result.imported += 1
+        except IntegrityError:
+            result.add_error(line, 'sku already exists', values['sku'])
+    db.session.commit()
+
+def _import_chunk(chunk, result):
+    """Check SKU uniqueness for a chunk of (line, values) rows in one query and insert the rest"""
+    skus = {values['sku'] for _, values in chunk}
+    existing = {
+        sku for (sku,) in db.session.query(InventoryItem.sku).filter(InventoryItem.sku.in_(skus))
+    }
+    
+    rows = []
+    seen = set()
+    for line, values in chunk:
+        if values['sku'] in existing:
+            result.add_error(line, 'sku already exists', values['sku'])
+        elif values['sku'] in seen:
+            result.add_error(line, 'duplicate sku in file', values['sku'])
+        else:
+            seen.add(values['sku'])
+            rows.append((line, values))
+    
+    if rows:
+        _insert_rows(rows, result)
+
+def import_inventory(rows, created_by=None, chunk_size=None):
+    """Import an iterable of (line, row) pairs in chunks, collecting row-level errors.
+    
+    Each chunk is committed on its own, so memory stays bounded and a bad row
+    never rolls back the rest of the file.
+    """
+    chunk_size = import_chunk_size(chunk_size)
+    result = ImportResult()
+    
+    chunk = []
+    for line, row in rows:
+        result.processed += 1
+        try:
+            if isinstance(row, RowError):
+                raise row
+            chunk.append((line, clean_row(row, created_by)))
+        except RowError as e:
+            sku = row.get('sku') if isinstance(row, dict) else None
+            result.add_error(line, str(e), sku or None)
+            continue
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, result)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, result)
+    
+    return result
+
+@click.command('import-inventory')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), help='Defaults to the file extension.')
+@click.option('--chunk-size', type=int, help='Rows inserted per batch.')
+@click.option('--created-by', type=int, help='User id recorded as the creator of imported items.')
+@with_appcontext
+def import_inventory_command(path, import_format, chunk_size, created_by):
+    """Import inventory items from a CSV or NDJSON file."""
+    import_format = import_format or detect_format(filename=path)
+    with open(path, 'rb') as stream:
+        result = import_inventory(iter_rows(stream, import_format), created_by, chunk_size)
+    
+    for error in result.errors:
+        click.echo(f"line {error['line']}: {error['sku'] or '-'}: {error['error']}")
+    if result.failed > len(result.errors):
+        click.echo(f"... {result.failed - len(result.errors)} more errors not shown")
+    click.echo(f"Imported {result.imported} of {result.processed} rows, {result.failed} failed")
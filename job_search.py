@@ -0,0 +1,114 @@
+import re
+from src.models.user import db
+from src.models.job import Job
+
+# Relative weight of each indexed column, in index order
+SEARCH_COLUMNS = [
+    ('name', 10.0),
+    ('claim_id', 10.0),
+    ('description', 1.0),
+    ('customer_name', 5.0)
+]
+
+# Engine URL -> backend name, or None when full-text search is unavailable
+_backends = {}
+
+def _fts5_statements():
+    columns = ', '.join(column for column, _ in SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column, _ in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column, _ in SEARCH_COLUMNS)
+    delete_old = (
+        f"INSERT INTO job_search(job_search, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO job_search(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS job_search USING fts5({columns}, content='job', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS job_search_insert AFTER INSERT ON job BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS job_search_delete AFTER DELETE ON job BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS job_search_update AFTER UPDATE OF {columns} ON job "
+        f"BEGIN {delete_old} {insert_new} END",
+        "INSERT INTO job_search(job_search) VALUES ('rebuild')"
+    ]
+
+def _tsvector_statements():
+    weights = {10.0: 'A', 5.0: 'B', 1.0: 'C'}
+    vector = ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({column}, '')), '{weights[weight]}')"
+        for column, weight in SEARCH_COLUMNS
+    )
+    return [
+        f"ALTER TABLE job ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_job_search_vector ON job USING GIN (search_vector)"
+    ]
+
+def create_job_search_index(connection):
+    """Create the full-text index on jobs; triggers or a generated column keep it in sync.
+    
+    Returns False, leaving the migration to be retried by a later upgrade-db,
+    when this database cannot hold the index.
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        # SQLite builds without FTS5 keep using the LIKE fallback in apply_job_search
+        options = connection.exec_driver_sql('PRAGMA compile_options').scalars().all()
+        if 'ENABLE_FTS5' not in options:
+            return False
+        statements = _fts5_statements()
+    elif dialect == 'postgresql':
+        statements = _tsvector_statements()
+    else:
+        return False
+    
+    for statement in statements:
+        connection.execute(db.text(statement))
+
+def search_backend():
+    """Name the full-text backend available on the current database"""
+    engine = db.engine
+    if engine.url not in _backends:
+        backend = None
+        if engine.dialect.name == 'sqlite':
+            if db.inspect(engine).has_table('job_search'):
+                backend = 'fts5'
+        elif engine.dialect.name == 'postgresql':
+            columns = db.inspect(engine).get_columns('job')
+            if any(column['name'] == 'search_vector' for column in columns):
+                backend = 'tsvector'
+        _backends[engine.url] = backend
+    return _backends[engine.url]
+
+def search_tokens(term):
+    return re.findall(r'\w+', term.lower())
+
+def apply_job_search(query, term):
+    """Filter a Job query by a search term, returning (query, rank ordering or None)"""
+    tokens = search_tokens(term)
+    backend = search_backend() if tokens else None
+    
+    if backend == 'fts5':
+        # Every token must match as a prefix, so partial claim IDs like CLM-00 still hit
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+        matches = db.text(
+            f"SELECT rowid AS job_id, bm25(job_search, {weights}) AS rank "
+            "FROM job_search WHERE job_search MATCH :match"
+        ).bindparams(match=match).columns(
+            job_id=db.Integer, rank=db.Float
+        ).subquery('job_search_match')
+        query = query.join(matches, matches.c.job_id == Job.id)
+        return query, matches.c.rank.asc()
+    
+    if backend == 'tsvector':
+        search_vector = db.literal_column('job.search_vector')
+        ts_query = db.func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+        query = query.filter(search_vector.op('@@')(ts_query))
+        return query, db.func.ts_rank(search_vector, ts_query).desc()
+    
+    query = query.filter(
+        Job.name.contains(term) |
+        Job.claim_id.contains(term) |
+        Job.description.contains(term) |
+        Job.customer_name.contains(term)
+    )
+    return query, None
@@ -1,32 +1,103 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.user import User, db
+from src.models.user import db
 from src.models.job import Job
 from src.models.assignment import InventoryAssignment
+from src.authz import check_permission, get_current_principal
+from src.db_config import read_replica
+from src.job_search import apply_job_search
 from src.models.media import Media
+from src.models.dashboard_stats import DashboardStats, dashboard_payload, dashboard_scope, get_dashboard_stats_row
+from src.models.inventory import InventoryItem
+from src.conditional import conditional, table_version
+from src.query_shaping import ASSIGNMENT_DETAIL, ShapeError, job_query_options, parse_job_shape, shape_job
 from datetime import datetime
+import base64
+import json
 
 jobs_bp = Blueprint('jobs', __name__)
 
-def check_permission(required_roles):
-    """Decorator to check user permissions"""
-    def decorator(f):
-        def wrapper(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            if not user or user.role not in required_roles:
-                return jsonify({'error': 'Insufficient permissions'}), 403
-            return f(*args, **kwargs)
-        wrapper.__name__ = f.__name__
-        return wrapper
-    return decorator
+# Upper bound on page size in cursor pagination mode
+MAX_CURSOR_LIMIT = 100
+
+# Keyset order of cursor pagination; NULL priorities and creation dates sort last
+CURSOR_ORDER = [Job.priority, Job.created_at, Job.id]
+
+def encode_cursor(job):
+    """Encode a job's (priority, created_at, id) sort key as an opaque cursor; NULLs stay null"""
+    key = [job.priority, job.created_at.isoformat() if job.created_at else None, job.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor back into its sort key"""
+    priority, created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if priority is not None and not isinstance(priority, str):
+        raise ValueError('Invalid cursor')
+    return priority, datetime.fromisoformat(created_at) if created_at is not None else None, int(job_id)
+
+def keyset_after(columns, values):
+    """Rows after a sort key under ORDER BY column DESC NULLS LAST for each column.
+    
+    A tuple comparison never matches NULL, so nullable columns are expanded:
+    below a non-NULL value come smaller values and then every NULL; below a
+    NULL come only the remaining NULLs. The last column must not be nullable.
+    """
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value
+    rest = keyset_after(columns[1:], values[1:])
+    if value is None:
+        return column.is_(None) & rest
+    return (column < value) | column.is_(None) | ((column == value) & rest)
+
+def get_cursor_limit():
+    """Page size of cursor mode as (limit, error)"""
+    if request.args.get('limit', '') == '':
+        return 20, None
+    limit = request.args.get('limit', type=int)
+    if limit is None or not 1 <= limit <= MAX_CURSOR_LIMIT:
+        return None, f'limit must be an integer from 1 to {MAX_CURSOR_LIMIT}'
+    return limit, None
+
+def jobs_versions():
+    """Row versions behind the job list; technician visibility also follows their assignments"""
+    user = get_current_principal()
+    versions = [table_version(Job)]
+    if user.role == 'technician':
+        versions.append(table_version(InventoryAssignment, InventoryAssignment.user_id == user.id))
+    return versions
+
+def job_assignment_versions(job_id):
+    """Row versions behind a job's assignment list, including the items it names"""
+    item_ids = db.select(InventoryAssignment.item_id).where(InventoryAssignment.job_id == job_id)
+    return [
+        table_version(Job, Job.id == job_id),
+        table_version(InventoryAssignment, InventoryAssignment.job_id == job_id),
+        table_version(InventoryItem, InventoryItem.id.in_(item_ids))
+    ]
+
+def job_versions(job_id):
+    return job_assignment_versions(job_id) + [
+        table_version(Media, Media.job_id == job_id, column=Media.created_at)
+    ]
+
+def dashboard_versions():
+    scope = dashboard_scope(get_current_principal())
+    return [table_version(DashboardStats, DashboardStats.scope == scope[0], DashboardStats.scope_id == scope[1])]
 
 @jobs_bp.route('/jobs', methods=['GET'])
 @jwt_required()
+@conditional(jobs_versions)
 def get_jobs():
+    """List jobs, by page (page/per_page) or by cursor (after/limit).
+
+    A search is ranked by relevance, which the cursor's (priority,
+    created_at, id) order cannot follow, so search pages by page number and
+    combining search with after/limit is rejected with 400.
+    """
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_principal()
         
         # Get query parameters for filtering
         status = request.args.get('status')
@@ -35,14 +106,25 @@ def get_jobs():
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
         
+        # Cursor mode is opt-in via `after` (empty for the first page) or `limit`
+        cursor_mode = 'after' in request.args or 'limit' in request.args
+        if cursor_mode and search:
+            return jsonify({'error': 'search results are paged with page/per_page, not after/limit'}), 400
+        
+        # ?fields= and ?include= pick the columns and relationships to load
+        try:
+            fields, include = parse_job_shape(request.args)
+        except ShapeError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Build query based on user role
-        query = Job.query
+        query = Job.query.options(*job_query_options(fields, include))
         
         # Technicians can only see jobs they're assigned to
         if user.role == 'technician':
-            query = query.join(InventoryAssignment).filter(
+            query = query.filter(Job.assignments.any(
                 InventoryAssignment.user_id == current_user_id
-            ).distinct()
+            ))
         # Foremen can see jobs they're assigned to manage
         elif user.role == 'foreman':
             query = query.filter(
@@ -55,15 +137,16 @@ def get_jobs():
             query = query.filter(Job.status == status)
         if priority:
             query = query.filter(Job.priority == priority)
+        search_rank = None
         if search:
-            query = query.filter(
-                Job.name.contains(search) |
-                Job.claim_id.contains(search) |
-                Job.description.contains(search) |
-                Job.customer_name.contains(search)
-            )
+            query, search_rank = apply_job_search(query, search)
+        
+        if cursor_mode:
+            return get_jobs_page_after(query, request.args.get('after'), fields, include)
         
-        # Order by priority and creation date
+        # Best search matches first, then by priority and creation date
+        if search_rank is not None:
+            query = query.order_by(search_rank)
         query = query.order_by(
             Job.priority.desc(),
             Job.created_at.desc()
@@ -75,7 +158,7 @@ def get_jobs():
         )
         
         return jsonify({
-            'jobs': [job.to_dict() for job in jobs.items],
+            'jobs': [shape_job(job, fields, include) for job in jobs.items],
             'total': jobs.total,
             'pages': jobs.pages,
             'current_page': page,
@@ -85,13 +168,57 @@ def get_jobs():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def get_jobs_page_after(query, after, fields=None, include=()):
+    """Return the page of jobs following the `after` cursor using keyset pagination"""
+    limit, error = get_cursor_limit()
+    if error:
+        return jsonify({'error': error}), 400
+    include_total = request.args.get('include_total', 'false').lower() == 'true'
+    
+    total = query.count() if include_total else None
+    
+    if after:
+        try:
+            sort_key = decode_cursor(after)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(keyset_after(CURSOR_ORDER, sort_key))
+    
+    # Fetch one extra row to learn whether another page exists
+    jobs = query.order_by(
+        *[column.desc().nulls_last() for column in CURSOR_ORDER]
+    ).limit(limit + 1).all()
+    
+    has_more = len(jobs) > limit
+    jobs = jobs[:limit]
+    
+    response = {
+        'jobs': [shape_job(job, fields, include) for job in jobs],
+        'next_cursor': encode_cursor(jobs[-1]) if has_more else None,
+        'limit': limit
+    }
+    if include_total:
+        response['total'] = total
+    
+    return jsonify(response), 200
+
 @jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
 @jwt_required()
+@conditional(job_versions)
 def get_job(job_id):
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        job = Job.query.get_or_404(job_id)
+        user = get_current_principal()
+        
+        # The detail view includes assignments and media unless ?include= narrows it
+        try:
+            fields, include = parse_job_shape(request.args, default_include=['assignments', 'media'])
+        except ShapeError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        job = Job.query.options(*job_query_options(fields, include)).filter(Job.id == job_id).first()
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
         
         # Check permissions
         if user.role == 'technician':
@@ -105,12 +232,7 @@ def get_job(job_id):
             if job.assigned_foreman != current_user_id and job.created_by != current_user_id:
                 return jsonify({'error': 'Access denied'}), 403
         
-        # Include assignments and media
-        job_data = job.to_dict()
-        job_data['assignments'] = [assignment.to_dict() for assignment in job.assignments]
-        job_data['media'] = [media.to_dict() for media in job.media]
-        
-        return jsonify(job_data), 200
+        return jsonify(shape_job(job, fields, include)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -174,7 +296,7 @@ def create_job():
 def update_job(job_id):
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_principal()
         job = Job.query.get_or_404(job_id)
         
         # Check permissions for foremen
@@ -236,10 +358,11 @@ def delete_job(job_id):
 
 @jobs_bp.route('/jobs/<int:job_id>/assignments', methods=['GET'])
 @jwt_required()
+@conditional(job_assignment_versions)
 def get_job_assignments(job_id):
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_principal()
         job = Job.query.get_or_404(job_id)
         
         # Check permissions
@@ -253,7 +376,7 @@ def get_job_assignments(job_id):
             if job.assigned_foreman != current_user_id and job.created_by != current_user_id:
                 return jsonify({'error': 'Access denied'}), 403
         
-        assignments = InventoryAssignment.query.filter_by(job_id=job_id).all()
+        assignments = InventoryAssignment.query.options(*ASSIGNMENT_DETAIL).filter_by(job_id=job_id).all()
         
         return jsonify([assignment.to_dict() for assignment in assignments]), 200
         
@@ -262,50 +385,13 @@ def get_job_assignments(job_id):
 
 @jobs_bp.route('/jobs/dashboard', methods=['GET'])
 @jwt_required()
+@read_replica
+@conditional(dashboard_versions)
 def get_dashboard_stats():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        stats = {}
-        
-        if user.role in ['admin', 'finance']:
-            # Admin/Finance can see all stats
-            stats['total_jobs'] = Job.query.count()
-            stats['active_jobs'] = Job.query.filter_by(status='active').count()
-            stats['pending_jobs'] = Job.query.filter_by(status='pending').count()
-            stats['completed_jobs'] = Job.query.filter_by(status='completed').count()
-            stats['total_assignments'] = InventoryAssignment.query.count()
-            stats['active_assignments'] = InventoryAssignment.query.filter_by(status='checked_out').count()
-            
-        elif user.role == 'foreman':
-            # Foremen see stats for their jobs
-            foreman_jobs = Job.query.filter(
-                (Job.assigned_foreman == current_user_id) |
-                (Job.created_by == current_user_id)
-            )
-            stats['total_jobs'] = foreman_jobs.count()
-            stats['active_jobs'] = foreman_jobs.filter_by(status='active').count()
-            stats['pending_jobs'] = foreman_jobs.filter_by(status='pending').count()
-            stats['completed_jobs'] = foreman_jobs.filter_by(status='completed').count()
-            
-            job_ids = [job.id for job in foreman_jobs.all()]
-            stats['total_assignments'] = InventoryAssignment.query.filter(
-                InventoryAssignment.job_id.in_(job_ids)
-            ).count()
-            stats['active_assignments'] = InventoryAssignment.query.filter(
-                InventoryAssignment.job_id.in_(job_ids),
-                InventoryAssignment.status == 'checked_out'
-            ).count()
-            
-        else:  # technician
-            # Technicians see stats for their assignments
-            user_assignments = InventoryAssignment.query.filter_by(user_id=current_user_id)
-            stats['total_assignments'] = user_assignments.count()
-            stats['active_assignments'] = user_assignments.filter_by(status='checked_out').count()
-            
-            job_ids = [assignment.job_id for assignment in user_assignments.all()]
-            stats['total_jobs'] = len(set(job_ids))
+        # Admin/finance see global stats, foremen their jobs, technicians their assignments
+        scope, scope_id = dashboard_scope(get_current_principal())
+        stats = dashboard_payload(scope, get_dashboard_stats_row(scope, scope_id).to_dict())
         
         return jsonify(stats), 200
         
@@ -313,18 +399,12 @@ def get_dashboard_stats():
         return jsonify({'error': str(e)}), 500
 
 @jobs_bp.route('/jobs/dashboard-temp', methods=['GET'])
+@read_replica
 def get_dashboard_stats_temp():
     """Temporary dashboard endpoint without JWT for testing"""
     try:
-        stats = {}
-        
         # Return basic stats for testing
-        stats['total_jobs'] = Job.query.count()
-        stats['active_jobs'] = Job.query.filter_by(status='active').count()
-        stats['pending_jobs'] = Job.query.filter_by(status='pending').count()
-        stats['completed_jobs'] = Job.query.filter_by(status='completed').count()
-        stats['total_assignments'] = InventoryAssignment.query.count()
-        stats['active_assignments'] = InventoryAssignment.query.filter_by(status='checked_out').count()
+        stats = get_dashboard_stats_row('global').to_dict()
         
         return jsonify(stats), 200
         
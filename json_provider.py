@@ -0,0 +1,70 @@
+import json
+import re
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+# orjson writes UTF-8; runs of non-ASCII bytes are whole characters, only ever inside strings
+NON_ASCII = re.compile(rb'[\x80-\xff]+')
+
+def escape_non_ascii(data):
+    """Escape non-ASCII characters in encoded JSON as \\uXXXX, as the stdlib's ensure_ascii does"""
+    if data.isascii():
+        return data
+    return NON_ASCII.sub(lambda match: json.dumps(match.group().decode())[1:-1].encode(), data)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson when it is installed.
+    
+    Dates and datetimes are written as ISO 8601 on both paths, so views can
+    return them as-is instead of calling isoformat() on every field.
+
+    orjson emits UTF-8, so while ensure_ascii is set (Flask's default) its
+    output is post-processed to escape non-ASCII characters the way the
+    stdlib encoder does. Two differences remain on the orjson path: NaN and
+    Infinity are written as null, and large floats keep orjson's exponent
+    form (1e20 rather than 1e+20).
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (date, datetime, time)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def _orjson_options(self, pretty=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _orjson_dumps(self, obj, pretty=False):
+        data = orjson.dumps(obj, default=self.default, option=self._orjson_options(pretty))
+        return escape_non_ascii(data) if self.ensure_ascii else data
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        # Hand orjson's bytes straight to the response rather than round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self._orjson_dumps(obj, pretty) + b'\n',
+            mimetype=self.mimetype
+        )
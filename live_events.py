@@ -0,0 +1,195 @@
+import json
+import queue
+from threading import Lock
+from sqlalchemy import event, inspect, tuple_
+from src.models.user import db
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+from src.models.dashboard_stats import DashboardStats, GLOBAL_SCOPE, dashboard_payload
+
+class Subscription:
+    """One open event stream: a bounded queue of encoded messages for a set of channels"""
+
+    def __init__(self, channels, maxsize):
+        self.channels = frozenset(channels)
+        self.messages = queue.Queue(maxsize)
+        self.overflowed = False
+        self.closed = False
+
+    def put(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            # A stalled client falls behind; rather than buffer without bound, tell it to resync
+            self.overflowed = True
+
+    def get(self, timeout):
+        """The next message, or None once the timeout passes with nothing to send"""
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class EventHub:
+    """Fans change events out to the event streams subscribed to their channels.
+
+    Channels are dashboard scopes: ('global', 0) for admin and finance,
+    ('foreman', id) and ('technician', id) for everyone else. Each event is
+    encoded once and the same bytes are queued for every subscriber, so one
+    commit costs one notification however many dashboards are open.
+
+    The hub lives in the process. Behind several worker processes each
+    stream only hears about commits made by its own process.
+    """
+
+    def __init__(self, queue_size=100, max_streams=None):
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self._subscriptions = {}
+        self._streams = 0
+        self._lock = Lock()
+
+    def subscribe(self, channels):
+        """A new subscription, or None once max_streams are already open"""
+        subscription = Subscription(channels, self.queue_size)
+        with self._lock:
+            if self.max_streams is not None and self._streams >= self.max_streams:
+                return None
+            self._streams += 1
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._streams -= 1
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def has_subscribers(self, channels=None):
+        """Whether anyone listens on any of the channels (or on any channel at all)"""
+        with self._lock:
+            if channels is None:
+                return bool(self._subscriptions)
+            return any(channel in self._subscriptions for channel in channels)
+
+    def publish(self, channels, event_type, data):
+        """Queue one event for every subscriber of any of the channels"""
+        with self._lock:
+            subscribers = set().union(*[self._subscriptions.get(channel, ()) for channel in channels])
+        if not subscribers:
+            return 0
+        message = encode_event(event_type, data)
+        for subscription in subscribers:
+            subscription.put(message)
+        return len(subscribers)
+
+event_hub = EventHub()
+
+def init_event_hub(app):
+    """Size the per-stream queues from the app configuration"""
+    app.config.setdefault('EVENT_QUEUE_SIZE', 100)
+    app.config.setdefault('EVENT_STREAM_HEARTBEAT', 15)
+    app.config.setdefault('EVENT_STREAM_MAX_AGE', 30 * 60)
+    app.config.setdefault('EVENT_STREAM_LIMIT', 50)
+    event_hub.queue_size = app.config['EVENT_QUEUE_SIZE']
+    event_hub.max_streams = app.config['EVENT_STREAM_LIMIT']
+    app.extensions['event_hub'] = event_hub
+
+def encode_event(event_type, data):
+    """One Server-Sent Events message"""
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+def job_channels(session, jobs):
+    """Channels allowed to see each job: global, its foremen and technicians assigned to it"""
+    channels = {job_id: {GLOBAL_SCOPE} for job_id in jobs}
+    for job_id, foremen in jobs.items():
+        channels[job_id].update(('foreman', user_id) for user_id in foremen if user_id is not None)
+    rows = session.execute(
+        db.select(InventoryAssignment.job_id, InventoryAssignment.user_id).where(
+            InventoryAssignment.job_id.in_(list(jobs))
+        ).distinct()
+    )
+    for job_id, user_id in rows:
+        channels[job_id].add(('technician', user_id))
+    return channels
+
+def _previous(job, attr):
+    history = inspect(job).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(job, attr)
+
+@event.listens_for(db.session, 'after_flush')
+def note_job_status_changes(session, flush_context):
+    """Collect job status changes to push once the transaction commits"""
+    if not event_hub.has_subscribers():
+        return
+
+    changes = {}
+    for job in session.new:
+        if isinstance(job, Job):
+            changes[job.id] = (job, None, job.status)
+    for job in session.dirty:
+        if isinstance(job, Job) and inspect(job).attrs.status.history.has_changes():
+            changes[job.id] = (job, _previous(job, 'status'), job.status)
+    for job in session.deleted:
+        if isinstance(job, Job):
+            changes[job.id] = (job, _previous(job, 'status'), None)
+    if not changes:
+        return
+
+    # A reassigned job is announced to the foreman losing it as well as the one gaining it
+    foremen = {
+        job_id: {job.assigned_foreman, job.created_by, _previous(job, 'assigned_foreman')}
+        for job_id, (job, _, _) in changes.items()
+    }
+    with session.no_autoflush:
+        channels = job_channels(session, foremen)
+
+    pending = session.info.setdefault('live_events', [])
+    for job_id, (job, previous_status, status) in changes.items():
+        pending.append((channels[job_id], 'job_status', {
+            'id': job_id,
+            'name': job.name,
+            'status': status,
+            'previous_status': previous_status,
+            'deleted': status is None
+        }))
+
+def publish_dashboard_scopes(scopes):
+    """Push the committed counters of each touched scope to its subscribers"""
+    scopes = [scope for scope in scopes if event_hub.has_subscribers([scope])]
+    if not scopes:
+        return
+
+    # One read of the committed counters, on its own connection, however many streams are open
+    table = DashboardStats.__table__
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            db.select(table).where(tuple_(table.c.scope, table.c.scope_id).in_(scopes))
+        ).mappings().all()
+    for row in rows:
+        scope = (row['scope'], row['scope_id'])
+        event_hub.publish([scope], 'dashboard', dashboard_payload(row['scope'], row))
+
+@event.listens_for(db.session, 'after_commit')
+def publish_live_events(session):
+    scopes = session.info.pop('dashboard_scopes', None)
+    events = session.info.pop('live_events', None)
+    if scopes:
+        publish_dashboard_scopes(scopes)
+    for channels, event_type, data in events or ():
+        event_hub.publish(channels, event_type, data)
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_live_events(session):
+    session.info.pop('dashboard_scopes', None)
+    session.info.pop('live_events', None)
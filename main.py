@@ -14,6 +14,22 @@ from src.models.inventory import InventoryItem
 from src.models.job import Job
 from src.models.assignment import InventoryAssignment
 from src.models.media import Media
+from src.models.dashboard_stats import DashboardStats, reconcile_dashboard_stats_command
+from src.models.tombstones import SyncTombstone, prune_tombstones_command
+from src.models.usage_rollup import DailyUsageRollup, refresh_usage_rollups_command
+from src.report_queue import ReportJob, init_report_queue, prune_report_jobs_command
+from src.overdue import AssignmentDue, OverdueAlert, init_overdue_scheduler, scan_overdue_command
+from src.media_processing import MediaUpload, MediaVariant, init_media, prune_media_uploads_command
+from src.migrations import upgrade_database, upgrade_db_command
+from src.inventory_import import import_inventory_command
+from src.authz import init_authz
+from src.report_cache import init_report_cache
+from src.live_events import init_event_hub
+from src.db_config import configure_database
+from src.compression import init_compression
+from src.metrics import init_metrics, install_pool_metrics
+from src.profiling import RequestProfile, SlowQuery, init_profiler, prune_profiles_command
+from src.json_provider import FastJSONProvider
 
 # Import all routes
 from src.routes.user import user_bp
@@ -21,8 +37,18 @@ from src.routes.auth import auth_bp
 from src.routes.inventory import inventory_bp
 from src.routes.jobs import jobs_bp
 from src.routes.reports import reports_bp
+from src.routes.geo import geo_bp
+from src.routes.checkout import checkout_bp
+from src.routes.imports import imports_bp
+from src.routes.sync import sync_bp
+from src.routes.report_jobs import report_jobs_bp
+from src.routes.media_uploads import media_uploads_bp
+from src.routes.stream import stream_bp
+from src.routes.monitoring import monitoring_bp
+from src.routes.profiles import profiles_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+app.json = FastJSONProvider(app)
 
 
 # Configuration
@@ -33,12 +59,54 @@ app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
 app.config['JWT_CSRF_CHECK_FORM'] = False
 app.config['JWT_CSRF_IN_COOKIES'] = False
 app.config['JWT_ALGORITHM'] = 'HS256'
+app.config['JWT_ROLE_CLAIMS'] = True  # Carry the user's role in access tokens for clients; authz rechecks the account
+app.config['AUTHZ_CACHE_SIZE'] = 1024
+app.config['AUTHZ_CACHE_TTL'] = 60  # Seconds a resolved user role and status are reused
+app.config['REPORT_CACHE_SIZE'] = 128
+app.config['REPORT_CACHE_TTL'] = 60  # Seconds a rendered report is reused absent local writes; bounds staleness across processes
+app.config['IMPORT_CHUNK_SIZE'] = 1000  # Rows per batch in bulk inventory imports
+app.config['SYNC_TOMBSTONE_RETENTION_DAYS'] = 30  # Offline clients older than this must resync fully
+app.config['SYNC_OVERLAP_SECONDS'] = 120  # Longer than any write transaction, so late commits are still synced
+app.config['COMPRESS_MIN_SIZE'] = 1024  # Smaller responses are sent uncompressed
+app.config['REPORT_WORKERS'] = 2  # Background threads generating queued reports
+app.config['REPORT_JOBS_PER_USER'] = 2  # Queued or running report jobs allowed per user
+app.config['OVERDUE_SCAN_INTERVAL'] = 60  # Longest wait between overdue scans; 0 leaves scanning to cron
+app.config['MEDIA_STORAGE'] = os.environ.get('MEDIA_STORAGE', 'local')  # local or s3 (MEDIA_S3_BUCKET)
+app.config['MEDIA_S3_BUCKET'] = os.environ.get('MEDIA_S3_BUCKET')
+app.config['MEDIA_CHUNK_SIZE'] = 8 * 1024 * 1024  # Largest upload chunk; clients may ask for smaller
+app.config['MEDIA_WORKERS'] = 2  # Background threads rendering thumbnails and previews
+app.config['EVENT_QUEUE_SIZE'] = 100  # Events buffered per stream before a slow client is told to resync
+app.config['EVENT_STREAM_HEARTBEAT'] = 15  # Seconds between keep-alives on an idle event stream
+app.config['EVENT_STREAM_MAX_AGE'] = 30 * 60  # Seconds before a stream closes and the client reconnects
+app.config['EVENT_STREAM_LIMIT'] = 50  # Open event streams per process; each holds a worker thread or greenlet
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # Bearer token /metrics requires
+app.config['METRICS_PUBLIC'] = os.environ.get('METRICS_PUBLIC', '').lower() in ('1', 'true')  # Serve /metrics without a token
+app.config['SLOW_QUERY_MS'] = 500  # Statements slower than this go to the slow-query log
+app.config['PROFILE_SAMPLE_RATE'] = 0.0  # Share of jobs/reports requests profiled without a token
 
 # Enable CORS for all routes
 CORS(app, origins="*")
 
+# Request latency, SQL cost and response size metrics, served on /metrics
+init_metrics(app)
+
+# Admin-requested or sampled request profiles, and the slow-query log
+init_profiler(app)
+
+# Compress JSON and CSV responses above COMPRESS_MIN_SIZE bytes
+init_compression(app)
+
+# Background workers for queued report jobs
+init_report_queue(app)
+
+# Media storage and the thumbnail worker pool
+init_media(app)
+
 # Initialize JWT
 jwt = JWTManager(app)
+init_authz(app)
+init_report_cache(app)
+init_event_hub(app)
 
 # Register blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
@@ -46,15 +114,38 @@ app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(inventory_bp, url_prefix='/api')
 app.register_blueprint(jobs_bp, url_prefix='/api')
 app.register_blueprint(reports_bp, url_prefix='/api')
+app.register_blueprint(geo_bp, url_prefix='/api')
+app.register_blueprint(checkout_bp, url_prefix='/api')
+app.register_blueprint(imports_bp, url_prefix='/api')
+app.register_blueprint(sync_bp, url_prefix='/api')
+app.register_blueprint(report_jobs_bp, url_prefix='/api')
+app.register_blueprint(media_uploads_bp, url_prefix='/api')
+app.register_blueprint(stream_bp, url_prefix='/api')
+app.register_blueprint(monitoring_bp)
+app.register_blueprint(profiles_bp, url_prefix='/api')
+
+# CLI commands
+app.cli.add_command(reconcile_dashboard_stats_command)
+app.cli.add_command(upgrade_db_command)
+app.cli.add_command(import_inventory_command)
+app.cli.add_command(prune_tombstones_command)
+app.cli.add_command(prune_report_jobs_command)
+app.cli.add_command(refresh_usage_rollups_command)
+app.cli.add_command(scan_overdue_command)
+app.cli.add_command(prune_media_uploads_command)
+app.cli.add_command(prune_profiles_command)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+configure_database(
+    app,
+    default_uri=f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
+install_pool_metrics(app)
 
 # Create tables
 with app.app_context():
     db.create_all()
+    upgrade_database()
     
     # Create default admin user if it doesn't exist
     admin_user = db.session.query(User).filter_by(username='admin').first()
@@ -71,6 +162,10 @@ with app.app_context():
         db.session.commit()
         print("Default admin user created: admin/admin123")
 
+# Fire overdue alerts in the background once the tables exist; the scanner
+# starts with the first request, so CLI commands never run one
+init_overdue_scheduler(app)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -0,0 +1,205 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from src.models.user import db
+from src.media_storage import make_media_store
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images get no thumbnails
+    Image = None
+
+# Variant kind -> longest edge in pixels
+VARIANT_SIZES = {
+    'thumbnail': 320,
+    'preview': 1280
+}
+
+UPLOAD_STATUSES = ['uploading', 'finalizing', 'complete', 'aborted']
+
+class MediaUpload(db.Model):
+    """One resumable chunked upload of a job photo or video"""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    mime_type = db.Column(db.String(100), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # bytes stored so far
+    storage_key = db.Column(db.String(300), nullable=False)
+    storage_handle = db.Column(db.String(300))  # backend's id for the upload in progress
+    part_tags = db.Column(db.Text, default='{}')  # JSON {part number: tag}
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading, finalizing, complete, aborted
+    media_id = db.Column(db.Integer, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    @property
+    def tags(self):
+        return {int(part): tag for part, tag in json.loads(self.part_tags or '{}').items()}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'filename': self.filename,
+            'mime_type': self.mime_type,
+            'size': self.total_size,
+            'chunk_size': self.chunk_size,
+            'offset': self.received,
+            'status': self.status,
+            'media_id': self.media_id,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+class MediaVariant(db.Model):
+    """A thumbnail or preview generated from an uploaded media file"""
+    media_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    kind = db.Column(db.String(20), primary_key=True)  # thumbnail, preview
+    storage_key = db.Column(db.String(300))
+    mime_type = db.Column(db.String(100))
+    size = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, ready, failed, unsupported
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {'kind': self.kind, 'status': self.status, 'mime_type': self.mime_type, 'size': self.size}
+
+class MediaProcessor:
+    """Media storage plus the worker pool that renders thumbnails and previews.
+
+    Like the report queue, the broker is anything with an Executor-style
+    submit(fn, *args), by default a small thread pool, so image decoding and
+    ffmpeg never run on a request thread.
+    """
+
+    def __init__(self, app=None, broker=None, store=None):
+        self.broker = broker
+        self.store = store
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, broker=None, store=None):
+        app.config.setdefault('MEDIA_STORAGE', 'local')
+        app.config.setdefault('MEDIA_ROOT', os.path.join(app.instance_path, 'media'))
+        app.config.setdefault('MEDIA_WORKERS', 2)
+        app.config.setdefault('MEDIA_CHUNK_SIZE', 8 * 1024 * 1024)
+        app.config.setdefault('MEDIA_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+        app.config.setdefault('MEDIA_UPLOAD_EXPIRY_HOURS', 48)
+        self.broker = broker or self.broker or ThreadPoolExecutor(
+            max_workers=app.config['MEDIA_WORKERS'], thread_name_prefix='media-worker'
+        )
+        self.store = store or self.store or make_media_store(app)
+        app.extensions['media_processor'] = self
+
+    def submit(self, media_id):
+        """Queue thumbnail and preview generation for a committed media row"""
+        self.broker.submit(generate_variants, current_app._get_current_object(), media_id)
+
+media_processor = MediaProcessor()
+
+def init_media(app, broker=None, store=None):
+    media_processor.init_app(app, broker, store)
+
+def variant_key(media_id, kind, extension):
+    return f'variants/{media_id}/{kind}.{extension}'
+
+def _image_variant(source_path, size):
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        output = io.BytesIO()
+        image.convert('RGB').save(output, 'JPEG', quality=80, optimize=True)
+    return output.getvalue(), 'image/jpeg', 'jpg'
+
+def _video_variant(source_path, kind, size, workdir):
+    """Poster frame for the thumbnail, a small web-playable MP4 for the preview"""
+    if kind == 'thumbnail':
+        output = os.path.join(workdir, 'thumbnail.jpg')
+        command = [
+            'ffmpeg', '-y', '-loglevel', 'error', '-ss', '1', '-i', source_path,
+            '-frames:v', '1', '-vf', f'scale={size}:{size}:force_original_aspect_ratio=decrease', output
+        ]
+        mime_type, extension = 'image/jpeg', 'jpg'
+    else:
+        output = os.path.join(workdir, 'preview.mp4')
+        command = [
+            'ffmpeg', '-y', '-loglevel', 'error', '-i', source_path,
+            '-vf', 'scale=-2:480', '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '30',
+            '-c:a', 'aac', '-b:a', '64k', '-movflags', '+faststart', output
+        ]
+        mime_type, extension = 'video/mp4', 'mp4'
+    subprocess.run(command, check=True, capture_output=True, timeout=600)
+    with open(output, 'rb') as result:
+        return result.read(), mime_type, extension
+
+def generate_variants(app, media_id):
+    """Worker entry point: render every pending variant of one media file"""
+    with app.app_context():
+        upload = MediaUpload.query.filter_by(media_id=media_id).first()
+        variants = MediaVariant.query.filter_by(media_id=media_id, status='pending').all()
+        if upload is None or not variants:
+            return
+
+        store = media_processor.store
+        with tempfile.TemporaryDirectory() as workdir:
+            source_path = store.local_path(upload.storage_key)
+            if source_path is None:
+                # Object stores are read once into a scratch file that Pillow and ffmpeg can seek
+                source_path = os.path.join(workdir, 'source')
+                with store.open_read(upload.storage_key) as source, open(source_path, 'wb') as output:
+                    shutil.copyfileobj(source, output)
+
+            for variant in variants:
+                try:
+                    size = VARIANT_SIZES[variant.kind]
+                    if upload.mime_type.startswith('image/') and Image is not None:
+                        data, mime_type, extension = _image_variant(source_path, size)
+                    elif upload.mime_type.startswith('video/') and shutil.which('ffmpeg'):
+                        data, mime_type, extension = _video_variant(source_path, variant.kind, size, workdir)
+                    else:
+                        variant.status = 'unsupported'
+                        continue
+                    variant.storage_key = variant_key(media_id, variant.kind, extension)
+                    store.save(variant.storage_key, data)
+                    variant.mime_type = mime_type
+                    variant.size = len(data)
+                    variant.status = 'ready'
+                except Exception as e:
+                    variant.status = 'failed'
+                    variant.error = str(e)
+                db.session.commit()
+        db.session.commit()
+
+def prune_media_uploads(expiry_hours):
+    """Abort uploads left unfinished longer than the expiry window"""
+    cutoff = datetime.utcnow() - timedelta(hours=expiry_hours)
+    uploads = MediaUpload.query.filter(
+        MediaUpload.status == 'uploading',
+        MediaUpload.updated_at < cutoff
+    ).all()
+    for upload in uploads:
+        media_processor.store.abort_upload(upload.storage_key, upload.storage_handle)
+        upload.status = 'aborted'
+    db.session.commit()
+    return len(uploads)
+
+@click.command('prune-media-uploads')
+@click.option('--hours', type=int, help='Abort uploads idle this long (defaults to MEDIA_UPLOAD_EXPIRY_HOURS).')
+@with_appcontext
+def prune_media_uploads_command(hours):
+    """Abort abandoned chunked uploads and free their partial data."""
+    hours = hours or current_app.config['MEDIA_UPLOAD_EXPIRY_HOURS']
+    click.echo(f"Aborted {prune_media_uploads(hours)} uploads idle for {hours} hours")
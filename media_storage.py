@@ -0,0 +1,175 @@
+import os
+import tempfile
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 is optional; only the S3 backend needs it
+    boto3 = None
+
+# Bytes copied per read when streaming a request body to storage
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Smallest part an S3 multipart upload accepts, other than the last
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+class LocalMediaStore:
+    """Media kept as files under one directory.
+
+    An upload in progress is a single .part file that each chunk is written
+    into at its offset, renamed into place once complete.
+    """
+
+    min_part_size = 1
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def _upload_path(self, upload_id):
+        return os.path.join(self.root, 'uploads', f'{upload_id}.part')
+
+    def start_upload(self, key, upload_id, mime_type):
+        path = self._upload_path(upload_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+        return upload_id
+
+    def write_part(self, key, handle, part_number, offset, stream, length):
+        """Copy exactly length bytes from stream into the upload at offset, returning a part tag"""
+        with open(self._upload_path(handle), 'r+b') as output:
+            output.seek(offset)
+            remaining = length
+            while remaining:
+                chunk = stream.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise IOError('Upload body ended early')
+                output.write(chunk)
+                remaining -= len(chunk)
+            # Drop anything left over from an earlier, interrupted attempt at this part
+            output.truncate(offset + length)
+        return str(part_number)
+
+    def complete_upload(self, key, handle, part_tags):
+        """Move the upload into place; a retry after the move already happened is a no-op"""
+        path = self.path(key)
+        if not os.path.exists(self._upload_path(handle)) and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self._upload_path(handle), path)
+
+    def abort_upload(self, key, handle):
+        if os.path.exists(self._upload_path(handle)):
+            os.remove(self._upload_path(handle))
+
+    def open_read(self, key):
+        return open(self.path(key), 'rb')
+
+    def save(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(data)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def local_path(self, key):
+        """Filesystem path of a stored object, for send_file and external tools"""
+        return self.path(key)
+
+    def delete(self, key):
+        if self.exists(key):
+            os.remove(self.path(key))
+
+class S3MediaStore:
+    """Media kept in an S3 (or S3-compatible) bucket, uploaded through S3 multipart uploads.
+
+    Each chunk of a resumable upload becomes one S3 part, so chunks other
+    than the last must be at least 5 MiB.
+    """
+
+    min_part_size = S3_MIN_PART_SIZE
+
+    def __init__(self, bucket, prefix='', client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client or boto3.client('s3')
+
+    def _key(self, key):
+        return f'{self.prefix}{key}'
+
+    def start_upload(self, key, upload_id, mime_type):
+        response = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=self._key(key), ContentType=mime_type
+        )
+        return response['UploadId']
+
+    def write_part(self, key, handle, part_number, offset, stream, length):
+        # botocore needs a seekable body to checksum and retry, so spool the part to disk first
+        with tempfile.SpooledTemporaryFile(max_size=COPY_CHUNK_SIZE * 16) as part:
+            remaining = length
+            while remaining:
+                chunk = stream.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise IOError('Upload body ended early')
+                part.write(chunk)
+                remaining -= len(chunk)
+            part.seek(0)
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=self._key(key), UploadId=handle,
+                PartNumber=part_number, Body=part, ContentLength=length
+            )
+        return response['ETag']
+
+    def complete_upload(self, key, handle, part_tags):
+        """Assemble the parts; a retry after S3 already completed the upload is a no-op"""
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self._key(key), UploadId=handle,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': part_number, 'ETag': tag} for part_number, tag in sorted(part_tags.items())
+                ]}
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'NoSuchUpload' or not self.exists(key):
+                raise
+
+    def abort_upload(self, key, handle):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=handle)
+
+    def open_read(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+
+    def save(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError:
+            return False
+        return True
+
+    def local_path(self, key):
+        return None
+
+    def download_url(self, key, expires_in=300, as_attachment=False):
+        """Short-lived URL the client fetches directly; S3 serves Range requests itself"""
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if as_attachment:
+            params.update(ResponseContentType='application/octet-stream', ResponseContentDisposition='attachment')
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+def make_media_store(app):
+    """Storage backend selected by MEDIA_STORAGE ('local' or 's3')"""
+    if app.config['MEDIA_STORAGE'] == 's3':
+        if boto3 is None:
+            raise RuntimeError('MEDIA_STORAGE=s3 needs boto3 installed')
+        return S3MediaStore(app.config['MEDIA_S3_BUCKET'], app.config.get('MEDIA_S3_PREFIX', ''))
+    return LocalMediaStore(app.config['MEDIA_ROOT'])
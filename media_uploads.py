@@ -0,0 +1,332 @@
+from flask import Blueprint, current_app, jsonify, redirect, request, send_file, url_for
+from flask_jwt_extended import jwt_required
+from werkzeug.http import parse_options_header
+from werkzeug.utils import secure_filename
+from src.models.user import db
+from src.models.job import Job
+from src.models.media import Media
+from src.models.assignment import InventoryAssignment
+from src.authz import get_current_principal
+from src.media_processing import MediaUpload, MediaVariant, VARIANT_SIZES, media_processor
+import json
+import os
+
+media_uploads_bp = Blueprint('media_uploads', __name__)
+
+# Site photos and video only. Stored types are served back as Content-Type, so anything a
+# browser could run (SVG, HTML) must never get in; types are matched exactly, not by prefix.
+ALLOWED_MIME_TYPES = {
+    'image/jpeg', 'image/png', 'image/webp', 'image/gif', 'image/heic', 'image/heif',
+    'video/mp4', 'video/quicktime', 'video/webm', 'video/3gpp'
+}
+
+def normalize_mime_type(value):
+    """The bare, lower-cased type of a Content-Type style value if it is allowed, else None"""
+    if not isinstance(value, str):
+        return None
+    mime_type = parse_options_header(value.strip())[0].strip().lower()
+    return mime_type if mime_type in ALLOWED_MIME_TYPES else None
+
+def job_access_error(user, job, uploading=False):
+    """Error message if the user may not see (or add media to) this job, else None"""
+    if user.role == 'admin':
+        return None
+    if user.role == 'finance':
+        return 'Insufficient permissions' if uploading else None
+    if user.role == 'foreman':
+        if user.id not in (job.assigned_foreman, job.created_by):
+            return 'Access denied'
+        return None
+    assigned = db.session.query(InventoryAssignment.id).filter_by(job_id=job.id, user_id=user.id).first()
+    return None if assigned else 'Access denied'
+
+def get_owned_upload(upload_id):
+    """An upload the current user started (or any, for admins), or None"""
+    user = get_current_principal()
+    upload = db.session.get(MediaUpload, upload_id)
+    if upload is None or (upload.user_id != user.id and user.role != 'admin'):
+        return None
+    return upload
+
+def upload_result(upload):
+    upload_data = upload.to_dict()
+    upload_data['upload_url'] = url_for('media_uploads.upload_part', upload_id=upload.id)
+    return upload_data
+
+def upload_response(upload, status=200, **extra):
+    response = jsonify(dict(upload_result(upload), **extra))
+    # Upload-Offset lets a client resume with a HEAD request alone
+    response.headers['Upload-Offset'] = str(upload.received)
+    response.headers['Cache-Control'] = 'no-store'
+    return response, status
+
+def media_result(media):
+    media_data = media.to_dict()
+    media_data['content_url'] = url_for('media_uploads.get_media_content', media_id=media.id)
+    media_data['variants'] = {
+        variant.kind: dict(
+            variant.to_dict(),
+            url=url_for('media_uploads.get_media_content', media_id=media.id, variant=variant.kind)
+        )
+        for variant in MediaVariant.query.filter_by(media_id=media.id)
+    }
+    return media_data
+
+@media_uploads_bp.route('/jobs/<int:job_id>/media/uploads', methods=['POST'])
+@jwt_required()
+def start_media_upload(job_id):
+    try:
+        user = get_current_principal()
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        error = job_access_error(user, job, uploading=True)
+        if error:
+            return jsonify({'error': error}), 403
+
+        data = request.json or {}
+        filename = secure_filename(data.get('filename') or '')
+        if not filename:
+            return jsonify({'error': 'filename is required'}), 400
+        mime_type = normalize_mime_type(data.get('mime_type'))
+        if mime_type is None:
+            return jsonify({'error': f"mime_type must be one of {', '.join(sorted(ALLOWED_MIME_TYPES))}"}), 400
+
+        max_size = current_app.config['MEDIA_MAX_SIZE']
+        try:
+            total_size = int(data.get('size'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'size must be the file size in bytes'}), 400
+        if not 0 < total_size <= max_size:
+            return jsonify({'error': f'size must be between 1 and {max_size} bytes'}), 400
+
+        # Clients on weak links may ask for smaller chunks, down to what the storage backend allows
+        store = media_processor.store
+        default_chunk_size = current_app.config['MEDIA_CHUNK_SIZE']
+        try:
+            chunk_size = int(data.get('chunk_size') or default_chunk_size)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'chunk_size must be an integer'}), 400
+        chunk_size = max(min(chunk_size, default_chunk_size), store.min_part_size)
+
+        upload = MediaUpload(
+            job_id=job.id,
+            user_id=user.id,
+            filename=filename,
+            mime_type=mime_type,
+            total_size=total_size,
+            chunk_size=min(chunk_size, total_size),
+            storage_key=''
+        )
+        db.session.add(upload)
+        db.session.flush()
+
+        extension = os.path.splitext(filename)[1].lower()
+        upload.storage_key = f'media/{job.id}/{upload.id}{extension}'
+        upload.storage_handle = store.start_upload(upload.storage_key, upload.id, mime_type)
+        db.session.commit()
+
+        response, status = upload_response(upload, 201)
+        response.headers['Location'] = url_for('media_uploads.upload_part', upload_id=upload.id)
+        return response, status
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@media_uploads_bp.route('/media/uploads/<upload_id>', methods=['GET', 'HEAD'])
+@jwt_required()
+def get_media_upload(upload_id):
+    try:
+        upload = get_owned_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload not found'}), 404
+
+        return upload_response(upload)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@media_uploads_bp.route('/media/uploads/<upload_id>', methods=['PUT'])
+@jwt_required()
+def upload_part(upload_id):
+    """Store one chunk; the body is streamed to storage rather than read into memory"""
+    try:
+        upload = get_owned_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload not found'}), 404
+        if upload.status != 'uploading':
+            return jsonify({'error': f'Upload is {upload.status}'}), 409
+
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            offset = request.headers.get('Upload-Offset', type=int)
+        length = request.content_length
+        if offset is None or length is None:
+            return jsonify({'error': 'offset and Content-Length are required'}), 400
+
+        # Chunks arrive in order; after a dropped connection the client resumes from our offset
+        if offset != upload.received:
+            return upload_response(upload, 409, error='offset does not match the bytes received')
+
+        is_last = offset + length == upload.total_size
+        if length != upload.chunk_size and not is_last:
+            return jsonify({'error': f'Each chunk but the last must be {upload.chunk_size} bytes'}), 400
+        if offset + length > upload.total_size:
+            return jsonify({'error': 'Chunk runs past the declared size'}), 400
+
+        part_number = offset // upload.chunk_size + 1
+        tag = media_processor.store.write_part(
+            upload.storage_key, upload.storage_handle, part_number, offset, request.stream, length
+        )
+
+        tags = upload.tags
+        tags[part_number] = tag
+        upload.part_tags = json.dumps(tags)
+        upload.received = offset + length
+        db.session.commit()
+
+        return upload_response(upload)
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@media_uploads_bp.route('/media/uploads/<upload_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_media_upload(upload_id):
+    try:
+        upload = get_owned_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload not found'}), 404
+        if upload.status == 'complete':
+            # Finalizing twice (e.g. after a lost response) returns the same media
+            return jsonify(media_result(db.session.get(Media, upload.media_id))), 200
+        if upload.status == 'finalizing':
+            # An earlier attempt recorded the media but may have failed before storage completed
+            media = db.session.get(Media, upload.media_id)
+        elif upload.status != 'uploading':
+            return jsonify({'error': f'Upload is {upload.status}'}), 409
+        elif upload.received != upload.total_size:
+            return upload_response(upload, 409, error='Upload is incomplete')
+        else:
+            # Commit the media before assembling the object, so a failure in between
+            # leaves an upload to finalize again rather than an object nothing points to
+            media = Media(
+                job_id=upload.job_id,
+                filename=upload.filename,
+                file_path=upload.storage_key,
+                file_type=upload.mime_type.split('/')[0],
+                mime_type=upload.mime_type,
+                file_size=upload.total_size,
+                uploaded_by=upload.user_id
+            )
+            db.session.add(media)
+            db.session.flush()
+
+            claimed = MediaUpload.query.filter_by(id=upload.id, status='uploading').update(
+                {'status': 'finalizing', 'media_id': media.id}, synchronize_session=False
+            )
+            if not claimed:
+                # A concurrent request is finalizing the same upload
+                db.session.rollback()
+                return jsonify({'error': 'Upload is already being finalized'}), 409
+            db.session.add_all([MediaVariant(media_id=media.id, kind=kind) for kind in VARIANT_SIZES])
+            db.session.commit()
+
+        media_processor.store.complete_upload(upload.storage_key, upload.storage_handle, upload.tags)
+
+        upload.status = 'complete'
+        db.session.commit()
+
+        media_processor.submit(media.id)
+
+        return jsonify(media_result(media)), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@media_uploads_bp.route('/media/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def abort_media_upload(upload_id):
+    try:
+        upload = get_owned_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload not found'}), 404
+        if upload.status != 'uploading':
+            return jsonify({'error': f'Upload is {upload.status}'}), 409
+
+        media_processor.store.abort_upload(upload.storage_key, upload.storage_handle)
+        upload.status = 'aborted'
+        db.session.commit()
+
+        return jsonify({'message': 'Upload aborted'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@media_uploads_bp.route('/media/<int:media_id>', methods=['GET'])
+@jwt_required()
+def get_media(media_id):
+    try:
+        media = db.session.get(Media, media_id)
+        if media is None:
+            return jsonify({'error': 'Media not found'}), 404
+        error = job_access_error(get_current_principal(), db.session.get(Job, media.job_id))
+        if error:
+            return jsonify({'error': error}), 403
+
+        return jsonify(media_result(media)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@media_uploads_bp.route('/media/<int:media_id>/content', methods=['GET'])
+@jwt_required()
+def get_media_content(media_id):
+    """The original file, or ?variant=thumbnail|preview, with HTTP Range support"""
+    try:
+        media = db.session.get(Media, media_id)
+        if media is None:
+            return jsonify({'error': 'Media not found'}), 404
+        error = job_access_error(get_current_principal(), db.session.get(Job, media.job_id))
+        if error:
+            return jsonify({'error': error}), 403
+
+        kind = request.args.get('variant')
+        if kind:
+            variant = MediaVariant.query.get((media_id, kind))
+            if variant is None or variant.status != 'ready':
+                return jsonify({'error': f"No {kind} is available{f' ({variant.status})' if variant else ''}"}), 404
+            key, mime_type = variant.storage_key, variant.mime_type
+        else:
+            upload = MediaUpload.query.filter_by(media_id=media_id).first()
+            if upload is None:
+                return jsonify({'error': 'Media has no stored content'}), 404
+            if upload.status != 'complete':
+                return jsonify({'error': 'Media upload is still being finalized'}), 409
+            key, mime_type = upload.storage_key, upload.mime_type
+
+        # Rows stored before the allowlist may carry any type; those are only ever downloaded
+        inline = normalize_mime_type(mime_type) is not None
+        store = media_processor.store
+        path = store.local_path(key)
+        if path is None:
+            # Object stores answer Range requests themselves
+            return redirect(store.download_url(key, as_attachment=not inline))
+        if not os.path.exists(path):
+            return jsonify({'error': 'Media content is missing'}), 404
+
+        # conditional=True answers Range with 206 and If-None-Match with 304
+        response = send_file(
+            path, mimetype=mime_type if inline else 'application/octet-stream', conditional=True,
+            as_attachment=not inline, download_name=media.filename
+        )
+        response.headers['Cache-Control'] = 'private, max-age=86400'
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,262 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.models.user import db
+
+# Upper bounds of the histogram buckets; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+class Histogram:
+    """Bucketed observations per label combination, in Prometheus' cumulative form"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [per-bucket counts (last is +Inf), sum]
+        self._lock = Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', _number(bound))])} {cumulative}"
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+class Gauge:
+    """Value read when the metrics are scraped, from a callback returning {labels: value}"""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in sorted(self.collect().items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+class MetricsRegistry:
+    """The process's metrics, rendered in the Prometheus text exposition format.
+
+    Values live in this process only; behind several worker processes
+    each one keeps and reports its own.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce a response, by endpoint',
+    ['endpoint', 'method']
+))
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Requests handled, by endpoint and status code',
+    ['endpoint', 'method', 'status']
+))
+RESPONSE_SIZE = registry.register(Histogram(
+    'http_response_size_bytes', 'Response body size as sent, by endpoint; streamed bodies are not counted',
+    ['endpoint'], SIZE_BUCKETS
+))
+REQUEST_STATEMENTS = registry.register(Histogram(
+    'db_statements_per_request', 'SQL statements executed while handling one request, by endpoint',
+    ['endpoint'], STATEMENT_BUCKETS
+))
+REQUEST_SQL_TIME = registry.register(Histogram(
+    'db_time_per_request_seconds', 'Time spent in SQL while handling one request, by endpoint',
+    ['endpoint']
+))
+STATEMENT_LATENCY = registry.register(Histogram(
+    'db_statement_duration_seconds', 'Time per SQL statement, including background work, by operation',
+    ['operation']
+))
+POOL_CONNECT = registry.register(Histogram(
+    'db_pool_connect_seconds', 'Time to open a new database connection for the pool',
+    ['engine']
+))
+POOL_HOLD = registry.register(Histogram(
+    'db_pool_hold_seconds', 'Time a connection stays checked out of the pool, from checkout to checkin',
+    ['engine']
+))
+
+def endpoint_label():
+    # Endpoint names rather than paths keep one series per route, not per job id
+    return request.endpoint or 'unmatched'
+
+def statement_operation(statement):
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else 'UNKNOWN'
+
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_time = 0.0
+
+def record_request_metrics(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    endpoint = endpoint_label()
+    REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    REQUEST_STATEMENTS.observe(g.sql_statements, endpoint)
+    REQUEST_SQL_TIME.observe(g.sql_time, endpoint)
+    if not response.is_streamed:
+        RESPONSE_SIZE.observe(response.calculate_content_length() or 0, endpoint)
+    return response
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('statement_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['statement_started'].pop()
+    STATEMENT_LATENCY.observe(elapsed, statement_operation(statement))
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_time += elapsed
+
+@event.listens_for(Engine, 'handle_error')
+def drop_statement_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('statement_started'):
+        connection.info['statement_started'].pop()
+
+def watch_pool(engine, engine_name):
+    """Time new connections and checkouts of one engine's pool.
+
+    Pool events stay attached when engine.dispose() recreates the pool.
+    There is no event before a checkout starts waiting, so a starved pool
+    shows as checked_out at size in db_pool_connections and as long hold
+    times, rather than as a wait histogram.
+    """
+    @event.listens_for(engine, 'do_connect')
+    def start_connect_timer(dialect, connection_record, cargs, cparams):
+        connection_record.info['connect_started'] = time.perf_counter()
+
+    @event.listens_for(engine, 'connect')
+    def record_connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop('connect_started', None)
+        if started is not None:
+            POOL_CONNECT.observe(time.perf_counter() - started, engine_name)
+
+    @event.listens_for(engine, 'checkout')
+    def start_hold_timer(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+
+    @event.listens_for(engine, 'checkin')
+    def record_hold(dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        if started is not None:
+            POOL_HOLD.observe(time.perf_counter() - started, engine_name)
+
+# Bind name -> engine, filled in by install_pool_metrics
+instrumented_engines = {}
+
+def pool_gauges():
+    stats = {}
+    for name, engine in instrumented_engines.items():
+        pool = engine.pool
+        if hasattr(pool, 'checkedout'):
+            stats[(name, 'checked_out')] = pool.checkedout()
+            stats[(name, 'idle')] = pool.checkedin()
+            stats[(name, 'size')] = pool.size()
+    return stats
+
+registry.register(Gauge(
+    'db_pool_connections', 'Pool connections in use (checked_out), idle in the pool (idle) and the configured pool size',
+    ['engine', 'state'], pool_gauges
+))
+
+def install_pool_metrics(app):
+    """Watch the pool of every engine of the app"""
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            name = bind_key or 'primary'
+            watch_pool(engine, name)
+            instrumented_engines[name] = engine
+
+def init_metrics(app):
+    """Time every request and the SQL it runs.
+
+    Call before init_compression: after_request hooks run in reverse order,
+    so response sizes are then taken after compression, as sent.
+    """
+    app.config.setdefault('METRICS_TOKEN', None)
+    app.config.setdefault('METRICS_PUBLIC', False)
+    app.before_request(start_request_metrics)
+    app.after_request(record_request_metrics)
+    app.extensions['metrics'] = registry
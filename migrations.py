@@ -0,0 +1,126 @@
+import click
+from datetime import datetime
+from flask.cli import with_appcontext
+from src.models.user import db
+# Model imports register their tables on db.metadata for the migrations below
+from src.models.inventory import InventoryItem
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+from src.models.usage_rollup import refresh_usage_rollups
+from src.models.dashboard_stats import rebuild_dashboard_stats
+from src.models.tombstones import SyncTombstone
+from src.overdue import schedule_open_assignments
+from src.job_search import create_job_search_index
+from src.spatial import create_spatial_indexes
+from src.profiling import scrub_stored_parameters
+
+class SchemaMigration(db.Model):
+    """One row per schema migration applied to this database"""
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def create_indexes(connection, indexes):
+    """Create (name, table, columns) indexes that do not exist yet"""
+    for name, table_name, columns in indexes:
+        table = db.metadata.tables[table_name]
+        index = next((ix for ix in table.indexes if ix.name == name), None)
+        if index is None:
+            index = db.Index(name, *[table.c[column] for column in columns])
+        index.create(connection, checkfirst=True)
+
+# Indexes behind the filters used by the jobs, dashboard and report queries
+HOT_PATH_INDEXES = [
+    ('ix_inventory_assignment_job_status', 'inventory_assignment', ['job_id', 'status']),
+    ('ix_inventory_assignment_user_status', 'inventory_assignment', ['user_id', 'status']),
+    ('ix_inventory_assignment_item_status', 'inventory_assignment', ['item_id', 'status']),
+    ('ix_inventory_assignment_status_expected_return', 'inventory_assignment', ['status', 'expected_return_date']),
+    ('ix_inventory_assignment_check_out_time', 'inventory_assignment', ['check_out_time']),
+    ('ix_job_status', 'job', ['status']),
+    ('ix_job_assigned_foreman', 'job', ['assigned_foreman']),
+    ('ix_job_created_by', 'job', ['created_by']),
+    ('ix_job_created_at', 'job', ['created_at']),
+    ('ix_job_priority_created_at_id', 'job', ['priority', 'created_at', 'id']),
+    ('ix_inventory_item_status', 'inventory_item', ['status']),
+    ('ix_inventory_item_category', 'inventory_item', ['category'])
+]
+
+def add_hot_path_indexes(connection):
+    create_indexes(connection, HOT_PATH_INDEXES)
+
+# Keyset indexes behind the offline delta sync
+SYNC_INDEXES = [
+    ('ix_job_updated_at_id', 'job', ['updated_at', 'id']),
+    ('ix_inventory_item_updated_at_id', 'inventory_item', ['updated_at', 'id']),
+    ('ix_inventory_assignment_updated_at_id', 'inventory_assignment', ['updated_at', 'id'])
+]
+
+def add_sync_indexes(connection):
+    create_indexes(connection, SYNC_INDEXES)
+
+def backfill_usage_rollups(connection):
+    # Rollups are only maintained on write, so count the history that predates them
+    refresh_usage_rollups(connection)
+
+def backfill_dashboard_stats(connection):
+    # Dashboards only read counter rows, so every scope with history needs one up front
+    rebuild_dashboard_stats(connection)
+
+def add_tombstone_user_scope(connection):
+    # Databases created before per-user tombstones lack the column; create_all adds it to new ones
+    columns = {column['name'] for column in db.inspect(connection).get_columns('sync_tombstone')}
+    if 'user_id' not in columns:
+        connection.execute(db.text('ALTER TABLE sync_tombstone ADD COLUMN user_id INTEGER'))
+    for index in SyncTombstone.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+# Ordered (version, description, upgrade) entries; never edit one that has shipped.
+# An upgrade returning False could not run on this database and is retried next time.
+MIGRATIONS = [
+    (1, 'Add hot path indexes to jobs, assignments and inventory', add_hot_path_indexes),
+    (2, 'Add full-text search index on jobs', create_job_search_index),
+    (3, 'Add spatial indexes on item and job coordinates', create_spatial_indexes),
+    (4, 'Add updated_at indexes for offline delta sync', add_sync_indexes),
+    (5, 'Backfill daily usage rollups', backfill_usage_rollups),
+    (6, 'Schedule due dates of open assignments', schedule_open_assignments),
+    (7, 'Materialize dashboard counters for every scope', backfill_dashboard_stats),
+    (8, 'Scope sync tombstones to the user losing a row', add_tombstone_user_scope),
+    (9, 'Drop statement parameter values from profiles and the slow-query log', scrub_stored_parameters)
+]
+
+def upgrade_database():
+    """Apply pending migrations in order, each in its own transaction.
+    
+    Returns the (version, description) pairs applied and those skipped.
+    """
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.commit()
+    
+    upgraded = []
+    skipped = []
+    for version, description, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        with db.engine.begin() as connection:
+            if upgrade(connection) is False:
+                # Left unrecorded, e.g. until SQLite is rebuilt with FTS5
+                skipped.append((version, description))
+                continue
+            connection.execute(SchemaMigration.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        upgraded.append((version, description))
+    return upgraded, skipped
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Apply pending schema migrations."""
+    upgraded, skipped = upgrade_database()
+    for version, description in upgraded:
+        click.echo(f"Applied migration {version}: {description}")
+    for version, description in skipped:
+        click.echo(f"Skipped migration {version}: {description} (not supported by this database; retried on the next upgrade)")
+    if not upgraded and not skipped:
+        click.echo('Database is up to date')
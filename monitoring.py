@@ -0,0 +1,25 @@
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request
+from src.metrics import registry
+
+monitoring_bp = Blueprint('monitoring', __name__)
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint, behind the METRICS_TOKEN bearer token.
+
+    Without a token it stays closed unless METRICS_PUBLIC opts in, e.g. when
+    only an internal network can reach the app.
+    """
+    token = current_app.config['METRICS_TOKEN']
+    if not token and not current_app.config['METRICS_PUBLIC']:
+        return jsonify({'error': 'Metrics are disabled; set METRICS_TOKEN or METRICS_PUBLIC'}), 403
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return jsonify({'error': 'Invalid metrics token'}), 401
+
+    response = Response(registry.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
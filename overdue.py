@@ -0,0 +1,213 @@
+import threading
+from datetime import datetime
+import click
+from blinker import Namespace
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect
+from src.models.user import db
+from src.models.assignment import InventoryAssignment
+
+# Sent once per scan that finds newly overdue assignments, with alerts=[OverdueAlert.to_dict(), ...]
+overdue_signals = Namespace()
+overdue_detected = overdue_signals.signal('overdue-detected')
+
+class AssignmentDue(db.Model):
+    """Due date of one open assignment, and when it was found overdue.
+
+    Rows exist only while the assignment is checked out with an expected
+    return date, so the pending rows ordered by due_at are the schedule.
+    """
+    # No foreign key: the row is removed after the flush that deletes its assignment
+    assignment_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    due_at = db.Column(db.DateTime, nullable=False)
+    overdue_at = db.Column(db.DateTime)  # set exactly once by the scanner
+
+    __table_args__ = (
+        db.Index('ix_assignment_due_overdue_at_due_at', 'overdue_at', 'due_at'),
+    )
+
+class OverdueAlert(db.Model):
+    """Record of one assignment going overdue, closed when it is returned or rescheduled"""
+    id = db.Column(db.Integer, primary_key=True)
+    assignment_id = db.Column(db.Integer, nullable=False, index=True)
+    due_at = db.Column(db.DateTime, nullable=False)
+    fired_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    resolved_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'assignment_id': self.assignment_id,
+            'due_at': self.due_at,
+            'fired_at': self.fired_at,
+            'resolved_at': self.resolved_at
+        }
+
+def _due_at(assignment):
+    """When an assignment becomes overdue, or None if it never can"""
+    if assignment.status == 'checked_out':
+        return assignment.expected_return_date
+    return None
+
+def _reschedule(session, due_dates):
+    """Replace the schedule of the given assignments ({id: due_at or None}) using Core statements"""
+    due_table = AssignmentDue.__table__
+    alert_table = OverdueAlert.__table__
+    ids = list(due_dates)
+
+    session.execute(due_table.delete().where(due_table.c.assignment_id.in_(ids)))
+    # A returned or rescheduled assignment is no longer overdue for the old date
+    session.execute(
+        alert_table.update().where(
+            alert_table.c.assignment_id.in_(ids),
+            alert_table.c.resolved_at.is_(None)
+        ).values(resolved_at=datetime.utcnow())
+    )
+
+    rows = [
+        {'assignment_id': assignment_id, 'due_at': due_at}
+        for assignment_id, due_at in due_dates.items() if due_at is not None
+    ]
+    if rows:
+        session.execute(due_table.insert(), rows)
+
+@event.listens_for(db.session, 'after_flush')
+def maintain_overdue_schedule(session, flush_context):
+    """Keep the due-date schedule in step with assignment check-outs, returns and edits"""
+    due_dates = {}
+
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, InventoryAssignment) and _due_at(obj) is not None:
+                due_dates[obj.id] = _due_at(obj)
+
+        for obj in session.dirty:
+            if isinstance(obj, InventoryAssignment):
+                state = inspect(obj)
+                if state.attrs.status.history.has_changes() or state.attrs.expected_return_date.history.has_changes():
+                    due_dates[obj.id] = _due_at(obj)
+
+        for obj in session.deleted:
+            if isinstance(obj, InventoryAssignment):
+                due_dates[obj.id] = None
+
+        if due_dates:
+            _reschedule(session, due_dates)
+
+def scan_overdue(now=None):
+    """Fire every assignment that came due since the last scan, returning the new alerts.
+
+    Only pending rows already past due are read, so a scan costs time in
+    proportion to newly overdue assignments rather than everything checked
+    out. The guarded UPDATE claims each row once, so concurrent scanners in
+    other processes never fire the same transition twice.
+    """
+    now = now or datetime.utcnow()
+    table = AssignmentDue.__table__
+    claimed = db.session.execute(
+        table.update().where(
+            table.c.overdue_at.is_(None),
+            table.c.due_at < now
+        ).values(overdue_at=now).returning(table.c.assignment_id, table.c.due_at)
+    ).all()
+
+    alerts = [
+        OverdueAlert(assignment_id=assignment_id, due_at=due_at, fired_at=now)
+        for assignment_id, due_at in sorted(claimed, key=lambda row: row.due_at)
+    ]
+    db.session.add_all(alerts)
+    db.session.flush()
+    # Taken before the commit expires the rows, so listeners need no extra queries
+    alert_data = [alert.to_dict() for alert in alerts]
+    db.session.commit()
+
+    if alert_data:
+        overdue_detected.send(current_app._get_current_object(), alerts=alert_data)
+    return alerts
+
+def next_due_at():
+    """Earliest due date not yet fired, or None"""
+    return db.session.query(db.func.min(AssignmentDue.due_at)).filter(
+        AssignmentDue.overdue_at.is_(None)
+    ).scalar()
+
+class OverdueScheduler:
+    """Background thread that scans for overdue assignments as due dates pass.
+
+    It sleeps until the earliest pending due date, but never longer than
+    OVERDUE_SCAN_INTERVAL seconds, so due dates added meanwhile are still
+    picked up promptly. Set the interval to 0 to disable the thread and run
+    `flask scan-overdue` from cron instead.
+
+    The thread starts with the first request a process serves, so only
+    server processes run it; `flask` commands and scripts that import the
+    app never do.
+    """
+
+    def __init__(self, app=None):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('OVERDUE_SCAN_INTERVAL', 60)
+        app.extensions['overdue_scheduler'] = self
+        if app.config['OVERDUE_SCAN_INTERVAL']:
+            app.before_request(lambda: self.start(app))
+
+    def start(self, app):
+        """Start the scanning thread unless this process already runs it"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, args=(app,), name='overdue-scheduler', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self, app):
+        interval = app.config['OVERDUE_SCAN_INTERVAL']
+        while not self._stopped.is_set():
+            delay = interval
+            try:
+                with app.app_context():
+                    alerts = scan_overdue()
+                    if alerts:
+                        app.logger.info('%d assignments went overdue', len(alerts))
+                    due_at = next_due_at()
+                    if due_at is not None:
+                        delay = min(interval, max((due_at - datetime.utcnow()).total_seconds(), 0) + 1)
+            except Exception:
+                app.logger.exception('Overdue scan failed')
+            self._stopped.wait(delay)
+
+overdue_scheduler = OverdueScheduler()
+
+def init_overdue_scheduler(app):
+    overdue_scheduler.init_app(app)
+
+def schedule_open_assignments(connection):
+    """Build the due-date schedule from the assignments already checked out"""
+    table = AssignmentDue.__table__
+    connection.execute(table.delete())
+    connection.execute(table.insert().from_select(
+        ['assignment_id', 'due_at'],
+        db.select(InventoryAssignment.id, InventoryAssignment.expected_return_date).where(
+            InventoryAssignment.status == 'checked_out',
+            InventoryAssignment.expected_return_date.isnot(None)
+        )
+    ))
+
+@click.command('scan-overdue')
+@with_appcontext
+def scan_overdue_command():
+    """Record assignments that have gone overdue since the last scan."""
+    alerts = scan_overdue()
+    click.echo(f"{len(alerts)} assignments went overdue")
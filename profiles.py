@@ -0,0 +1,97 @@
+from flask import Blueprint, current_app, jsonify, request, send_file
+from flask_jwt_extended import jwt_required
+from src.models.user import db
+from src.authz import check_permission, get_current_principal
+from src.profiling import PROFILE_HEADER, RequestProfile, SlowQuery, make_profile_token
+import os
+
+profiles_bp = Blueprint('profiles', __name__)
+
+# Upper bound on listed profiles and slow queries
+MAX_LIST_LIMIT = 200
+
+@profiles_bp.route('/admin/profile-token', methods=['POST'])
+@jwt_required()
+@check_permission(['admin'])
+def create_profile_token():
+    """Signed token that profiles any jobs or reports request carrying it"""
+    try:
+        max_age = current_app.config['PROFILE_TOKEN_MAX_AGE']
+        return jsonify({
+            'token': make_profile_token(get_current_principal().id),
+            'header': PROFILE_HEADER,
+            'query_parameter': 'profile',
+            'expires_in': max_age
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@profiles_bp.route('/admin/profiles', methods=['GET'])
+@jwt_required()
+@check_permission(['admin'])
+def get_profiles():
+    try:
+        limit = min(request.args.get('limit', 50, type=int), MAX_LIST_LIMIT)
+        query = RequestProfile.query
+        if request.args.get('endpoint'):
+            query = query.filter(RequestProfile.endpoint == request.args['endpoint'])
+        profiles = query.order_by(RequestProfile.created_at.desc()).limit(limit).all()
+
+        return jsonify({'profiles': [profile.to_dict() for profile in profiles]}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@profiles_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+@check_permission(['admin'])
+def get_profile(profile_id):
+    """Summary of the hottest functions and the SQL timeline with query plans"""
+    try:
+        profile = db.session.get(RequestProfile, profile_id)
+        if profile is None:
+            # Profiles are written just after their response, so a fresh id may 404 briefly
+            return jsonify({'error': 'Profile not found'}), 404
+
+        return jsonify(profile.to_dict(detail=True)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@profiles_bp.route('/admin/profiles/<profile_id>/stats', methods=['GET'])
+@jwt_required()
+@check_permission(['admin'])
+def download_profile_stats(profile_id):
+    """The raw pstats dump, for snakeviz, flameprof or pstats"""
+    try:
+        profile = db.session.get(RequestProfile, profile_id)
+        if profile is None or not profile.stats_path or not os.path.exists(profile.stats_path):
+            return jsonify({'error': 'Profile stats not found'}), 404
+
+        return send_file(
+            profile.stats_path, mimetype='application/octet-stream',
+            as_attachment=True, download_name=f'{profile.id}.prof'
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@profiles_bp.route('/admin/slow-queries', methods=['GET'])
+@jwt_required()
+@check_permission(['admin'])
+def get_slow_queries():
+    try:
+        limit = min(request.args.get('limit', 50, type=int), MAX_LIST_LIMIT)
+        query = SlowQuery.query
+        if request.args.get('endpoint'):
+            query = query.filter(SlowQuery.endpoint == request.args['endpoint'])
+        if request.args.get('sort') == 'duration':
+            query = query.order_by(SlowQuery.duration_ms.desc())
+        else:
+            query = query.order_by(SlowQuery.created_at.desc())
+
+        return jsonify({'slow_queries': [slow_query.to_dict() for slow_query in query.limit(limit)]}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
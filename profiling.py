@@ -0,0 +1,396 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import click
+from flask import current_app, g, has_request_context, request
+from flask.cli import with_appcontext
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.models.user import db
+
+# Blueprints whose requests may be profiled
+PROFILED_BLUEPRINTS = {'jobs', 'reports', 'report_jobs'}
+
+# Header (or ?profile= query parameter) carrying a token from POST /admin/profile-token
+PROFILE_HEADER = 'X-Profile'
+
+# Statements kept in one profile's SQL timeline, and distinct SELECTs explained
+MAX_TIMELINE = 500
+MAX_EXPLAINED = 20
+
+# Functions listed in a profile's text summary
+SUMMARY_LINES = 40
+
+# Query parameters that carry credentials and are left out of stored paths
+SECRET_ARGS = {'profile', 'jwt'}
+
+# Quoted literals some backends echo into their plans, e.g. Filter: (username = 'bob')
+PLAN_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+def describe_parameters(parameters, executemany=False):
+    """The shape of a statement's parameters: each value's type, never the value.
+
+    Parameters can hold password hashes, tokens and personal data, so this
+    is all the profiles and the slow-query log store.
+    """
+    if executemany:
+        rows = list(parameters or [])
+        return f'{len(rows)} rows of {describe_parameters(rows[0])}' if rows else '[]'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {type(value).__name__}' for name, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+class RequestProfile(db.Model):
+    """cProfile stats and SQL timeline of one profiled request"""
+    id = db.Column(db.String(32), primary_key=True)
+    endpoint = db.Column(db.String(100), index=True)
+    method = db.Column(db.String(10))
+    path = db.Column(db.String(500))
+    status_code = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)  # admin whose token asked for it; null when sampled
+    trigger = db.Column(db.String(20))  # token, sample
+    duration_ms = db.Column(db.Float)
+    sql_count = db.Column(db.Integer)
+    sql_ms = db.Column(db.Float)
+    stats_path = db.Column(db.String(500))  # pstats dump, for snakeviz or flameprof
+    summary = db.Column(db.Text)  # top functions by cumulative time
+    sql_timeline = db.Column(db.Text)  # JSON list of statements with timings and query plans
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self, detail=False):
+        profile_data = {
+            'id': self.id,
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'path': self.path,
+            'status_code': self.status_code,
+            'user_id': self.user_id,
+            'trigger': self.trigger,
+            'duration_ms': self.duration_ms,
+            'sql_count': self.sql_count,
+            'sql_ms': self.sql_ms,
+            'created_at': self.created_at
+        }
+        if detail:
+            profile_data['summary'] = self.summary
+            profile_data['sql_timeline'] = json.loads(self.sql_timeline or '[]')
+        return profile_data
+
+class SlowQuery(db.Model):
+    """A statement that ran longer than SLOW_QUERY_MS"""
+    id = db.Column(db.Integer, primary_key=True)
+    statement = db.Column(db.Text, nullable=False)
+    parameters = db.Column(db.Text)
+    duration_ms = db.Column(db.Float, nullable=False)
+    endpoint = db.Column(db.String(100), index=True)  # request endpoint, or the background thread's name
+    profile_id = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'statement': self.statement,
+            'parameters': self.parameters,
+            'duration_ms': self.duration_ms,
+            'endpoint': self.endpoint,
+            'profile_id': self.profile_id,
+            'created_at': self.created_at
+        }
+
+class ProfileRun:
+    """State of one request being profiled, kept on its thread"""
+
+    def __init__(self, app, trigger, user_id):
+        self.id = uuid.uuid4().hex
+        self.app = app
+        self.trigger = trigger
+        self.user_id = user_id
+        self.endpoint = request.endpoint
+        self.method = request.method
+        # Profile and access tokens are credentials, so they are left out of the stored path
+        query = urlencode([(name, value) for name, value in request.args.items(multi=True) if name not in SECRET_ARGS])
+        self.path = f"{request.path}?{query}"[:500] if query else request.path[:500]
+        self.status_code = None
+        self.timeline = []
+        self.raw_parameters = []  # as sent to the driver, for EXPLAIN
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+
+    def record(self, statement, parameters, started, elapsed, executemany):
+        if len(self.timeline) < MAX_TIMELINE:
+            self.timeline.append({
+                'offset_ms': round((started - self.started) * 1000, 3),
+                'duration_ms': round(elapsed * 1000, 3),
+                'statement': statement,
+                'parameters': describe_parameters(parameters, executemany),
+                'executemany': executemany
+            })
+            # Held in memory only, to EXPLAIN the statement; never stored
+            self.raw_parameters.append(None if executemany else parameters)
+
+# The profile of the request running on this thread, if any; a thread-local rather than
+# g so statements run while a streamed body is sent are still attributed to it
+_current = threading.local()
+
+class RequestProfiler:
+    """On-demand request profiling and the slow-query log.
+
+    Like the report queue, the broker is anything with an Executor-style
+    submit(fn, *args). It writes profiles and slow queries, and runs
+    EXPLAIN, off the request thread. A request never waits on those
+    writes, and never blocks on the write lock it may itself hold.
+    """
+
+    def __init__(self, app=None, broker=None):
+        self.broker = broker
+        self.app = None
+        self.slow_query_ms = None
+        self.sample_rate = 0.0
+        self._pending = deque(maxlen=1000)
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, broker=None):
+        app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILE_TOKEN_MAX_AGE', 3600)
+        app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('PROFILE_RETENTION_DAYS', 7)
+        app.config.setdefault('SLOW_QUERY_MS', 500)
+        self.broker = broker or self.broker or ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-writer')
+        self.app = app
+        self.slow_query_ms = app.config['SLOW_QUERY_MS']
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        app.before_request(start_profile)
+        app.after_request(finish_profile_on_close)
+        app.extensions['request_profiler'] = self
+
+    def record_slow_query(self, statement, parameters, elapsed, profile_id):
+        endpoint = request.endpoint if has_request_context() else threading.current_thread().name
+        self.app.logger.warning('Slow query (%.0f ms) in %s: %s', elapsed * 1000, endpoint, statement[:200])
+        with self._lock:
+            self._pending.append({
+                'statement': statement,
+                'parameters': parameters,
+                'duration_ms': round(elapsed * 1000, 3),
+                'endpoint': endpoint,
+                'profile_id': profile_id,
+                'created_at': datetime.utcnow()
+            })
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self.broker.submit(self._write_slow_queries)
+
+    def _write_slow_queries(self):
+        with self._lock:
+            rows = list(self._pending)
+            self._pending.clear()
+            self._flush_scheduled = False
+        if rows:
+            with self.app.app_context(), unrecorded():
+                with db.engine.begin() as connection:
+                    connection.execute(SlowQuery.__table__.insert(), rows)
+
+    def finish(self, run):
+        """Stop a profile once its response has been sent, and save it in the background"""
+        if _current.run is not run:
+            return
+        run.profiler.disable()
+        _current.run = None
+        duration = time.perf_counter() - run.started
+
+        os.makedirs(run.app.config['PROFILE_DIR'], exist_ok=True)
+        stats_path = os.path.join(run.app.config['PROFILE_DIR'], f'{run.id}.prof')
+        run.profiler.dump_stats(stats_path)
+        summary = io.StringIO()
+        pstats.Stats(run.profiler, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+
+        self.broker.submit(save_profile, run, duration, stats_path, summary.getvalue())
+
+request_profiler = RequestProfiler()
+
+def init_profiler(app, broker=None):
+    request_profiler.init_app(app, broker)
+
+@contextmanager
+def unrecorded():
+    """Keep this thread's statements out of profiles and the slow-query log"""
+    _current.unrecorded = True
+    try:
+        yield
+    finally:
+        _current.unrecorded = False
+
+def token_serializer(app):
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='request-profile')
+
+def make_profile_token(user_id):
+    return token_serializer(current_app).dumps({'user_id': user_id})
+
+def profile_trigger():
+    """(trigger, admin user id) if this request should be profiled, else None"""
+    token = request.headers.get(PROFILE_HEADER) or request.args.get('profile')
+    if token:
+        try:
+            claims = token_serializer(current_app).loads(token, max_age=current_app.config['PROFILE_TOKEN_MAX_AGE'])
+            return 'token', claims['user_id']
+        except BadSignature:
+            # A bad token is ignored rather than failing the request it rode in on
+            return None
+    if request_profiler.sample_rate and random.random() < request_profiler.sample_rate:
+        return 'sample', None
+    return None
+
+def start_profile():
+    stale = getattr(_current, 'run', None)
+    if stale is not None:
+        # The previous response on this thread was never closed; end its profile here
+        request_profiler.finish(stale)
+    if request.blueprint not in PROFILED_BLUEPRINTS:
+        return
+    trigger = profile_trigger()
+    if trigger is None:
+        return
+    run = g.profile_run = ProfileRun(current_app._get_current_object(), *trigger)
+    _current.run = run
+    run.profiler.enable()
+
+def finish_profile_on_close(response):
+    run = g.get('profile_run')
+    if run is None:
+        return response
+    run.status_code = response.status_code
+    response.headers['X-Profile-Id'] = run.id
+    # Streamed report bodies do their work while being sent, so stop only once they are
+    response.call_on_close(lambda: request_profiler.finish(run))
+    return response
+
+def explain_prefix(dialect_name):
+    return 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+
+def explain_timeline(timeline, raw_parameters):
+    """Attach the query plan to the first run of each distinct SELECT, counting repeats"""
+    explained = {}
+    with db.engine.connect() as connection:
+        prefix = explain_prefix(connection.dialect.name)
+        for index, entry in enumerate(timeline):
+            statement = entry['statement']
+            if statement in explained:
+                explained[statement]['repeats'] += 1
+                continue
+            if entry['executemany'] or not statement.lstrip().upper().startswith('SELECT'):
+                continue
+            entry['repeats'] = 1
+            explained[statement] = entry
+            if len(explained) > MAX_EXPLAINED:
+                continue
+            try:
+                rows = connection.exec_driver_sql(prefix + statement, raw_parameters[index] or None)
+                # SQLite's plan detail, and every other backend's plan line, is the last column
+                entry['plan'] = [PLAN_LITERAL.sub("'?'", str(row[-1])) for row in rows]
+            except Exception as e:
+                entry['plan_error'] = str(e)
+                connection.rollback()
+
+def save_profile(run, duration, stats_path, summary):
+    """Broker task: explain the profile's SELECTs and store it"""
+    with run.app.app_context(), unrecorded():
+        try:
+            explain_timeline(run.timeline, run.raw_parameters)
+        except Exception:
+            run.app.logger.exception('EXPLAIN failed for profile %s', run.id)
+
+        with db.engine.begin() as connection:
+            connection.execute(RequestProfile.__table__.insert().values(
+                id=run.id,
+                endpoint=run.endpoint,
+                method=run.method,
+                path=run.path,
+                status_code=run.status_code,
+                user_id=run.user_id,
+                trigger=run.trigger,
+                duration_ms=round(duration * 1000, 3),
+                sql_count=len(run.timeline),
+                sql_ms=round(sum(entry['duration_ms'] for entry in run.timeline), 3),
+                stats_path=stats_path,
+                summary=summary,
+                sql_timeline=json.dumps(run.timeline, default=str),
+                created_at=datetime.utcnow()
+            ))
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profile_started = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profile_started', None)
+    if started is None or getattr(_current, 'unrecorded', False):
+        return
+    elapsed = time.perf_counter() - started
+
+    run = getattr(_current, 'run', None)
+    if run is not None:
+        run.record(statement, parameters, started, elapsed, executemany)
+
+    slow_query_ms = request_profiler.slow_query_ms
+    if slow_query_ms is not None and elapsed * 1000 >= slow_query_ms:
+        request_profiler.record_slow_query(
+            statement, describe_parameters(parameters, executemany), elapsed, run.id if run is not None else None
+        )
+
+def scrub_stored_parameters(connection):
+    """Replace parameter values saved by earlier versions with their shape"""
+    slow_queries = SlowQuery.__table__
+    connection.execute(slow_queries.update().values(parameters=None))
+    profiles = RequestProfile.__table__
+    for profile_id, timeline in connection.execute(db.select(profiles.c.id, profiles.c.sql_timeline)).all():
+        if not timeline:
+            continue
+        entries = json.loads(timeline)
+        for entry in entries:
+            entry['parameters'] = None
+            entry['plan'] = [PLAN_LITERAL.sub("'?'", line) for line in entry.get('plan', [])]
+        connection.execute(
+            profiles.update().where(profiles.c.id == profile_id).values(sql_timeline=json.dumps(entries))
+        )
+    connection.execute(profiles.update().values(path=None).where(profiles.c.path.like('%jwt=%')))
+
+def prune_profiles(days):
+    """Delete profiles, their stats files and slow queries older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    profiles = RequestProfile.query.filter(RequestProfile.created_at < cutoff).all()
+    for profile in profiles:
+        if profile.stats_path and os.path.exists(profile.stats_path):
+            os.remove(profile.stats_path)
+        db.session.delete(profile)
+    slow_queries = SlowQuery.query.filter(SlowQuery.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return len(profiles), slow_queries
+
+@click.command('prune-profiles')
+@click.option('--days', type=int, help='Keep this many days (defaults to PROFILE_RETENTION_DAYS).')
+@with_appcontext
+def prune_profiles_command(days):
+    """Delete old request profiles and slow-query log entries."""
+    days = days or current_app.config['PROFILE_RETENTION_DAYS']
+    profiles, slow_queries = prune_profiles(days)
+    click.echo(f"Deleted {profiles} profiles and {slow_queries} slow queries older than {days} days")
@@ -0,0 +1,64 @@
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+
+# Joins what InventoryAssignment.to_dict() reads, instead of one query per item and user
+ASSIGNMENT_DETAIL = [joinedload(InventoryAssignment.item), joinedload(InventoryAssignment.user)]
+
+# ?include= name -> loader for that relationship
+JOB_INCLUDES = {
+    # One extra query for every job's assignments
+    'assignments': lambda: selectinload(Job.assignments).options(*ASSIGNMENT_DETAIL),
+    'media': lambda: selectinload(Job.media)
+}
+
+# Columns always loaded under ?fields= because ordering, cursors and access checks read them
+JOB_REQUIRED_COLUMNS = ['id', 'priority', 'created_at', 'assigned_foreman', 'created_by']
+
+class ShapeError(ValueError):
+    """An include or fields parameter names something that does not exist"""
+
+def parse_list(args, name):
+    """Comma-separated query parameter as a list, or None when absent"""
+    if name not in args:
+        return None
+    return [value.strip() for value in args.get(name, '').split(',') if value.strip()]
+
+def parse_job_shape(args, default_include=()):
+    """(fields, include) requested for job responses; fields is None for every column"""
+    include = parse_list(args, 'include')
+    if include is None:
+        include = list(default_include)
+    unknown = [name for name in include if name not in JOB_INCLUDES]
+    if unknown:
+        raise ShapeError(f"include may only name {', '.join(JOB_INCLUDES)}")
+
+    fields = parse_list(args, 'fields')
+    if fields is not None:
+        columns = Job.__table__.columns.keys()
+        unknown = [name for name in fields if name not in columns]
+        if unknown or not fields:
+            raise ShapeError(f"fields must name job columns: {', '.join(columns)}")
+
+    return fields, include
+
+def job_query_options(fields, include):
+    """Loader options that fetch exactly the requested job columns and relationships"""
+    options = [JOB_INCLUDES[name]() for name in include]
+    if fields is not None:
+        columns = dict.fromkeys(JOB_REQUIRED_COLUMNS + fields)
+        options.append(load_only(*[getattr(Job, name) for name in columns]))
+    return options
+
+def shape_job(job, fields, include):
+    """Serialize a job loaded with job_query_options"""
+    if fields is None:
+        job_data = job.to_dict()
+    else:
+        job_data = {name: getattr(job, name) for name in fields}
+
+    if 'assignments' in include:
+        job_data['assignments'] = [assignment.to_dict() for assignment in job.assignments]
+    if 'media' in include:
+        job_data['media'] = [media.to_dict() for media in job.media]
+    return job_data
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+import time
+from flask import current_app, request
+from sqlalchemy import event
+from werkzeug.http import is_resource_modified
+from src.models.user import User, db
+from src.models.inventory import InventoryItem
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+from src.models.usage_rollup import DailyUsageRollup
+from src.overdue import AssignmentDue
+from src.authz import get_current_principal
+
+# Writes to any of these tables can change a report
+REPORT_MODELS = (InventoryItem, InventoryAssignment, Job, User, DailyUsageRollup, AssignmentDue)
+REPORT_TABLES = {model.__table__ for model in REPORT_MODELS}
+
+# Headers replayed with a cached body
+CACHED_HEADERS = ['ETag', 'Last-Modified', 'Cache-Control']
+
+class ReportCache:
+    """Thread-safe LRU of rendered report responses where every entry expires after a TTL.
+
+    The cache lives in the process and is cleared by commits made through
+    this process's session. Writes made by other worker processes, by other
+    services or by hand, and reports read from a lagging replica, can
+    therefore be served stale for up to the TTL (REPORT_CACHE_TTL).
+    """
+
+    def __init__(self, maxsize=128, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation):
+        """Store a value computed while the cache was at the given generation"""
+        with self._lock:
+            # A write committed while the report was running; the value may already be stale
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+report_cache = ReportCache()
+
+def init_report_cache(app):
+    """Size the report cache from the app configuration"""
+    report_cache.maxsize = app.config.get('REPORT_CACHE_SIZE', 128)
+    report_cache.ttl = app.config.get('REPORT_CACHE_TTL', 60)
+
+def report_cache_key(report_type):
+    """Report type, normalized filters and the caller's role"""
+    filters = tuple(sorted(
+        (name, value) for name, value in request.args.items(multi=True) if value != ''
+    ))
+    return report_type, filters, get_current_principal().role
+
+def cached_report(report_type):
+    """Decorator serving a report's JSON response from the report cache.
+
+    CSV exports stream straight through. Cached entries keep their validators,
+    so conditional requests still get a 304 on a hit; the view's ETag must
+    not depend on who the caller is (conditional(..., per_user=False)),
+    because entries are shared by everyone with the same role.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.args.get('format', 'json') != 'json':
+                return f(*args, **kwargs)
+
+            key = report_cache_key(report_type)
+            cached = report_cache.get(key)
+            if cached is not None:
+                body, headers = cached
+                etag = headers.get('ETag', '').strip('"') or None
+                if not is_resource_modified(request.environ, etag=etag, last_modified=headers.get('Last-Modified')):
+                    return current_app.response_class(status=304, headers=headers)
+                return current_app.response_class(body, mimetype='application/json', headers=headers)
+
+            generation = report_cache.generation
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                report_cache.set(key, (response.get_data(), headers), generation)
+            return response
+        return wrapper
+    return decorator
+
+@event.listens_for(db.session, 'after_flush')
+def note_report_writes(session, flush_context):
+    """Remember that this transaction touched report data"""
+    changed = list(session.new) + [obj for obj in session.dirty if session.is_modified(obj)] + list(session.deleted)
+    for obj in changed:
+        if isinstance(obj, REPORT_MODELS):
+            session.info['report_data_changed'] = True
+            return
+
+@event.listens_for(db.session, 'do_orm_execute')
+def note_report_bulk_writes(orm_execute_state):
+    """Bulk INSERT/UPDATE/DELETE statements bypass the flush, so watch them directly"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        if getattr(orm_execute_state.statement, 'table', None) in REPORT_TABLES:
+            orm_execute_state.session.info['report_data_changed'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_report_cache(session):
+    if session.info.pop('report_data_changed', False):
+        report_cache.clear()
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_report_writes(session):
+    session.info.pop('report_data_changed', None)
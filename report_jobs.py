@@ -0,0 +1,221 @@
+from flask import Blueprint, current_app, jsonify, request, send_file, url_for
+from flask_jwt_extended import jwt_required
+from src.models.user import User, db
+from src.authz import check_permission, get_current_principal
+from src.db_config import replica_session
+from src.report_queue import ReportJob, report_queue, expire_lost_job
+from src.routes.reports import (
+    JOB_SUMMARY_COLUMNS, USAGE_COLUMNS, csv_chunks,
+    inventory_usage_query, inventory_usage_rows, job_summary_query, job_summary_rows
+)
+from src.export_formats import EXPORT_MIMETYPES, export_chunks, missing_dependency
+from datetime import datetime
+import json
+
+report_jobs_bp = Blueprint('report_jobs', __name__)
+
+# Report type -> (accepted filters, query builder, row formatter, column types)
+REPORT_TYPES = {
+    'inventory-usage': (
+        ['start_date', 'end_date', 'job_id', 'user_id', 'item_id', 'category'],
+        inventory_usage_query, inventory_usage_rows, USAGE_COLUMNS
+    ),
+    'job-summary': (['start_date', 'end_date', 'status'], job_summary_query, job_summary_rows, JOB_SUMMARY_COLUMNS)
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    **EXPORT_MIMETYPES
+}
+
+DATE_FILTERS = ['start_date', 'end_date']
+
+def write_json_report(output, job, rows):
+    """Write the same document the synchronous JSON report returns, one row at a time"""
+    dumps = current_app.json.dumps
+    output.write('{"report_type":%s,"generated_at":%s,"filters":%s,"data":[' % (
+        dumps(job.report_type.replace('-', '_')), dumps(datetime.utcnow()), dumps(job.filter_values)
+    ))
+    count = 0
+    for row in rows:
+        if count:
+            output.write(',')
+        output.write(dumps(row))
+        count += 1
+    output.write('],"total_records":%d}\n' % count)
+    return count
+
+def write_encoded_report(output, encode, rows):
+    """Write the chunks encode() makes of rows, returning how many rows there were"""
+    count = 0
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+    for chunk in encode(counted()):
+        output.write(chunk)
+    return count
+
+def generate_report(app, job_id):
+    """Worker entry point: build one report job's artifact"""
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        if job is None or job.status != 'queued':
+            return
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+        
+        # The job row is written on the primary, which pins db.session there, so the
+        # report reads through a session of its own that can use the replica
+        report_session = replica_session()
+        try:
+            _, build_query, build_rows, columns = REPORT_TYPES[job.report_type]
+            rows = build_rows(build_query(**job.filter_values).with_session(report_session))
+            binary = job.export_format in EXPORT_MIMETYPES
+            with report_queue.store.open_write(job.artifact_name, binary=binary) as output:
+                if job.export_format == 'json':
+                    job.total_records = write_json_report(output, job, rows)
+                elif binary:
+                    job.total_records = write_encoded_report(
+                        output, lambda rows: export_chunks(job.export_format, rows, columns), rows
+                    )
+                else:
+                    job.total_records = write_encoded_report(output, csv_chunks, rows)
+            job.artifact_size = report_queue.store.size(job.artifact_name)
+            job.status = 'done'
+        except Exception as e:
+            db.session.rollback()
+            report_queue.store.delete(job.artifact_name)
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            report_session.close()
+        
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def job_result(job):
+    job_data = job.to_dict()
+    job_data['status_url'] = url_for('report_jobs.get_report_job', job_id=job.id)
+    if job.status == 'done':
+        job_data['download_url'] = url_for('report_jobs.download_report_job', job_id=job.id)
+    return job_data
+
+def get_owned_job(job_id):
+    """A report job the current user may see, or None"""
+    user = get_current_principal()
+    job = db.session.get(ReportJob, job_id)
+    if job is None or (job.user_id != user.id and user.role != 'admin'):
+        return None
+    expire_lost_job(job)
+    return job
+
+@report_jobs_bp.route('/reports/jobs', methods=['POST'])
+@jwt_required()
+@check_permission(['admin', 'foreman', 'finance'])
+def submit_report_job():
+    try:
+        user = get_current_principal()
+        data = request.json or {}
+        
+        report_type = data.get('report_type')
+        if report_type not in REPORT_TYPES:
+            return jsonify({'error': f"report_type must be one of {', '.join(REPORT_TYPES)}"}), 400
+        export_format = data.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+        missing = missing_dependency(export_format)
+        if missing:
+            return jsonify({'error': f'format={export_format} needs {missing} installed on the server'}), 501
+        
+        filter_names = REPORT_TYPES[report_type][0]
+        filters = {name: value for name, value in (data.get('filters') or {}).items() if value not in (None, '')}
+        unknown = set(filters) - set(filter_names)
+        if unknown:
+            return jsonify({'error': f"filters may only include {', '.join(filter_names)}"}), 400
+        for name in DATE_FILTERS:
+            if name in filters:
+                try:
+                    datetime.fromisoformat(filters[name])
+                except (TypeError, ValueError):
+                    return jsonify({'error': f'{name} must be an ISO 8601 date'}), 400
+        
+        job = ReportJob(
+            user_id=user.id,
+            report_type=report_type,
+            export_format=export_format,
+            filters=json.dumps(filters)
+        )
+        
+        # A user's own queue is capped so one large export cannot crowd out everyone else.
+        # Locking the user's row (SQLite's write lock, taken by the insert, does the same)
+        # makes concurrent submits count each other's jobs, so the count after the insert holds.
+        limit = current_app.config['REPORT_JOBS_PER_USER']
+        db.session.execute(db.select(User.id).where(User.id == user.id).with_for_update())
+        db.session.add(job)
+        db.session.flush()
+        if report_queue.active_jobs(user.id) > limit:
+            db.session.rollback()
+            return jsonify({'error': f'At most {limit} report jobs can run at once; wait for one to finish'}), 429
+        db.session.commit()
+        report_queue.submit(job, generate_report)
+        
+        response = jsonify(job_result(job))
+        response.headers['Location'] = url_for('report_jobs.get_report_job', job_id=job.id)
+        return response, 202
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@report_jobs_bp.route('/reports/jobs', methods=['GET'])
+@jwt_required()
+@check_permission(['admin', 'foreman', 'finance'])
+def get_report_jobs():
+    try:
+        user = get_current_principal()
+        jobs = ReportJob.query.filter_by(user_id=user.id).order_by(
+            ReportJob.created_at.desc()
+        ).limit(50).all()
+        
+        return jsonify({'jobs': [job_result(job) for job in jobs]}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@report_jobs_bp.route('/reports/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_report_job(job_id):
+    try:
+        job = get_owned_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Report job not found'}), 404
+        
+        return jsonify(job_result(job)), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@report_jobs_bp.route('/reports/jobs/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_report_job(job_id):
+    try:
+        job = get_owned_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Report job not found'}), 404
+        if job.status != 'done' or not report_queue.store.exists(job.artifact_name):
+            return jsonify({'error': f'Report is {job.status}'}), 409
+        
+        filename = f"{job.report_type.replace('-', '_')}_report_{job.created_at.strftime('%Y%m%d_%H%M%S')}.{job.export_format}"
+        return send_file(
+            report_queue.store.path(job.artifact_name),
+            mimetype=EXPORT_FORMATS[job.export_format],
+            as_attachment=True,
+            download_name=filename
+        )
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
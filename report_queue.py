@@ -0,0 +1,149 @@
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from src.models.user import db
+
+# Jobs still queued or running after this long are treated as lost
+DEFAULT_JOB_TIMEOUT = timedelta(hours=1)
+
+ACTIVE_STATUSES = ['queued', 'running']
+
+class ReportJob(db.Model):
+    """One asynchronous report request and, once finished, its stored artifact"""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    report_type = db.Column(db.String(50), nullable=False)
+    export_format = db.Column(db.String(10), nullable=False, default='csv')
+    filters = db.Column(db.Text)  # JSON object
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    error = db.Column(db.Text)
+    total_records = db.Column(db.Integer)
+    artifact_size = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def filter_values(self):
+        return json.loads(self.filters) if self.filters else {}
+
+    @property
+    def artifact_name(self):
+        return f"{self.id}.{self.export_format}"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'format': self.export_format,
+            'filters': self.filter_values,
+            'status': self.status,
+            'error': self.error,
+            'total_records': self.total_records,
+            'artifact_size': self.artifact_size,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class LocalArtifactStore:
+    """Report artifacts kept as files in one directory"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def open_write(self, name, binary=False):
+        os.makedirs(self.root, exist_ok=True)
+        if binary:
+            return open(self.path(name), 'wb')
+        return open(self.path(name), 'w', encoding='utf-8', newline='')
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def delete(self, name):
+        if self.exists(name):
+            os.remove(self.path(name))
+
+class ReportQueue:
+    """Runs report jobs off the request thread.
+    
+    The broker is anything with an Executor-style submit(fn, *args); by default
+    a small thread pool, so report generation never holds a request worker and
+    never uses more than REPORT_WORKERS database connections at once.
+    """
+
+    def __init__(self, app=None, broker=None, store=None):
+        self.broker = broker
+        self.store = store
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, broker=None, store=None):
+        app.config.setdefault('REPORT_WORKERS', 2)
+        app.config.setdefault('REPORT_JOBS_PER_USER', 2)
+        app.config.setdefault('REPORT_ARTIFACT_DIR', os.path.join(app.instance_path, 'reports'))
+        app.config.setdefault('REPORT_ARTIFACT_RETENTION_DAYS', 7)
+        self.broker = broker or self.broker or ThreadPoolExecutor(
+            max_workers=app.config['REPORT_WORKERS'], thread_name_prefix='report-worker'
+        )
+        self.store = store or self.store or LocalArtifactStore(app.config['REPORT_ARTIFACT_DIR'])
+        app.extensions['report_queue'] = self
+
+    def active_jobs(self, user_id):
+        """How many of a user's jobs are still queued or running"""
+        cutoff = datetime.utcnow() - DEFAULT_JOB_TIMEOUT
+        return ReportJob.query.filter(
+            ReportJob.user_id == user_id,
+            ReportJob.status.in_(ACTIVE_STATUSES),
+            ReportJob.created_at >= cutoff
+        ).count()
+
+    def submit(self, job, run):
+        """Queue run(app, job_id) for an already committed job"""
+        self.broker.submit(run, current_app._get_current_object(), job.id)
+
+report_queue = ReportQueue()
+
+def init_report_queue(app, broker=None, store=None):
+    report_queue.init_app(app, broker, store)
+
+def expire_lost_job(job):
+    """Fail a job whose worker disappeared, e.g. because the server restarted"""
+    if job.status in ACTIVE_STATUSES and job.created_at < datetime.utcnow() - DEFAULT_JOB_TIMEOUT:
+        job.status = 'failed'
+        job.error = 'Report job timed out'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+def prune_report_jobs(retention_days):
+    """Delete finished jobs and their artifacts older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    jobs = ReportJob.query.filter(
+        ReportJob.created_at < cutoff,
+        ReportJob.status.notin_(ACTIVE_STATUSES)
+    ).all()
+    for job in jobs:
+        report_queue.store.delete(job.artifact_name)
+        db.session.delete(job)
+    db.session.commit()
+    return len(jobs)
+
+@click.command('prune-report-jobs')
+@click.option('--days', type=int, help='Keep jobs this many days (defaults to REPORT_ARTIFACT_RETENTION_DAYS).')
+@with_appcontext
+def prune_report_jobs_command(days):
+    """Remove old report jobs and their artifacts."""
+    days = days or current_app.config['REPORT_ARTIFACT_RETENTION_DAYS']
+    click.echo(f"Removed {prune_report_jobs(days)} report jobs older than {days} days")
@@ -1,32 +1,343 @@
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import User, db
 from src.models.inventory import InventoryItem
 from src.models.job import Job
 from src.models.assignment import InventoryAssignment
+from src.models.usage_rollup import DailyUsageRollup
+from src.overdue import AssignmentDue, OverdueAlert
+from src.authz import check_permission
+from src.db_config import route_to_replica
+from src.conditional import conditional, table_version
+from src.report_cache import cached_report
+from src.export_formats import EXPORT_MIMETYPES, export_chunks, missing_dependency
 from datetime import datetime, timedelta
 import csv
 import io
-import os
 
 reports_bp = Blueprint('reports', __name__)
 
-def check_permission(required_roles):
-    """Decorator to check user permissions"""
-    def decorator(f):
-        def wrapper(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
-            if not user or user.role not in required_roles:
-                return jsonify({'error': 'Insufficient permissions'}), 403
-            return f(*args, **kwargs)
-        wrapper.__name__ = f.__name__
-        return wrapper
-    return decorator
+# Reports are read-only, so keep them off the primary when a replica exists
+reports_bp.before_request(route_to_replica)
+
+# Rows fetched per server-side batch when exporting
+EXPORT_CHUNK_SIZE = 1000
+
+# Usage summary grouping -> inventory usage filter that drills into one group
+USAGE_SUMMARY_GROUPS = {
+    'item': 'item_id',
+    'category': 'category',
+    'job': 'job_id',
+    'user': 'user_id',
+    'day': None
+}
+
+# Label shown for, and filter value matching, items without a category
+UNCATEGORIZED = 'Uncategorized'
+
+# Column types of the rows below, for the typed Parquet and Excel exports
+USAGE_COLUMNS = {
+    'assignment_id': 'int',
+    'item_sku': 'str',
+    'item_name': 'str',
+    'item_category': 'str',
+    'job_name': 'str',
+    'job_claim_id': 'str',
+    'user_name': 'str',
+    'user_role': 'str',
+    'check_out_time': 'datetime',
+    'check_in_time': 'datetime',
+    'duration_hours': 'float',
+    'status': 'str',
+    'condition_at_checkout': 'str',
+    'condition_at_checkin': 'str',
+    'notes': 'str'
+}
+
+JOB_SUMMARY_COLUMNS = {
+    'job_id': 'int',
+    'claim_id': 'str',
+    'xactimate_id': 'str',
+    'name': 'str',
+    'location': 'str',
+    'status': 'str',
+    'priority': 'str',
+    'customer_name': 'str',
+    'start_date': 'datetime',
+    'end_date': 'datetime',
+    'duration_days': 'int',
+    'total_assignments': 'int',
+    'active_assignments': 'int',
+    'created_at': 'datetime'
+}
+
+def report_versions(*models):
+    """Version function for a report built from whole tables"""
+    def versions():
+        return [table_version(model) for model in models]
+    return versions
+
+def overdue_versions():
+    # The scheduler marks assignments overdue, and days_overdue (counted in calendar days)
+    # ticks over at UTC midnight, exactly when the date ordinal changes
+    return report_versions(InventoryAssignment, InventoryItem, Job)() + [
+        table_version(AssignmentDue, AssignmentDue.overdue_at.isnot(None), column=AssignmentDue.overdue_at),
+        (datetime.utcnow().date().toordinal(), None)
+    ]
+
+def csv_chunks(rows):
+    """Render an iterable of row dicts as CSV text, one chunk of rows at a time"""
+    output = io.StringIO()
+    writer = None
+    for count, row in enumerate(rows, 1):
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=row.keys())
+            writer.writeheader()
+        writer.writerow({
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row.items()
+        })
+        
+        # Flush the first row straight away, then one chunk at a time
+        if count == 1 or count % EXPORT_CHUNK_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    
+    if output.tell():
+        yield output.getvalue()
+
+def stream_csv(rows, report_name):
+    """Stream an iterable of row dicts to the client as a CSV attachment"""
+    filename = f"{report_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return Response(
+        stream_with_context(csv_chunks(rows)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+def stream_export(rows, columns, report_name, export_format):
+    """Stream an iterable of row dicts to the client as a typed Parquet or Excel attachment"""
+    missing = missing_dependency(export_format)
+    if missing:
+        return jsonify({'error': f'format={export_format} needs {missing} installed on the server'}), 501
+    
+    filename = f"{report_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(export_chunks(export_format, rows, columns)),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+def format_usage_row(assignment, item, job, user):
+    """Flatten one assignment into an inventory usage report row"""
+    duration = None
+    if assignment.check_in_time and assignment.check_out_time:
+        duration = (assignment.check_in_time - assignment.check_out_time).total_seconds() / 3600  # hours
+    
+    return {
+        'assignment_id': assignment.id,
+        'item_sku': item.sku,
+        'item_name': item.name,
+        'item_category': item.category,
+        'job_name': job.name,
+        'job_claim_id': job.claim_id,
+        'user_name': f"{user.first_name} {user.last_name}" if user.first_name else user.username,
+        'user_role': user.role,
+        'check_out_time': assignment.check_out_time,
+        'check_in_time': assignment.check_in_time,
+        'duration_hours': round(duration, 2) if duration else None,
+        'status': assignment.status,
+        'condition_at_checkout': assignment.condition_at_checkout,
+        'condition_at_checkin': assignment.condition_at_checkin,
+        'notes': assignment.notes
+    }
+
+def format_job_summary_row(job, assignment_count, active_assignments):
+    """Flatten one job and its assignment counts into a job summary report row"""
+    # Calculate job duration
+    duration_days = None
+    if job.start_date and job.end_date:
+        duration_days = (job.end_date - job.start_date).days
+    
+    return {
+        'job_id': job.id,
+        'claim_id': job.claim_id,
+        'xactimate_id': job.xactimate_id,
+        'name': job.name,
+        'location': job.location,
+        'status': job.status,
+        'priority': job.priority,
+        'customer_name': job.customer_name,
+        'start_date': job.start_date,
+        'end_date': job.end_date,
+        'duration_days': duration_days,
+        'total_assignments': assignment_count,
+        'active_assignments': active_assignments,
+        'created_at': job.created_at
+    }
+
+def format_item_in_use_row(item, assignment, job, user):
+    """Flatten one checked-out item into an inventory status report row"""
+    return {
+        'item_sku': item.sku,
+        'item_name': item.name,
+        'category': item.category,
+        'job_name': job.name,
+        'job_claim_id': job.claim_id,
+        'assigned_to': f"{user.first_name} {user.last_name}" if user.first_name else user.username,
+        'check_out_time': assignment.check_out_time,
+        'expected_return': assignment.expected_return_date
+    }
+
+def inventory_usage_query(start_date=None, end_date=None, job_id=None, user_id=None, item_id=None, category=None):
+    """(assignment, item, job, user) rows of the inventory usage report"""
+    query = db.session.query(
+        InventoryAssignment,
+        InventoryItem,
+        Job,
+        User
+    ).join(
+        InventoryItem, InventoryAssignment.item_id == InventoryItem.id
+    ).join(
+        Job, InventoryAssignment.job_id == Job.id
+    ).join(
+        User, InventoryAssignment.user_id == User.id
+    )
+    
+    # Apply filters
+    if start_date:
+        start_dt = datetime.fromisoformat(start_date)
+        query = query.filter(InventoryAssignment.check_out_time >= start_dt)
+    
+    if end_date:
+        end_dt = datetime.fromisoformat(end_date)
+        query = query.filter(InventoryAssignment.check_out_time <= end_dt)
+    
+    if job_id:
+        query = query.filter(InventoryAssignment.job_id == job_id)
+    
+    if user_id:
+        query = query.filter(InventoryAssignment.user_id == user_id)
+    
+    if item_id:
+        query = query.filter(InventoryAssignment.item_id == item_id)
+    
+    if category == UNCATEGORIZED:
+        query = query.filter(db.or_(InventoryItem.category.is_(None), InventoryItem.category == ''))
+    elif category:
+        query = query.filter(InventoryItem.category == category)
+    
+    return query
+
+def job_summary_query(start_date=None, end_date=None, status=None):
+    """(job, total assignments, active assignments) rows of the job summary report"""
+    # Per-job assignment counts in a single grouped pass
+    query = db.session.query(
+        Job,
+        db.func.count(InventoryAssignment.id).label('total_assignments'),
+        db.func.count(
+            db.case((InventoryAssignment.status == 'checked_out', 1))
+        ).label('active_assignments')
+    ).outerjoin(
+        InventoryAssignment, InventoryAssignment.job_id == Job.id
+    ).group_by(Job.id)
+    
+    if start_date:
+        start_dt = datetime.fromisoformat(start_date)
+        query = query.filter(Job.created_at >= start_dt)
+    
+    if end_date:
+        end_dt = datetime.fromisoformat(end_date)
+        query = query.filter(Job.created_at <= end_dt)
+    
+    if status:
+        query = query.filter(Job.status == status)
+    
+    return query
+
+def usage_summary_query(start_date=None, end_date=None, group_by='item'):
+    """(key, checkouts, hours, open checkouts) rows summed from the daily usage rollups"""
+    if group_by == 'day':
+        # Categories split every assignment exactly once, and there are few of them per day
+        key, dimension = DailyUsageRollup.day, 'category'
+    else:
+        key, dimension = DailyUsageRollup.dimension_key, group_by
+    
+    query = db.session.query(
+        key,
+        db.func.sum(DailyUsageRollup.checkout_count),
+        db.func.sum(DailyUsageRollup.total_hours),
+        db.func.sum(DailyUsageRollup.open_checkouts)
+    ).filter(
+        DailyUsageRollup.dimension == dimension
+    ).group_by(key).order_by(key)
+    
+    # Rollups are per day, so range filters apply to whole days
+    if start_date:
+        query = query.filter(DailyUsageRollup.day >= datetime.fromisoformat(start_date).date())
+    
+    if end_date:
+        query = query.filter(DailyUsageRollup.day <= datetime.fromisoformat(end_date).date())
+    
+    return query
+
+def usage_summary_labels(group_by, keys):
+    """Display names for the keys of one usage summary grouping"""
+    if group_by in ('category', 'day'):
+        return {key: str(key) or UNCATEGORIZED for key in keys}
+    
+    ids = [int(key) for key in keys]
+    if group_by == 'item':
+        rows = db.session.query(InventoryItem.id, InventoryItem.name).filter(InventoryItem.id.in_(ids))
+    elif group_by == 'job':
+        rows = db.session.query(Job.id, Job.name).filter(Job.id.in_(ids))
+    else:
+        rows = (
+            (user.id, f"{user.first_name} {user.last_name}" if user.first_name else user.username)
+            for user in User.query.filter(User.id.in_(ids))
+        )
+    return {str(row_id): name for row_id, name in rows}
+
+def format_usage_summary_row(group_by, key, label, checkout_count, total_hours, open_checkouts, start_date, end_date):
+    """One usage summary group, with the inventory usage filters that list its assignments"""
+    if group_by == 'day':
+        drill_down = {'start_date': key.isoformat(), 'end_date': f"{key.isoformat()}T23:59:59.999999"}
+    else:
+        drill_down = {
+            'start_date': start_date,
+            'end_date': end_date,
+            USAGE_SUMMARY_GROUPS[group_by]: label if group_by == 'category' else key
+        }
+    
+    return {
+        'key': key,
+        'label': label,
+        'checkout_count': checkout_count,
+        'total_hours': round(float(total_hours or 0), 2),
+        'open_checkouts': open_checkouts,
+        'drill_down': {name: value for name, value in drill_down.items() if value}
+    }
+
+def inventory_usage_rows(query):
+    """Stream usage report rows from a query in server-side batches"""
+    return (
+        format_usage_row(assignment, item, job, user)
+        for assignment, item, job, user in query.yield_per(EXPORT_CHUNK_SIZE)
+    )
+
+def job_summary_rows(query):
+    """Stream job summary report rows from a query in server-side batches"""
+    return (
+        format_job_summary_row(job, assignment_count, active_assignments)
+        for job, assignment_count, active_assignments in query.yield_per(EXPORT_CHUNK_SIZE)
+    )
 
 @reports_bp.route('/reports/inventory-usage', methods=['GET'])
 @jwt_required()
 @check_permission(['admin', 'foreman', 'finance'])
+@cached_report('inventory_usage')
+@conditional(report_versions(InventoryAssignment, InventoryItem, Job), per_user=False)
 def inventory_usage_report():
     try:
         # Get query parameters
@@ -34,90 +345,85 @@ def inventory_usage_report():
         end_date = request.args.get('end_date')
         job_id = request.args.get('job_id')
         user_id = request.args.get('user_id')
-        export_format = request.args.get('format', 'json')  # json or csv
+        item_id = request.args.get('item_id')
+        category = request.args.get('category')
+        export_format = request.args.get('format', 'json')  # json, csv, parquet or xlsx
         
-        # Build query
-        query = db.session.query(
-            InventoryAssignment,
-            InventoryItem,
-            Job,
-            User
-        ).join(
-            InventoryItem, InventoryAssignment.item_id == InventoryItem.id
-        ).join(
-            Job, InventoryAssignment.job_id == Job.id
-        ).join(
-            User, InventoryAssignment.user_id == User.id
-        )
+        query = inventory_usage_query(start_date, end_date, job_id, user_id, item_id, category)
+        
+        if export_format == 'csv':
+            return stream_csv(inventory_usage_rows(query), 'inventory_usage_report')
         
-        # Apply filters
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(InventoryAssignment.check_out_time >= start_dt)
+        if export_format in EXPORT_MIMETYPES:
+            return stream_export(inventory_usage_rows(query), USAGE_COLUMNS, 'inventory_usage_report', export_format)
         
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(InventoryAssignment.check_out_time <= end_dt)
+        # Format data
+        report_data = [
+            format_usage_row(assignment, item, job, user)
+            for assignment, item, job, user in query.all()
+        ]
         
-        if job_id:
-            query = query.filter(InventoryAssignment.job_id == job_id)
+        return jsonify({
+            'report_type': 'inventory_usage',
+            'generated_at': datetime.utcnow(),
+            'filters': {
+                'start_date': start_date,
+                'end_date': end_date,
+                'job_id': job_id,
+                'user_id': user_id,
+                'item_id': item_id,
+                'category': category
+            },
+            'total_records': len(report_data),
+            'data': report_data
+        }), 200
         
-        if user_id:
-            query = query.filter(InventoryAssignment.user_id == user_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/reports/usage-summary', methods=['GET'])
+@jwt_required()
+@check_permission(['admin', 'foreman', 'finance'])
+@cached_report('usage_summary')
+@conditional(report_versions(DailyUsageRollup, InventoryItem, Job), per_user=False)
+def usage_summary_report():
+    """Checkouts, hours and open checkouts per item, category, job, user or day, read from the rollups"""
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        group_by = request.args.get('group_by', 'item')
+        export_format = request.args.get('format', 'json')
         
-        results = query.all()
+        if group_by not in USAGE_SUMMARY_GROUPS:
+            return jsonify({'error': f"group_by must be one of {', '.join(USAGE_SUMMARY_GROUPS)}"}), 400
         
-        # Format data
-        report_data = []
-        for assignment, item, job, user in results:
-            duration = None
-            if assignment.check_in_time and assignment.check_out_time:
-                duration = (assignment.check_in_time - assignment.check_out_time).total_seconds() / 3600  # hours
-            
-            report_data.append({
-                'assignment_id': assignment.id,
-                'item_sku': item.sku,
-                'item_name': item.name,
-                'item_category': item.category,
-                'job_name': job.name,
-                'job_claim_id': job.claim_id,
-                'user_name': f"{user.first_name} {user.last_name}" if user.first_name else user.username,
-                'user_role': user.role,
-                'check_out_time': assignment.check_out_time.isoformat() if assignment.check_out_time else None,
-                'check_in_time': assignment.check_in_time.isoformat() if assignment.check_in_time else None,
-                'duration_hours': round(duration, 2) if duration else None,
-                'status': assignment.status,
-                'condition_at_checkout': assignment.condition_at_checkout,
-                'condition_at_checkin': assignment.condition_at_checkin,
-                'notes': assignment.notes
-            })
+        rows = usage_summary_query(start_date, end_date, group_by).all()
+        labels = usage_summary_labels(group_by, [key for key, *_ in rows])
+        report_data = [
+            format_usage_summary_row(
+                group_by, key, labels.get(key, key), checkout_count, total_hours, open_checkouts, start_date, end_date
+            )
+            for key, checkout_count, total_hours, open_checkouts in rows
+        ]
         
         if export_format == 'csv':
-            # Generate CSV
-            output = io.StringIO()
-            if report_data:
-                writer = csv.DictWriter(output, fieldnames=report_data[0].keys())
-                writer.writeheader()
-                writer.writerows(report_data)
-            
-            # Create temporary file
-            csv_content = output.getvalue()
-            filename = f"inventory_usage_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join('/tmp', filename)
-            
-            with open(filepath, 'w') as f:
-                f.write(csv_content)
-            
-            return send_file(filepath, as_attachment=True, download_name=filename, mimetype='text/csv')
+            return stream_csv(
+                ({name: value for name, value in row.items() if name != 'drill_down'} for row in report_data),
+                'usage_summary_report'
+            )
         
         return jsonify({
-            'report_type': 'inventory_usage',
-            'generated_at': datetime.utcnow().isoformat(),
+            'report_type': 'usage_summary',
+            'generated_at': datetime.utcnow(),
             'filters': {
                 'start_date': start_date,
                 'end_date': end_date,
-                'job_id': job_id,
-                'user_id': user_id
+                'group_by': group_by
+            },
+            'totals': {
+                'checkout_count': sum(row['checkout_count'] for row in report_data),
+                'total_hours': round(sum(row['total_hours'] for row in report_data), 2),
+                'open_checkouts': sum(row['open_checkouts'] for row in report_data)
             },
             'total_records': len(report_data),
             'data': report_data
@@ -129,6 +435,8 @@ def inventory_usage_report():
 @reports_bp.route('/reports/job-summary', methods=['GET'])
 @jwt_required()
 @check_permission(['admin', 'foreman', 'finance'])
+@cached_report('job_summary')
+@conditional(report_versions(Job, InventoryAssignment), per_user=False)
 def job_summary_report():
     try:
         # Get query parameters
@@ -137,73 +445,23 @@ def job_summary_report():
         status = request.args.get('status')
         export_format = request.args.get('format', 'json')
         
-        # Build query
-        query = Job.query
-        
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(Job.created_at >= start_dt)
-        
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(Job.created_at <= end_dt)
+        query = job_summary_query(start_date, end_date, status)
         
-        if status:
-            query = query.filter(Job.status == status)
+        if export_format == 'csv':
+            return stream_csv(job_summary_rows(query), 'job_summary_report')
         
-        jobs = query.all()
+        if export_format in EXPORT_MIMETYPES:
+            return stream_export(job_summary_rows(query), JOB_SUMMARY_COLUMNS, 'job_summary_report', export_format)
         
         # Format data with assignment counts
-        report_data = []
-        for job in jobs:
-            assignment_count = InventoryAssignment.query.filter_by(job_id=job.id).count()
-            active_assignments = InventoryAssignment.query.filter_by(
-                job_id=job.id, status='checked_out'
-            ).count()
-            
-            # Calculate job duration
-            duration_days = None
-            if job.start_date and job.end_date:
-                duration_days = (job.end_date - job.start_date).days
-            
-            report_data.append({
-                'job_id': job.id,
-                'claim_id': job.claim_id,
-                'xactimate_id': job.xactimate_id,
-                'name': job.name,
-                'location': job.location,
-                'status': job.status,
-                'priority': job.priority,
-                'customer_name': job.customer_name,
-                'start_date': job.start_date.isoformat() if job.start_date else None,
-                'end_date': job.end_date.isoformat() if job.end_date else None,
-                'duration_days': duration_days,
-                'total_assignments': assignment_count,
-                'active_assignments': active_assignments,
-                'created_at': job.created_at.isoformat() if job.created_at else None
-            })
-        
-        if export_format == 'csv':
-            # Generate CSV
-            output = io.StringIO()
-            if report_data:
-                writer = csv.DictWriter(output, fieldnames=report_data[0].keys())
-                writer.writeheader()
-                writer.writerows(report_data)
-            
-            # Create temporary file
-            csv_content = output.getvalue()
-            filename = f"job_summary_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join('/tmp', filename)
-            
-            with open(filepath, 'w') as f:
-                f.write(csv_content)
-            
-            return send_file(filepath, as_attachment=True, download_name=filename, mimetype='text/csv')
+        report_data = [
+            format_job_summary_row(job, assignment_count, active_assignments)
+            for job, assignment_count, active_assignments in query.all()
+        ]
         
         return jsonify({
             'report_type': 'job_summary',
-            'generated_at': datetime.utcnow().isoformat(),
+            'generated_at': datetime.utcnow(),
             'filters': {
                 'start_date': start_date,
                 'end_date': end_date,
@@ -219,22 +477,12 @@ def job_summary_report():
 @reports_bp.route('/reports/inventory-status', methods=['GET'])
 @jwt_required()
 @check_permission(['admin', 'foreman', 'finance'])
+@cached_report('inventory_status')
+@conditional(report_versions(InventoryItem, InventoryAssignment, Job), per_user=False)
 def inventory_status_report():
     try:
         export_format = request.args.get('format', 'json')
         
-        # Get inventory status summary
-        status_summary = db.session.query(
-            InventoryItem.status,
-            db.func.count(InventoryItem.id).label('count')
-        ).group_by(InventoryItem.status).all()
-        
-        # Get category breakdown
-        category_summary = db.session.query(
-            InventoryItem.category,
-            db.func.count(InventoryItem.id).label('count')
-        ).group_by(InventoryItem.category).all()
-        
         # Get items with current assignments
         items_with_assignments = db.session.query(
             InventoryItem,
@@ -249,47 +497,40 @@ def inventory_status_report():
             User, InventoryAssignment.user_id == User.id
         ).filter(
             InventoryAssignment.status == 'checked_out'
-        ).all()
+        )
+        
+        if export_format == 'csv':
+            # Generate CSV for items in use
+            rows = (
+                format_item_in_use_row(item, assignment, job, user)
+                for item, assignment, job, user in items_with_assignments.yield_per(EXPORT_CHUNK_SIZE)
+            )
+            return stream_csv(rows, 'inventory_status_report')
+        
+        # Get inventory status summary
+        status_summary = db.session.query(
+            InventoryItem.status,
+            db.func.count(InventoryItem.id).label('count')
+        ).group_by(InventoryItem.status).all()
+        
+        # Get category breakdown
+        category_summary = db.session.query(
+            InventoryItem.category,
+            db.func.count(InventoryItem.id).label('count')
+        ).group_by(InventoryItem.category).all()
         
         report_data = {
             'status_summary': [{'status': status, 'count': count} for status, count in status_summary],
             'category_summary': [{'category': category or 'Uncategorized', 'count': count} for category, count in category_summary],
-            'items_in_use': []
+            'items_in_use': [
+                format_item_in_use_row(item, assignment, job, user)
+                for item, assignment, job, user in items_with_assignments.all()
+            ]
         }
         
-        for item, assignment, job, user in items_with_assignments:
-            report_data['items_in_use'].append({
-                'item_sku': item.sku,
-                'item_name': item.name,
-                'category': item.category,
-                'job_name': job.name,
-                'job_claim_id': job.claim_id,
-                'assigned_to': f"{user.first_name} {user.last_name}" if user.first_name else user.username,
-                'check_out_time': assignment.check_out_time.isoformat() if assignment.check_out_time else None,
-                'expected_return': assignment.expected_return_date.isoformat() if assignment.expected_return_date else None
-            })
-        
-        if export_format == 'csv':
-            # Generate CSV for items in use
-            output = io.StringIO()
-            if report_data['items_in_use']:
-                writer = csv.DictWriter(output, fieldnames=report_data['items_in_use'][0].keys())
-                writer.writeheader()
-                writer.writerows(report_data['items_in_use'])
-            
-            # Create temporary file
-            csv_content = output.getvalue()
-            filename = f"inventory_status_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            filepath = os.path.join('/tmp', filename)
-            
-            with open(filepath, 'w') as f:
-                f.write(csv_content)
-            
-            return send_file(filepath, as_attachment=True, download_name=filename, mimetype='text/csv')
-        
         return jsonify({
             'report_type': 'inventory_status',
-            'generated_at': datetime.utcnow().isoformat(),
+            'generated_at': datetime.utcnow(),
             'data': report_data
         }), 200
         
@@ -299,16 +540,20 @@ def inventory_status_report():
 @reports_bp.route('/reports/overdue-items', methods=['GET'])
 @jwt_required()
 @check_permission(['admin', 'foreman'])
+@cached_report('overdue_items')
+@conditional(overdue_versions, per_user=False)
 def overdue_items_report():
     try:
         current_date = datetime.utcnow()
         
-        # Find overdue assignments
+        # The overdue scheduler has already found these; no need to scan every open assignment
         overdue_assignments = db.session.query(
             InventoryAssignment,
             InventoryItem,
             Job,
             User
+        ).join(
+            AssignmentDue, AssignmentDue.assignment_id == InventoryAssignment.id
         ).join(
             InventoryItem, InventoryAssignment.item_id == InventoryItem.id
         ).join(
@@ -316,13 +561,13 @@ def overdue_items_report():
         ).join(
             User, InventoryAssignment.user_id == User.id
         ).filter(
-            InventoryAssignment.status == 'checked_out',
-            InventoryAssignment.expected_return_date < current_date
-        ).all()
+            AssignmentDue.overdue_at.isnot(None)
+        ).order_by(AssignmentDue.due_at, InventoryAssignment.id).all()
         
         report_data = []
         for assignment, item, job, user in overdue_assignments:
-            days_overdue = (current_date - assignment.expected_return_date).days
+            # Whole calendar days, so every row rolls over together at midnight with the ETag
+            days_overdue = (current_date.date() - assignment.expected_return_date.date()).days
             
             report_data.append({
                 'assignment_id': assignment.id,
@@ -333,14 +578,14 @@ def overdue_items_report():
                 'assigned_to': f"{user.first_name} {user.last_name}" if user.first_name else user.username,
                 'user_email': user.email,
                 'user_phone': user.phone,
-                'check_out_time': assignment.check_out_time.isoformat() if assignment.check_out_time else None,
-                'expected_return_date': assignment.expected_return_date.isoformat() if assignment.expected_return_date else None,
+                'check_out_time': assignment.check_out_time,
+                'expected_return_date': assignment.expected_return_date,
                 'days_overdue': days_overdue
             })
         
         return jsonify({
             'report_type': 'overdue_items',
-            'generated_at': datetime.utcnow().isoformat(),
+            'generated_at': datetime.utcnow(),
             'total_overdue': len(report_data),
             'data': report_data
         }), 200
@@ -348,6 +593,32 @@ def overdue_items_report():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@reports_bp.route('/reports/overdue-alerts', methods=['GET'])
+@jwt_required()
+@check_permission(['admin', 'foreman'])
+def overdue_alerts_report():
+    """Overdue transitions recorded by the scheduler, newest first"""
+    try:
+        query = OverdueAlert.query
+        
+        since = request.args.get('since')
+        if since:
+            query = query.filter(OverdueAlert.fired_at > datetime.fromisoformat(since))
+        
+        if request.args.get('open') == 'true':
+            query = query.filter(OverdueAlert.resolved_at.is_(None))
+        
+        limit = min(request.args.get('limit', 100, type=int), 500)
+        alerts = query.order_by(OverdueAlert.fired_at.desc(), OverdueAlert.id.desc()).limit(limit).all()
+        
+        return jsonify({
+            'alerts': [alert.to_dict() for alert in alerts],
+            'total_records': len(alerts)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @reports_bp.route('/reports/overdue-items-temp', methods=['GET'])
 def overdue_items_report_temp():
     """Temporary overdue items endpoint without JWT for testing"""
@@ -355,7 +626,7 @@ def overdue_items_report_temp():
         # Return empty data for testing
         return jsonify({
             'report_type': 'overdue_items',
-            'generated_at': datetime.utcnow().isoformat(),
+            'generated_at': datetime.utcnow(),
             'total_overdue': 0,
             'data': []
         }), 200
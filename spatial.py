@@ -0,0 +1,136 @@
+import math
+from src.models.user import db
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Table -> R*Tree index holding one degenerate box per located row
+GEO_TABLES = {
+    'inventory_item': 'inventory_item_geo',
+    'job': 'job_geo'
+}
+
+# k-nearest searches start at this radius and widen until they have k rows
+INITIAL_SEARCH_RADIUS_KM = 5.0
+MAX_SEARCH_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+# Engine URL -> backend name ('rtree' or 'bbox')
+_backends = {}
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a circle around a point"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    
+    # Near the poles or across the antimeridian, search every longitude
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    lon_delta = math.degrees(
+        math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))))
+    )
+    min_lon, max_lon = longitude - lon_delta, longitude + lon_delta
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lon, max_lon
+
+def _rtree_statements(table, geo_table):
+    box = 'new.id, new.latitude, new.latitude, new.longitude, new.longitude'
+    located = 'new.latitude IS NOT NULL AND new.longitude IS NOT NULL'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {geo_table} USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+        f"CREATE TRIGGER IF NOT EXISTS {geo_table}_insert AFTER INSERT ON {table} WHEN {located} "
+        f"BEGIN INSERT INTO {geo_table} VALUES ({box}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {geo_table}_update AFTER UPDATE OF latitude, longitude ON {table} "
+        f"BEGIN DELETE FROM {geo_table} WHERE id = old.id; "
+        f"INSERT INTO {geo_table} SELECT {box} WHERE {located}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {geo_table}_delete AFTER DELETE ON {table} "
+        f"BEGIN DELETE FROM {geo_table} WHERE id = old.id; END",
+        f"INSERT OR REPLACE INTO {geo_table} SELECT id, latitude, latitude, longitude, longitude "
+        f"FROM {table} WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    ]
+
+def create_spatial_indexes(connection):
+    """Index item and job coordinates: R*Tree on SQLite, (latitude, longitude) B-tree elsewhere"""
+    if connection.dialect.name == 'sqlite':
+        options = connection.exec_driver_sql('PRAGMA compile_options').scalars().all()
+        if 'ENABLE_RTREE' in options:
+            for table, geo_table in GEO_TABLES.items():
+                for statement in _rtree_statements(table, geo_table):
+                    connection.execute(db.text(statement))
+            return
+    
+    for table in GEO_TABLES:
+        connection.execute(db.text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_latitude_longitude ON {table} (latitude, longitude)"
+        ))
+
+def spatial_backend():
+    """Name the spatial index available on the current database"""
+    engine = db.engine
+    if engine.url not in _backends:
+        has_rtree = engine.dialect.name == 'sqlite' and db.inspect(engine).has_table(GEO_TABLES['job'])
+        _backends[engine.url] = 'rtree' if has_rtree else 'bbox'
+    return _backends[engine.url]
+
+def filter_bounding_box(query, model, box):
+    """Restrict a query on a located model to rows inside a bounding box"""
+    min_lat, max_lat, min_lon, max_lon = box
+    if spatial_backend() == 'rtree':
+        candidates = db.text(
+            f"SELECT id FROM {GEO_TABLES[model.__table__.name]} "
+            "WHERE max_lat >= :min_lat AND min_lat <= :max_lat "
+            "AND max_lon >= :min_lon AND min_lon <= :max_lon"
+        ).bindparams(
+            min_lat=min_lat, max_lat=max_lat, min_lon=min_lon, max_lon=max_lon
+        ).columns(id=db.Integer).subquery(f'{model.__table__.name}_geo_match')
+        return query.join(candidates, candidates.c.id == model.id)
+    
+    return query.filter(
+        model.latitude.between(min_lat, max_lat),
+        model.longitude.between(min_lon, max_lon)
+    )
+
+def _distances(query, model, latitude, longitude, radius_km):
+    """Distance-sorted (id, distance_km) pairs of rows within radius_km of a point"""
+    # Only ids and coordinates are read for the distance pass; whole rows are loaded
+    # for the few that make the cut
+    box = bounding_box(latitude, longitude, radius_km)
+    candidates = filter_bounding_box(query, model, box).with_entities(model.id, model.latitude, model.longitude)
+    
+    results = []
+    for row_id, row_latitude, row_longitude in candidates:
+        distance = haversine_km(latitude, longitude, row_latitude, row_longitude)
+        if distance <= radius_km:
+            results.append((row_id, distance))
+    results.sort(key=lambda result: result[1])
+    return results
+
+def _load_rows(query, model, distances):
+    """(row, distance_km) pairs for (id, distance_km) pairs, in the same order"""
+    if not distances:
+        return []
+    rows = {row.id: row for row in query.filter(model.id.in_([row_id for row_id, _ in distances]))}
+    return [(rows[row_id], distance) for row_id, distance in distances if row_id in rows]
+
+def within_radius(query, model, latitude, longitude, radius_km, limit=None):
+    """Rows within radius_km of a point as distance-sorted (row, distance_km) pairs"""
+    distances = _distances(query, model, latitude, longitude, radius_km)
+    return _load_rows(query, model, distances[:limit] if limit else distances)
+
+def nearest(query, model, latitude, longitude, k):
+    """The k rows nearest to a point as distance-sorted (row, distance_km) pairs"""
+    radius_km = INITIAL_SEARCH_RADIUS_KM
+    while True:
+        # Everything within the radius was seen, so k hits inside it are the k nearest
+        distances = _distances(query, model, latitude, longitude, radius_km)
+        if len(distances) >= k or radius_km >= MAX_SEARCH_RADIUS_KM:
+            return _load_rows(query, model, distances[:k])
+        radius_km = min(radius_km * 4, MAX_SEARCH_RADIUS_KM)
@@ -0,0 +1,74 @@
+from flask import Blueprint, Response, current_app, jsonify
+from flask_jwt_extended import jwt_required
+from src.authz import get_current_principal
+from src.models.dashboard_stats import dashboard_payload, dashboard_scope, get_dashboard_stats_row
+from src.live_events import encode_event, event_hub
+import time
+
+stream_bp = Blueprint('stream', __name__)
+
+# Seconds a client waits before reconnecting a dropped or refused stream
+RECONNECT_DELAY = 5
+
+def event_stream(subscription, snapshot, heartbeat, max_age):
+    """SSE body: the current dashboard, then pushed events, with comment heartbeats between"""
+    try:
+        # Browsers wait this long (ms) before reconnecting a dropped stream
+        yield f'retry: {RECONNECT_DELAY * 1000}\n\n'.encode() + snapshot
+        deadline = time.monotonic() + max_age
+        while time.monotonic() < deadline:
+            if subscription.overflowed:
+                # Events were dropped; the client refetches instead of trusting a gap
+                yield encode_event('resync', {})
+                return
+            message = subscription.get(timeout=heartbeat)
+            # Heartbeats keep proxies from timing out an idle stream and reveal disconnected clients
+            yield message if message is not None else b': keep-alive\n\n'
+    finally:
+        event_hub.unsubscribe(subscription)
+
+@stream_bp.route('/events/stream', methods=['GET'])
+# EventSource cannot send headers, so browsers pass the token as ?jwt=
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    """Push dashboard counter and job status changes for the caller's scope.
+
+    Each open stream holds a worker for as long as it lasts, so serve the app
+    with gevent or eventlet workers (e.g. gunicorn -k gevent), or with a
+    threaded server whose thread count is well above EVENT_STREAM_LIMIT. With
+    sync workers a handful of dashboards blocks every other request. Streams
+    past EVENT_STREAM_LIMIT in this process get 503 with Retry-After.
+    """
+    try:
+        user = get_current_principal()
+        scope, scope_id = dashboard_scope(user)
+        subscription = event_hub.subscribe([(scope, scope_id)])
+        if subscription is None:
+            response = jsonify({'error': 'Too many open event streams, try again shortly'})
+            response.headers['Retry-After'] = str(RECONNECT_DELAY)
+            return response, 503
+        try:
+            counters = get_dashboard_stats_row(scope, scope_id).to_dict()
+        except Exception:
+            event_hub.unsubscribe(subscription)
+            raise
+        snapshot = encode_event('dashboard', dashboard_payload(scope, counters))
+
+        # Streams end after EVENT_STREAM_MAX_AGE so the client reconnects with a current token
+        response = Response(
+            event_stream(
+                subscription, snapshot,
+                current_app.config['EVENT_STREAM_HEARTBEAT'],
+                current_app.config['EVENT_STREAM_MAX_AGE']
+            ),
+            mimetype='text/event-stream'
+        )
+        # A body that never starts never runs the generator's finally, so release the slot here too
+        response.call_on_close(lambda: event_hub.unsubscribe(subscription))
+        response.headers['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
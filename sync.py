@@ -0,0 +1,345 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from src.models.user import db
+from src.models.inventory import InventoryItem
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+from src.models.tombstones import SyncTombstone, DEFAULT_RETENTION_DAYS
+from src.authz import get_current_principal
+from src.routes.checkout import CHECK_IN_ITEM_STATUSES
+from src.inventory_import import ITEM_STATUSES
+from datetime import datetime, timedelta
+import base64
+import json
+
+sync_bp = Blueprint('sync', __name__)
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 2000
+MAX_MUTATIONS = 500
+
+# Default seconds each delta re-reads before the previous one; see changed_since
+DEFAULT_SYNC_OVERLAP_SECONDS = 120
+
+SYNC_MODELS = {
+    'job': Job,
+    'item': InventoryItem,
+    'assignment': InventoryAssignment
+}
+
+# Fields an offline client may change on each entity, and the roles allowed to change them
+MUTABLE_FIELDS = {
+    'job': ['status', 'priority', 'description', 'location', 'address', 'latitude', 'longitude',
+            'estimated_completion', 'end_date'],
+    'item': ['status', 'condition', 'latitude', 'longitude', 'location_description'],
+    'assignment': ['status', 'check_in_time', 'condition_at_checkin', 'notes', 'expected_return_date']
+}
+# Fields only admins and foremen may change; technicians moving their own due dates
+# would hide late items from the overdue scan
+SUPERVISOR_FIELDS = {
+    'assignment': ['expected_return_date']
+}
+MUTATION_ROLES = {
+    'job': ['admin', 'foreman'],
+    'item': ['admin', 'foreman'],
+    'assignment': ['admin', 'foreman', 'technician']
+}
+
+def serialize(row):
+    """Plain dict of a row's columns"""
+    return {column.name: getattr(row, column.name) for column in row.__table__.columns}
+
+def encode_watermark(watermark):
+    return base64.urlsafe_b64encode(json.dumps(watermark).encode()).decode()
+
+def decode_watermark(token):
+    """Decode a watermark token into its issue time, per-entity (updated_at, id) positions,
+    the last tombstone id, the tombstone overlap start and the running cycle's start"""
+    watermark = json.loads(base64.urlsafe_b64decode(token.encode()))
+    positions = {}
+    for entity in SYNC_MODELS:
+        updated_at, row_id = watermark[entity]
+        positions[entity] = (datetime.fromisoformat(updated_at), int(row_id)) if updated_at else None
+    overlap_from = watermark.get('overlap_from')
+    cycle_started = watermark.get('cycle_started')
+    return (
+        datetime.fromisoformat(watermark['issued_at']), positions, int(watermark['deleted']),
+        datetime.fromisoformat(overlap_from) if overlap_from else None,
+        datetime.fromisoformat(cycle_started) if cycle_started else None
+    )
+
+def scoped_query(entity, user):
+    """Rows of an entity the current user may see offline"""
+    model = SYNC_MODELS[entity]
+    query = model.query
+    if entity == 'job':
+        if user.role == 'foreman':
+            query = query.filter((Job.assigned_foreman == user.id) | (Job.created_by == user.id))
+        elif user.role == 'technician':
+            query = query.filter(Job.assignments.any(InventoryAssignment.user_id == user.id))
+    elif entity == 'assignment':
+        if user.role == 'foreman':
+            query = query.filter(InventoryAssignment.job.has(
+                (Job.assigned_foreman == user.id) | (Job.created_by == user.id)
+            ))
+        elif user.role == 'technician':
+            query = query.filter(InventoryAssignment.user_id == user.id)
+    return query
+
+def changed_since(entity, user, position, limit):
+    """Up to limit rows changed after an (updated_at, id) position, oldest first.
+    
+    updated_at is stamped when a row is written, not when it commits, so a
+    transaction still open while a delta is read can commit rows behind the
+    position. A finished delta cycle therefore hands back a position rewound
+    by SYNC_OVERLAP_SECONDS; clients upsert by id, so re-sent rows are harmless.
+    """
+    model = SYNC_MODELS[entity]
+    query = scoped_query(entity, user)
+    if position:
+        query = query.filter(db.tuple_(model.updated_at, model.id) > position)
+    rows = query.order_by(model.updated_at, model.id).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def tombstones_since(user, deleted_after, overlap_from):
+    """Tombstones after an id, or deleted after overlap_from, that apply to the user"""
+    recent = SyncTombstone.id > deleted_after
+    if overlap_from is not None:
+        recent = recent | (SyncTombstone.deleted_at > overlap_from)
+    tombstones = SyncTombstone.query.filter(
+        recent, SyncTombstone.user_id.is_(None) | (SyncTombstone.user_id == user.id)
+    ).order_by(SyncTombstone.id).all()
+    
+    # A row that left one of the user's scopes may still be visible through another,
+    # or may have come back since; only rows the user can no longer see are dropped
+    revoked = {}
+    for tombstone in tombstones:
+        if tombstone.user_id is not None:
+            revoked.setdefault(tombstone.entity, set()).add(tombstone.entity_id)
+    visible = set()
+    for entity, ids in revoked.items():
+        model = SYNC_MODELS[entity]
+        visible.update(
+            (entity, row_id) for (row_id,) in scoped_query(entity, user).filter(model.id.in_(ids)).with_entities(model.id)
+        )
+    return [
+        tombstone for tombstone in tombstones
+        if tombstone.user_id is None or (tombstone.entity, tombstone.entity_id) not in visible
+    ]
+
+@sync_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def get_changes():
+    """Jobs, items and assignments changed since the client's watermark, plus deletions"""
+    try:
+        user = get_current_principal()
+        limit = min(max(request.args.get('limit', DEFAULT_SYNC_LIMIT, type=int), 1), MAX_SYNC_LIMIT)
+        overlap = timedelta(seconds=current_app.config.get('SYNC_OVERLAP_SECONDS', DEFAULT_SYNC_OVERLAP_SECONDS))
+        
+        since = request.args.get('since')
+        positions = dict.fromkeys(SYNC_MODELS)
+        deleted_after = 0
+        overlap_from = cycle_started = None
+        if since:
+            try:
+                issued_at, positions, deleted_after, overlap_from, cycle_started = decode_watermark(since)
+            except (ValueError, KeyError, TypeError):
+                return jsonify({'error': 'Invalid watermark'}), 400
+            
+            # Tombstones older than the retention window are pruned, so old watermarks cannot see them
+            retention_days = current_app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+            if issued_at < datetime.utcnow() - timedelta(days=retention_days):
+                return jsonify({'error': 'Watermark expired, full sync required', 'reset': True}), 410
+        
+        # Read the tombstone high-water mark first so deletes racing this request are not skipped
+        issued_at = datetime.utcnow()
+        # A cycle runs from the first page of a delta to the page without has_more
+        cycle_started = cycle_started or issued_at
+        deleted = []
+        if since:
+            deleted = tombstones_since(user, deleted_after, overlap_from)
+        else:
+            deleted_after = db.session.query(db.func.max(SyncTombstone.id)).scalar() or 0
+        if deleted:
+            deleted_after = max(deleted_after, max(tombstone.id for tombstone in deleted))
+        
+        response = {}
+        has_more = False
+        for entity, key in [('job', 'jobs'), ('item', 'items'), ('assignment', 'assignments')]:
+            rows, more = changed_since(entity, user, positions[entity], limit)
+            has_more = has_more or more
+            response[key] = rows
+            if rows:
+                positions[entity] = (rows[-1].updated_at, rows[-1].id)
+        
+        watermark = {'issued_at': issued_at.isoformat(), 'deleted': deleted_after}
+        if has_more:
+            # Later pages of the cycle continue from the exact positions
+            watermark['cycle_started'] = cycle_started.isoformat()
+        else:
+            # The next cycle re-reads whatever was written since just before this one began
+            rewind_to = cycle_started - overlap
+            watermark['overlap_from'] = rewind_to.isoformat()
+            for entity, position in positions.items():
+                if position is not None:
+                    positions[entity] = min(position, (rewind_to, 0))
+        for entity, position in positions.items():
+            watermark[entity] = [position[0].isoformat(), position[1]] if position else [None, None]
+        
+        # A technician's new assignment can reveal an older job the client has never seen
+        if user.role == 'technician' and since:
+            sent_job_ids = {job.id for job in response['jobs']}
+            missing_job_ids = {assignment.job_id for assignment in response['assignments']} - sent_job_ids
+            if missing_job_ids:
+                response['jobs'] += Job.query.filter(Job.id.in_(missing_job_ids)).all()
+        
+        return jsonify({
+            'jobs': [serialize(job) for job in response['jobs']],
+            'items': [serialize(item) for item in response['items']],
+            'assignments': [serialize(assignment) for assignment in response['assignments']],
+            'deleted': [tombstone.to_dict() for tombstone in deleted],
+            'reset': not since,
+            'has_more': has_more,
+            'watermark': encode_watermark(watermark)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_change(entity, field, value):
+    column = SYNC_MODELS[entity].__table__.c[field]
+    if value is not None and isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+def validate_changes(entity, changes):
+    """Error message if a change set cannot be applied to the entity, else None"""
+    if not isinstance(changes, dict) or not changes:
+        return 'changes must be a non-empty object'
+    allowed = MUTABLE_FIELDS[entity] + (['item_status'] if entity == 'assignment' else [])
+    if set(changes) - set(allowed):
+        return f"changes may only set {', '.join(allowed)}"
+    if entity == 'item' and 'status' in changes and changes['status'] not in ITEM_STATUSES:
+        return f"status must be one of {', '.join(ITEM_STATUSES)}"
+    if entity == 'assignment':
+        if 'status' in changes and changes['status'] != 'checked_in':
+            return 'Assignments can only be checked in offline'
+        if changes.get('item_status', 'available') not in CHECK_IN_ITEM_STATUSES:
+            return f"item_status must be one of {', '.join(CHECK_IN_ITEM_STATUSES)}"
+    return None
+
+def check_access(entity, row, user, changes):
+    """Error message if the user may not make these changes to this row offline, else None"""
+    if user.role not in MUTATION_ROLES[entity]:
+        return 'Insufficient permissions'
+    restricted = set(changes) & set(SUPERVISOR_FIELDS.get(entity, []))
+    if restricted and user.role not in ['admin', 'foreman']:
+        return f"Only admins and foremen may change {', '.join(sorted(restricted))}"
+    if user.role == 'foreman' and entity == 'job':
+        if user.id not in (row.assigned_foreman, row.created_by):
+            return 'Access denied'
+    if user.role == 'technician' and entity == 'assignment' and row.user_id != user.id:
+        return 'Access denied'
+    return None
+
+def apply_mutation(entity, row, changes, now):
+    """Apply an offline change set to a row; checking an assignment in also releases its item"""
+    changes = dict(changes)
+    item_status = changes.pop('item_status', 'available')
+    checking_in = entity == 'assignment' and changes.get('status') == 'checked_in' and row.status == 'checked_out'
+    
+    for field, value in changes.items():
+        setattr(row, field, parse_change(entity, field, value))
+    
+    if checking_in:
+        row.check_in_time = row.check_in_time or now
+        db.session.execute(
+            db.update(InventoryItem).where(InventoryItem.id == row.item_id).values(
+                status=item_status, updated_at=now
+            ).execution_options(synchronize_session=False)
+        )
+    row.updated_at = now
+
+def mutation_row_id(mutation):
+    try:
+        return int(mutation.get('id'))
+    except (TypeError, ValueError):
+        return None
+
+@sync_bp.route('/sync/mutations', methods=['POST'])
+@jwt_required()
+def upload_mutations():
+    """Apply a batch of queued offline mutations, reporting conflicts per mutation"""
+    try:
+        user = get_current_principal()
+        mutations = (request.json or {}).get('mutations')
+        if not isinstance(mutations, list) or not all(isinstance(mutation, dict) for mutation in mutations):
+            return jsonify({'error': 'mutations must be a list of objects'}), 400
+        if len(mutations) > MAX_MUTATIONS:
+            return jsonify({'error': f'At most {MAX_MUTATIONS} mutations can be uploaded per request'}), 400
+        
+        # Load every targeted row with one query per entity
+        ids = {entity: set() for entity in SYNC_MODELS}
+        for mutation in mutations:
+            if mutation.get('entity') in SYNC_MODELS and mutation_row_id(mutation) is not None:
+                ids[mutation['entity']].add(mutation_row_id(mutation))
+        rows = {
+            (entity, row.id): row
+            for entity, entity_ids in ids.items() if entity_ids
+            for row in SYNC_MODELS[entity].query.filter(SYNC_MODELS[entity].id.in_(entity_ids))
+        }
+        
+        now = datetime.utcnow()
+        results = []
+        for mutation in mutations:
+            entity = mutation.get('entity')
+            result = {'client_id': mutation.get('client_id'), 'entity': entity, 'id': mutation.get('id')}
+            results.append(result)
+            
+            if entity not in SYNC_MODELS:
+                result.update(status='invalid', error=f"entity must be one of {', '.join(SYNC_MODELS)}")
+                continue
+            changes = mutation.get('changes')
+            error = validate_changes(entity, changes)
+            if error:
+                result.update(status='invalid', error=error)
+                continue
+            try:
+                base_updated_at = datetime.fromisoformat(mutation['base_updated_at'])
+            except (KeyError, TypeError, ValueError):
+                result.update(status='invalid', error='base_updated_at is required')
+                continue
+            
+            row = rows.get((entity, mutation_row_id(mutation)))
+            if row is None:
+                result.update(status='not_found', error='Row no longer exists')
+                continue
+            error = check_access(entity, row, user, changes)
+            if error:
+                result.update(status='forbidden', error=error)
+                continue
+            
+            # The client edited the version it last synced; anything newer on the server wins
+            if row.updated_at and row.updated_at > base_updated_at:
+                result.update(status='conflict', error='Row changed on the server', server=serialize(row))
+                continue
+            
+            try:
+                with db.session.begin_nested():
+                    apply_mutation(entity, row, changes, now)
+            except (ValueError, TypeError) as e:
+                result.update(status='invalid', error=str(e))
+                continue
+            result.update(status='applied', server=serialize(row))
+        
+        db.session.commit()
+        
+        return jsonify({
+            'applied': sum(1 for result in results if result['status'] == 'applied'),
+            'conflicts': sum(1 for result in results if result['status'] == 'conflict'),
+            'results': results
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def install_src_package():
+    """Expose the checkout as the src package (src.X, src.routes.X, src.models.X) the app imports.
+
+    Deployments keep the modules under src/, src/routes/ and src/models/;
+    this checkout keeps them side by side, so all three packages search the
+    repository root. A real src package on the path is left alone.
+    """
+    if importlib.util.find_spec('src') is not None:
+        return
+    for name in ('src', 'src.routes', 'src.models'):
+        package = types.ModuleType(name)
+        package.__path__ = [ROOT]
+        sys.modules[name] = package
+    sys.modules['src'].routes = sys.modules['src.routes']
+    sys.modules['src'].models = sys.modules['src.models']
+
+install_src_package()
+
+# main.py creates its tables on import, so point it at a scratch database first. The
+# replica bind opens the same file, so tests can tell which engine served a query.
+SCRATCH_DATABASE = os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f'sqlite:///{SCRATCH_DATABASE}')
+os.environ.setdefault('SQLALCHEMY_REPLICA_URI', f'sqlite:///{SCRATCH_DATABASE}')
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from src.main import app
+from src.db_config import REPLICA_BIND
+from src.models.user import User, db
+from src.models.job import Job
+from src.report_queue import ReportJob
+from src.routes.report_jobs import generate_report
+
+@contextmanager
+def statements_by_engine():
+    """Collect the SQL statements executed inside the block, per bind"""
+    statements = {'primary': [], 'replica': []}
+    engines = {'primary': db.engine, 'replica': db.engines[REPLICA_BIND]}
+    listeners = []
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            statements[name].append(statement)
+        event.listen(engine, 'before_cursor_execute', record)
+        listeners.append((engine, record))
+    try:
+        yield statements
+    finally:
+        for engine, record in listeners:
+            event.remove(engine, 'before_cursor_execute', record)
+
+@pytest.fixture
+def report_job():
+    with app.app_context():
+        user = User.query.filter_by(username='admin').one()
+        db.session.add(Job(name='Replica job', status='active', created_by=user.id, created_at=datetime(2025, 1, 1)))
+        job = ReportJob(user_id=user.id, report_type='job-summary', export_format='json', filters='{}')
+        db.session.add(job)
+        db.session.commit()
+        yield job.id
+        db.session.rollback()
+
+def test_generate_report_reads_from_the_replica(report_job):
+    with app.app_context():
+        with statements_by_engine() as statements:
+            generate_report(app, report_job)
+        job = db.session.get(ReportJob, report_job)
+        assert job.status == 'done', job.error
+
+    assert any('FROM job' in statement for statement in statements['replica'])
+    assert not any('FROM job' in statement for statement in statements['primary'])
+    assert any(statement.startswith('UPDATE report_job') for statement in statements['primary'])
+    assert not any(statement.startswith('UPDATE') for statement in statements['replica'])
@@ -0,0 +1,78 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+# main.py creates its tables on import, so point it at a scratch database first
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tempfile.mkdtemp()}/test_reports.db")
+
+from src.main import app
+from src.models.user import User, db
+from src.models.job import Job
+from src.models.inventory import InventoryItem
+from src.models.assignment import InventoryAssignment
+from src.routes.reports import format_job_summary_row, job_summary_query
+
+@contextmanager
+def count_statements():
+    """Collect the SQL statements executed inside the block"""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def add_jobs(count, user):
+    """Jobs with one open and one checked-in assignment each"""
+    for _ in range(count):
+        job = Job(name='Job', status='active', created_by=user.id, assigned_foreman=user.id)
+        items = [InventoryItem(sku=f'SKU-{os.urandom(6).hex()}', name='Pump') for _ in range(2)]
+        db.session.add(job)
+        db.session.add_all(items)
+        db.session.flush()
+        db.session.add_all([
+            InventoryAssignment(item_id=items[0].id, job_id=job.id, user_id=user.id,
+                                status='checked_out', check_out_time=datetime(2025, 1, 1)),
+            InventoryAssignment(item_id=items[1].id, job_id=job.id, user_id=user.id,
+                                status='checked_in', check_out_time=datetime(2025, 1, 1),
+                                check_in_time=datetime(2025, 1, 2))
+        ])
+    db.session.commit()
+
+def job_summary_report():
+    return [format_job_summary_row(*row) for row in job_summary_query().all()]
+
+@pytest.fixture
+def user():
+    with app.app_context():
+        db.session.query(InventoryAssignment).delete()
+        db.session.query(Job).delete()
+        db.session.query(InventoryItem).delete()
+        db.session.commit()
+        user = User.query.filter_by(username='admin').one()
+        yield user
+        db.session.rollback()
+
+def test_job_summary_query_count_does_not_grow_with_jobs(user):
+    add_jobs(5, user)
+    with count_statements() as statements:
+        rows = job_summary_report()
+    assert len(rows) == 5
+    small = len(statements)
+
+    add_jobs(5, user)
+    with count_statements() as statements:
+        rows = job_summary_report()
+    assert len(rows) == 10
+    assert len(statements) == small
+
+def test_job_summary_counts_assignments(user):
+    add_jobs(3, user)
+    rows = job_summary_report()
+    assert {(row['total_assignments'], row['active_assignments']) for row in rows} == {(2, 1)}
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from src.main import app
+from src.models.user import User
+from src.models.assignment import InventoryAssignment
+from src.routes.sync import check_access
+
+def assignment_for(user):
+    return InventoryAssignment(id=1, item_id=1, job_id=1, user_id=user.id, status='checked_out',
+                               expected_return_date=datetime(2025, 1, 3))
+
+def test_technician_cannot_move_their_due_date_offline():
+    with app.app_context():
+        technician = User(id=10, username='tech', role='technician')
+        error = check_access('assignment', assignment_for(technician), technician,
+                             {'expected_return_date': '2030-01-01T00:00:00'})
+    assert error == 'Only admins and foremen may change expected_return_date'
+
+def test_technician_can_still_check_in_offline():
+    with app.app_context():
+        technician = User(id=10, username='tech', role='technician')
+        assert check_access('assignment', assignment_for(technician), technician, {'status': 'checked_in'}) is None
+
+def test_foreman_can_move_a_due_date_offline():
+    with app.app_context():
+        foreman = User(id=11, username='fore', role='foreman')
+        technician = User(id=10, username='tech', role='technician')
+        assert check_access('assignment', assignment_for(technician), foreman,
+                            {'expected_return_date': '2030-01-01T00:00:00'}) is None
@@ -0,0 +1,175 @@
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, tuple_
+from src.models.user import db
+from src.models.inventory import InventoryItem
+from src.models.job import Job
+from src.models.assignment import InventoryAssignment
+
+# Model -> entity name used by the sync API
+SYNC_ENTITIES = {
+    Job: 'job',
+    InventoryItem: 'item',
+    InventoryAssignment: 'assignment'
+}
+
+DEFAULT_RETENTION_DAYS = 30
+
+# Job columns that decide which foremen can see a job and its assignments
+JOB_SCOPE_FIELDS = ['assigned_foreman', 'created_by']
+
+class SyncTombstone(db.Model):
+    """Record of a deleted job, item or assignment, so offline clients can drop their copy"""
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # job, item, assignment
+    entity_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, index=True)  # set when the row only left this user's scope
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {'entity': self.entity, 'id': self.entity_id}
+
+@event.listens_for(db.session, 'after_flush')
+def record_tombstones(session, flush_context):
+    """Write a tombstone for every synced row deleted in this flush"""
+    now = datetime.utcnow()
+    rows = [
+        {'entity': SYNC_ENTITIES[type(obj)], 'entity_id': obj.id, 'deleted_at': now}
+        for obj in session.deleted if type(obj) in SYNC_ENTITIES
+    ]
+    if rows:
+        session.execute(SyncTombstone.__table__.insert(), rows)
+
+def _changed(obj, fields):
+    return any(inspect(obj).attrs[field].history.has_changes() for field in fields)
+
+def _job_foremen(session, job_ids):
+    """{job_id: users whose foreman scope includes the job}, as currently stored"""
+    job_ids = {job_id for job_id in job_ids if job_id is not None}
+    if not job_ids:
+        return {}
+    rows = session.execute(
+        db.select(Job.id, Job.assigned_foreman, Job.created_by).where(Job.id.in_(job_ids))
+    )
+    return {job_id: {assigned_foreman, created_by} - {None} for job_id, assigned_foreman, created_by in rows}
+
+@event.listens_for(db.session, 'before_flush')
+def collect_scope_changes(session, flush_context, instances):
+    """Note who is about to lose sight of jobs and assignments, while the old rows are stored"""
+    # The old values are read from the database because expired attributes carry no history
+    with session.no_autoflush:
+        jobs = {
+            obj.id: obj for obj in session.dirty
+            if isinstance(obj, Job) and obj not in session.deleted and _changed(obj, JOB_SCOPE_FIELDS)
+        }
+        assignments = {
+            obj.id: obj for obj in session.dirty
+            if isinstance(obj, InventoryAssignment) and obj not in session.deleted and _changed(obj, ['job_id', 'user_id'])
+        }
+        deleted_assignment_ids = [
+            obj.id for obj in session.deleted if isinstance(obj, InventoryAssignment) and obj.id is not None
+        ]
+        if not jobs and not assignments and not deleted_assignment_ids:
+            return
+
+        stored_assignments = {}
+        if assignments or deleted_assignment_ids:
+            stored_assignments = {
+                assignment_id: (job_id, user_id) for assignment_id, job_id, user_id in session.execute(
+                    db.select(InventoryAssignment.id, InventoryAssignment.job_id, InventoryAssignment.user_id).where(
+                        InventoryAssignment.id.in_(list(assignments) + deleted_assignment_ids)
+                    )
+                )
+            }
+        job_ids = set(jobs) | {job_id for job_id, _ in stored_assignments.values()}
+        job_ids.update(obj.job_id for obj in assignments.values())
+        stored_foremen = _job_foremen(session, job_ids)
+
+        def current_foremen(job_id):
+            job = jobs.get(job_id)
+            if job is not None:
+                return {getattr(job, field) for field in JOB_SCOPE_FIELDS} - {None}
+            return stored_foremen.get(job_id, set())
+
+        changes = session.info.setdefault('sync_scope_changes', {'jobs': {}, 'revoked': set(), 'left': set()})
+        # A foreman losing a job loses its assignments too; one gaining it must be sent them
+        for job_id in jobs:
+            lost = stored_foremen.get(job_id, set()) - current_foremen(job_id)
+            changes['jobs'].setdefault(job_id, set()).update(lost)
+        # A technician moved off an assignment loses it, and the job once nothing else ties them to it
+        for assignment_id, (old_job_id, old_user_id) in stored_assignments.items():
+            assignment = assignments.get(assignment_id)
+            new_job_id, new_user_id = (assignment.job_id, assignment.user_id) if assignment else (None, None)
+            if assignment is not None and old_user_id != new_user_id:
+                changes['revoked'].add(('assignment', assignment_id, old_user_id))
+            if old_job_id != new_job_id or old_user_id != new_user_id:
+                changes['left'].add((old_user_id, old_job_id))
+            if assignment is not None and old_job_id != new_job_id:
+                for user_id in stored_foremen.get(old_job_id, set()) - current_foremen(new_job_id):
+                    changes['revoked'].add(('assignment', assignment_id, user_id))
+
+@event.listens_for(db.session, 'after_flush')
+def record_scope_changes(session, flush_context):
+    """Write per-user tombstones for rows that left a user's scope in this flush"""
+    changes = session.info.pop('sync_scope_changes', None)
+    if not changes:
+        return
+
+    revoked = set(changes['revoked'])
+    job_ids = [job_id for job_id, lost in changes['jobs'].items() if lost]
+    if changes['jobs']:
+        assignment_rows = session.execute(
+            db.select(InventoryAssignment.id, InventoryAssignment.job_id).where(
+                InventoryAssignment.job_id.in_(list(changes['jobs']))
+            )
+        ).all()
+        for assignment_id, job_id in assignment_rows:
+            revoked.update(('assignment', assignment_id, user_id) for user_id in changes['jobs'][job_id])
+        revoked.update(('job', job_id, user_id) for job_id in job_ids for user_id in changes['jobs'][job_id])
+
+        # Touching the assignments puts them in the next delta of whoever can now see them
+        session.execute(
+            InventoryAssignment.__table__.update().where(
+                InventoryAssignment.job_id.in_(list(changes['jobs']))
+            ).values(updated_at=datetime.utcnow())
+        )
+
+    left = {(user_id, job_id) for user_id, job_id in changes['left'] if user_id is not None and job_id is not None}
+    if left:
+        still_assigned = set(session.execute(
+            db.select(InventoryAssignment.user_id, InventoryAssignment.job_id).where(
+                tuple_(InventoryAssignment.user_id, InventoryAssignment.job_id).in_(list(left))
+            ).distinct()
+        ).all())
+        revoked.update(('job', job_id, user_id) for user_id, job_id in left - still_assigned)
+
+    now = datetime.utcnow()
+    rows = [
+        {'entity': entity, 'entity_id': entity_id, 'user_id': user_id, 'deleted_at': now}
+        for entity, entity_id, user_id in revoked if user_id is not None
+    ]
+    if rows:
+        session.execute(SyncTombstone.__table__.insert(), rows)
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_scope_changes(session):
+    session.info.pop('sync_scope_changes', None)
+
+def prune_tombstones(retention_days=DEFAULT_RETENTION_DAYS):
+    """Delete tombstones older than the retention window, returning how many were removed"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = db.session.execute(
+        SyncTombstone.__table__.delete().where(SyncTombstone.deleted_at < cutoff)
+    )
+    db.session.commit()
+    return result.rowcount
+
+@click.command('prune-sync-tombstones')
+@click.option('--days', type=int, help='Keep tombstones this many days (defaults to SYNC_TOMBSTONE_RETENTION_DAYS).')
+@with_appcontext
+def prune_tombstones_command(days):
+    """Remove sync tombstones older than the retention window."""
+    days = days or current_app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    click.echo(f"Removed {prune_tombstones(days)} tombstones older than {days} days")
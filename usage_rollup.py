@@ -0,0 +1,252 @@
+import click
+from datetime import datetime, timedelta
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, tuple_
+from src.models.user import db
+from src.db_config import UPSERT_INSERTS
+from src.models.inventory import InventoryItem
+from src.models.assignment import InventoryAssignment
+
+ROLLUP_FIELDS = ['checkout_count', 'total_hours', 'open_checkouts']
+
+# Every assignment is counted once in each dimension
+ROLLUP_DIMENSIONS = ['item', 'category', 'job', 'user']
+
+# Assignment columns that decide which rollups a row lands in and what it adds
+TRACKED_ASSIGNMENT_FIELDS = ['item_id', 'job_id', 'user_id', 'status', 'check_out_time', 'check_in_time']
+
+# Rows fetched per batch when rebuilding every day
+REBUILD_CHUNK_SIZE = 1000
+
+class DailyUsageRollup(db.Model):
+    """Assignment totals for one check-out day (UTC) and one item, category, job or user"""
+    day = db.Column(db.Date, primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)  # item, category, job, user
+    dimension_key = db.Column(db.String(100), primary_key=True)  # row id, or category name ('' when uncategorized)
+    checkout_count = db.Column(db.Integer, nullable=False, default=0)
+    total_hours = db.Column(db.Float, nullable=False, default=0)  # returned assignments only
+    open_checkouts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'day': self.day,
+            'dimension': self.dimension,
+            'key': self.dimension_key,
+            **{field: getattr(self, field) for field in ROLLUP_FIELDS}
+        }
+
+def _day_range(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def _hours(check_out_time, check_in_time):
+    # Same duration rule as the inventory usage report: only returned assignments have hours
+    return (check_in_time - check_out_time).total_seconds() / 3600 if check_in_time else 0
+
+def _add_assignment(rollups, state, category, sign=1):
+    """Add (or with sign=-1 remove) one assignment's share of every rollup it lands in"""
+    item_id, job_id, user_id, status, check_out_time, check_in_time = state
+    if check_out_time is None:
+        return
+    hours = _hours(check_out_time, check_in_time)
+    day = check_out_time.date()
+    for dimension, key in zip(ROLLUP_DIMENSIONS, (item_id, category or '', job_id, user_id)):
+        totals = rollups.setdefault((day, dimension, str(key)), dict.fromkeys(ROLLUP_FIELDS, 0))
+        totals['checkout_count'] += sign
+        totals['total_hours'] += sign * hours
+        if status == 'checked_out':
+            totals['open_checkouts'] += sign
+
+def _assignment_columns():
+    return [getattr(InventoryAssignment, field) for field in TRACKED_ASSIGNMENT_FIELDS]
+
+def compute_usage_rollups(session, days=None):
+    """Aggregate assignments by check-out day as {(day, dimension, key): totals}"""
+    # None computes every day; an explicit collection limits it to those days
+    query = db.select(
+        *_assignment_columns(), InventoryItem.category
+    ).join(
+        InventoryItem, InventoryAssignment.item_id == InventoryItem.id
+    ).where(InventoryAssignment.check_out_time.isnot(None))
+
+    if days is not None:
+        if not days:
+            return {}
+        query = query.where(db.or_(*[
+            db.and_(InventoryAssignment.check_out_time >= start, InventoryAssignment.check_out_time < end)
+            for start, end in map(_day_range, days)
+        ]))
+
+    rollups = {}
+    for row in session.execute(query.execution_options(yield_per=REBUILD_CHUNK_SIZE)):
+        _add_assignment(rollups, tuple(row[:-1]), row[-1])
+    return rollups
+
+def _write_rollups(session, rollups, days=None):
+    """Replace the stored rollups of the given days (every day when None) using Core statements"""
+    table = DailyUsageRollup.__table__
+    delete = table.delete()
+    if days is not None:
+        delete = delete.where(table.c.day.in_(list(days)))
+    session.execute(delete)
+
+    now = datetime.utcnow()
+    rows = [
+        dict(totals, day=day, dimension=dimension, dimension_key=key, updated_at=now)
+        for (day, dimension, key), totals in rollups.items()
+    ]
+    if rows:
+        session.execute(table.insert(), rows)
+
+def refresh_usage_rollups(session, days=None):
+    """Recount and store the rollups of the given days, or of every day when None"""
+    if days is not None:
+        days = set(days)
+    rollups = compute_usage_rollups(session, days)
+    _write_rollups(session, rollups, days)
+    return rollups
+
+def apply_rollup_deltas(session, deltas):
+    """Add signed deltas to the stored rollups with atomic upserts, safe inside a flush"""
+    # count = count + delta never reads the row first, so concurrent check-outs on the
+    # same day cannot overwrite each other or race to insert the same key
+    deltas = {key: totals for key, totals in deltas.items() if any(totals.values())}
+    if not deltas:
+        return
+
+    table = DailyUsageRollup.__table__
+    now = datetime.utcnow()
+    rows = [
+        dict(totals, day=day, dimension=dimension, dimension_key=key, updated_at=now)
+        for (day, dimension, key), totals in deltas.items()
+    ]
+    dialect = session.connection().dialect.name
+    if dialect in UPSERT_INSERTS:
+        insert = UPSERT_INSERTS[dialect](table)
+        session.execute(insert.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.dimension, table.c.dimension_key],
+            set_={
+                'updated_at': insert.excluded.updated_at,
+                **{field: table.c[field] + insert.excluded[field] for field in ROLLUP_FIELDS}
+            }
+        ), rows)
+    else:
+        for row in rows:
+            result = session.execute(table.update().where(
+                table.c.day == row['day'],
+                table.c.dimension == row['dimension'],
+                table.c.dimension_key == row['dimension_key']
+            ).values(updated_at=now, **{field: table.c[field] + row[field] for field in ROLLUP_FIELDS}))
+            if result.rowcount == 0:
+                session.execute(table.insert().values(**row))
+
+    # Keys nothing counts towards any more are dropped rather than kept as zero rows
+    session.execute(table.delete().where(
+        tuple_(table.c.day, table.c.dimension, table.c.dimension_key).in_(list(deltas)),
+        table.c.checkout_count <= 0
+    ))
+
+def _assignment_state(assignment):
+    return tuple(getattr(assignment, field) for field in TRACKED_ASSIGNMENT_FIELDS)
+
+def _stored_assignments(session, assignment_ids):
+    """Stored state and item category of assignments, as {id: (state, category)}"""
+    if not assignment_ids:
+        return {}
+    rows = session.execute(
+        db.select(InventoryAssignment.id, *_assignment_columns(), InventoryItem.category).join(
+            InventoryItem, InventoryAssignment.item_id == InventoryItem.id
+        ).where(InventoryAssignment.id.in_(assignment_ids))
+    )
+    return {row[0]: (tuple(row[1:-1]), row[-1]) for row in rows}
+
+def _item_categories(session, item_ids):
+    item_ids = {item_id for item_id in item_ids if item_id is not None}
+    if not item_ids:
+        return {}
+    return dict(session.execute(
+        db.select(InventoryItem.id, InventoryItem.category).where(InventoryItem.id.in_(item_ids))
+    ).all())
+
+@event.listens_for(db.session, 'before_flush')
+def collect_rollup_deltas(session, flush_context, instances):
+    """Work out how this flush moves the rollups while the old rows are still stored"""
+    # Each changed assignment's stored share is subtracted and its new share added, so
+    # a check-out costs a few upserts however busy its day is. The old values are read
+    # from the database because expired attributes carry no history.
+    with session.no_autoflush:
+        added = [obj for obj in session.new if isinstance(obj, InventoryAssignment)]
+        changed = [
+            obj for obj in session.dirty
+            if isinstance(obj, InventoryAssignment) and obj not in session.deleted and any(
+                inspect(obj).attrs[field].history.has_changes() for field in TRACKED_ASSIGNMENT_FIELDS
+            )
+        ]
+        removed = [obj for obj in session.deleted if isinstance(obj, InventoryAssignment)]
+        recategorized = {
+            obj.id: obj.category for obj in session.dirty
+            if isinstance(obj, InventoryItem) and inspect(obj).attrs.category.history.has_changes()
+        }
+        if not added and not changed and not removed and not recategorized:
+            return
+
+        stored_ids = [obj.id for obj in changed + removed]
+        stored = _stored_assignments(session, stored_ids)
+        new_states = [_assignment_state(obj) for obj in added + changed]
+        categories = {**_item_categories(session, [state[0] for state in new_states]), **recategorized}
+
+        deltas = {}
+        for state, category in stored.values():
+            _add_assignment(deltas, state, category, -1)
+        for state in new_states:
+            _add_assignment(deltas, state, categories.get(state[0]))
+
+        # A category change moves the item's other assignments from the old category to
+        # the new one; their item, job and user shares cancel out
+        if recategorized:
+            query = db.select(*_assignment_columns(), InventoryItem.category).join(
+                InventoryItem, InventoryAssignment.item_id == InventoryItem.id
+            ).where(
+                InventoryAssignment.item_id.in_(list(recategorized)),
+                InventoryAssignment.check_out_time.isnot(None)
+            )
+            if stored_ids:
+                query = query.where(InventoryAssignment.id.notin_(stored_ids))
+            for row in session.execute(query):
+                state = tuple(row[:-1])
+                _add_assignment(deltas, state, row[-1], -1)
+                _add_assignment(deltas, state, recategorized[state[0]])
+
+    pending = session.info.setdefault('rollup_deltas', {})
+    for key, totals in deltas.items():
+        current = pending.setdefault(key, dict.fromkeys(ROLLUP_FIELDS, 0))
+        for field, delta in totals.items():
+            current[field] += delta
+
+@event.listens_for(db.session, 'after_flush')
+def maintain_usage_rollups(session, flush_context):
+    """Apply this flush's rollup deltas in the same transaction"""
+    deltas = session.info.pop('rollup_deltas', None)
+    if deltas:
+        apply_rollup_deltas(session, deltas)
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_rollup_deltas(session):
+    session.info.pop('rollup_deltas', None)
+
+@click.command('refresh-usage-rollups')
+@click.option('--days', type=int, default=2, show_default=True, help='Recount this many most recent days.')
+@click.option('--all', 'rebuild_all', is_flag=True, help='Rebuild the rollups of every day.')
+@with_appcontext
+def refresh_usage_rollups_command(days, rebuild_all):
+    """Recount daily usage rollups from the assignment table (run nightly)."""
+    if rebuild_all:
+        rollups = refresh_usage_rollups(db.session)
+        click.echo(f"Rebuilt {len(rollups)} usage rollups")
+    else:
+        today = datetime.utcnow().date()
+        window = [today - timedelta(days=offset) for offset in range(days)]
+        rollups = refresh_usage_rollups(db.session, window)
+        click.echo(f"Recounted {len(rollups)} usage rollups over {days} days")
+    db.session.commit()